@@ -0,0 +1,154 @@
+"""
+管理接口
+
+- /metrics: Prometheus 文本格式的进程内指标
+- /api/v1/admin/cache/stats: 缓存统计（键数量、各命名空间命中率、读写耗时、值大小、回收数量）
+- /api/v1/admin/feishu/calls: 飞书调用报表（按租户、来源接口、操作、数据表汇总调用次数和耗时）
+- /api/v1/admin/profiler: 启用、查看、停止采样分析器，/api/v1/admin/profiler/stacks 下载折叠栈
+
+均需在请求头中携带 Authorization: Bearer <ADMIN_TOKEN>，未配置 ADMIN_TOKEN 时返回 404。
+"""
+import hmac
+import logging
+from functools import wraps
+
+from flask import Blueprint, jsonify, request, Response
+
+from config import config
+from services.feishu_service import feishu_calls
+from services.tenant_service import tenant_service
+from utils.metrics import metrics
+from utils.profiler import sampling_profiler
+
+logger = logging.getLogger(__name__)
+
+admin = Blueprint('admin', __name__)
+
+
+def admin_required(view):
+    """管理接口鉴权装饰器，令牌错误时返回 401，未配置令牌时返回 404（不暴露接口存在）"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not config.ADMIN_TOKEN:
+            return jsonify({'code': 404, 'message': '接口未启用', 'data': None}), 404
+        scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+        if scheme.lower() != 'bearer' or not hmac.compare_digest(token.strip().encode('utf-8'),
+                                                                  config.ADMIN_TOKEN.encode('utf-8')):
+            logger.warning(f"管理接口鉴权失败: {request.path}")
+            response = jsonify({'code': 401, 'message': '未授权', 'data': None})
+            response.status_code = 401
+            response.headers['WWW-Authenticate'] = 'Bearer'
+            return response
+        return view(*args, **kwargs)
+    return wrapper
+
+
+@admin.route('/metrics', methods=['GET'])
+@admin_required
+def prometheus_metrics():
+    """Prometheus 指标"""
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+
+@admin.route('/api/v1/admin/cache/stats', methods=['GET'])
+@admin_required
+def cache_stats():
+    """缓存统计"""
+    return jsonify({
+        'code': 0,
+        'message': 'success',
+        'data': tenant_service.cache_service.get_cache_stats()
+    })
+
+
+@admin.route('/api/v1/admin/feishu/calls', methods=['GET'])
+@admin_required
+def feishu_call_report():
+    """
+    飞书调用报表
+
+    Query Parameters:
+        group_by: 以逗号分隔的分组字段（tenant,origin,operation,table,status），默认 tenant,origin,operation,table
+        sort: 排序字段（calls,total_ms,bytes,calls_per_request），默认 calls
+        top: 返回的分组数量，默认 20
+        window: 只统计最近的秒数，为空时统计缓冲区内全部记录
+    """
+    try:
+        group_by = [field.strip() for field in request.args.get('group_by', 'tenant,origin,operation,table').split(',')
+                    if field.strip()]
+        top = int(request.args.get('top', 20))
+        window = float(request.args['window']) if request.args.get('window') else None
+        report = feishu_calls.report(group_by, request.args.get('sort', 'calls'), top, window)
+    except ValueError as e:
+        return jsonify({'code': 1, 'message': str(e), 'data': None}), 400
+    return jsonify({'code': 0, 'message': 'success', 'data': report})
+
+
+@admin.route('/api/v1/admin/profiler', methods=['GET'])
+@admin_required
+def profiler_status():
+    """采样分析器状态和本次（或上一次）采样的各路由样本数"""
+    session = sampling_profiler.session
+    return jsonify({
+        'code': 0,
+        'message': 'success',
+        'data': {
+            'active': sampling_profiler.active,
+            'session': session.to_dict() if session else None
+        }
+    })
+
+
+@admin.route('/api/v1/admin/profiler', methods=['POST'])
+@admin_required
+def start_profiler():
+    """
+    启用采样分析器
+
+    JSON Body:
+        seconds: 采样时长 秒，默认 60，不超过 PROFILER_MAX_SECONDS
+        percent: 抽取的请求百分比，默认 100
+        interval_ms: 采样间隔 毫秒，默认 5
+        routes: 只抽取这些路由规则（如 /api/v1/farm/info），为空时抽取全部
+    """
+    body = request.get_json(silent=True) or {}
+    routes = body.get('routes') or None
+    if isinstance(routes, str):
+        routes = [routes]
+    try:
+        seconds = float(body.get('seconds', 60))
+        if seconds > config.PROFILER_MAX_SECONDS:
+            raise ValueError(f'seconds 不能超过 {config.PROFILER_MAX_SECONDS}')
+        session = sampling_profiler.start(seconds, float(body.get('percent', 100)),
+                                          float(body.get('interval_ms', 5)) / 1000, routes,
+                                          config.PROFILER_OUTPUT_DIR)
+    except (TypeError, ValueError) as e:
+        return jsonify({'code': 1, 'message': str(e), 'data': None}), 400
+    except RuntimeError as e:
+        return jsonify({'code': 1, 'message': str(e), 'data': None}), 409
+    logger.info(f"采样分析器已启用: {session.seconds}s, {session.percent}%")
+    return jsonify({'code': 0, 'message': 'success', 'data': session.to_dict()})
+
+
+@admin.route('/api/v1/admin/profiler', methods=['DELETE'])
+@admin_required
+def stop_profiler():
+    """提前结束采样，返回写入的文件"""
+    session = sampling_profiler.stop()
+    return jsonify({'code': 0, 'message': 'success', 'data': session.to_dict() if session else None})
+
+
+@admin.route('/api/v1/admin/profiler/stacks', methods=['GET'])
+@admin_required
+def profiler_stacks():
+    """
+    下载折叠栈（flamegraph.pl / speedscope 格式）
+
+    Query Parameters:
+        route: 路由规则，为空时返回全部路由
+    """
+    session = sampling_profiler.session
+    if session is None:
+        return jsonify({'code': 1, 'message': '尚未采样', 'data': None}), 404
+    routes = [request.args['route']] if request.args.get('route') else sorted(session.stacks)
+    return Response(''.join(session.folded(route) for route in routes), mimetype='text/plain; charset=utf-8')
@@ -7,9 +7,20 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from flask import Blueprint, jsonify, request, Response
 from services.tenant_service import tenant_service
+from services.rate_limiter import rate_limiter
+from services.feishu_service import FARM_SECTIONS
+from services.payload_cache import payload_cache
+from utils.compression import choose_encoding, available_encodings
 from utils.lot_decode import temperature_humidity2json,decode_bdlot_msg
+from utils.feishu_event import verify_signature, decrypt_event, verify_token
+from utils.deadline import deadline_scope, expired
+from utils.metrics import metrics, in_flight_gauge
+from utils.tracing import server_timing
+import json
+import time
 import logging
 import requests
+from functools import wraps
 from config import config
 from urllib.parse import parse_qs, urlparse
 from api.bdlot import bd_lot_cache
@@ -22,6 +33,79 @@ api_v1 = Blueprint('api_v1', __name__, url_prefix='/api/v1')
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 图片代理：source 为 upstream（从飞书下载）或 client_cache（浏览器缓存仍有效，返回 304）
+IMAGE_PROXY_RESPONSES = metrics.counter('image_proxy_responses_total', '图片代理响应次数', ('source',))
+IMAGE_PROXY_BYTES = metrics.counter('image_proxy_bytes_total', '图片代理从飞书转发的字节数', ('source',))
+# 设备数据和飞书事件推送在请求线程中同步处理，进行中的推送数即待处理的积压量
+INGESTION_STARTED = metrics.counter('ingestion_started_total', '开始处理的推送数', ('source',))
+INGESTION_FINISHED = metrics.counter('ingestion_finished_total', '处理完成的推送数', ('source',))
+INGESTION_SECONDS = metrics.histogram('ingestion_seconds', '推送处理耗时（秒）', ('source',))
+in_flight_gauge(metrics, 'ingestion_in_flight', '正在处理的推送数', ('source',), INGESTION_STARTED, INGESTION_FINISHED)
+
+def client_ip():
+    """获取客户端IP
+
+    开启 TRUST_PROXY_HEADERS 时 remote_addr 已由 ProxyFix 替换为可信代理追加的地址（见 app.py），
+    不直接读取 X-Forwarded-For：其中最左侧的地址由客户端填写，可以任意伪造。
+    """
+    return request.remote_addr or 'unknown'
+
+
+def track_ingestion(source):
+    """记录推送接口的处理耗时和进行中的推送数
+
+    Args:
+        source: 推送来源，如 bdlot、feishu_event
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            INGESTION_STARTED.inc(source)
+            started = time.perf_counter()
+            try:
+                return view(*args, **kwargs)
+            finally:
+                INGESTION_SECONDS.observe(time.perf_counter() - started, source)
+                INGESTION_FINISHED.inc(source)
+        return wrapper
+    return decorator
+
+
+def rate_limited(tenant_arg='tenant_num', default_tenant='1', route_class='api'):
+    """
+    接口限流装饰器，按客户端IP和租户编号限流，超限时返回 429，不执行接口逻辑
+
+    租户编号来自请求参数，只有已登记的租户才计入租户额度，
+    避免伪造他人的租户编号耗尽其额度，或用随机编号产生无限多的计数键。
+
+    Args:
+        tenant_arg: 租户编号所在的查询参数名
+        default_tenant: 未传租户编号时接口使用的默认租户
+        route_class: 接口类别 api/page/image，各类别分别计数
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            body = request.get_json(silent=True) if request.method == 'POST' else None
+            tenant_num = request.args.get(tenant_arg) or (body.get(tenant_arg) if isinstance(body, dict) else None) \
+                or default_tenant
+            if not tenant_service.get_tenant_info(tenant_num):
+                tenant_num = None
+            allowed, retry_after, scope = rate_limiter.check(client_ip(), tenant_num, route_class)
+            if not allowed:
+                response = jsonify({
+                    'code': 1,
+                    'message': '请求过于频繁，请稍后再试',
+                    'data': {'scope': scope, 'retry_after': retry_after}
+                })
+                response.status_code = 429
+                response.headers['Retry-After'] = str(retry_after)
+                return response
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
 @api_v1.route('/live/callback', methods=['POST'])
 def live_callback():
     """
@@ -69,21 +153,86 @@ def live_callback():
 
 
 @api_v1.route('/farm/info', methods=['GET'])
+@server_timing
+@rate_limited()
 def get_farm_info():
     """
     获取农户完整信息（用于静态页面展示）
 
     Query Parameters:
         product_id: 产品ID（农户记录ID）
+        fields: 以逗号分隔的数据块（sensor,product_info,feeding_records,breeding_process,statistics），
+            为空时返回全部，未请求的数据块不查询飞书
 
     Returns:
-        JSON响应包含农户的完整信息，包括商品信息、饲喂记录、养殖流程等
+        JSON响应包含农户的完整信息，包括商品信息、饲喂记录、养殖流程等；
+        Server-Timing 响应头给出本次请求内飞书调用的总耗时和次数
     """
-    try:
-        # 获取查询参数
-        product_id = request.args.get('product_id')
-        tenant_num = request.args.get('tenant_num') or 1
+    # 获取查询参数
+    product_id = request.args.get('product_id')
+    tenant_num = request.args.get('tenant_num') or 1
+    sections = None
+    if request.args.get('fields'):
+        sections = {field.strip() for field in request.args['fields'].split(',') if field.strip()}
+        unknown = sections - set(FARM_SECTIONS)
+        if unknown or not sections:
+            return jsonify({
+                'code': 1,
+                'message': f'fields 只能包含: {",".join(FARM_SECTIONS)}',
+                'data': None
+            }), 400
+
+    # 命中预序列化响应时直接返回缓存的字节串
+    product_id = (product_id or '').strip()
+    variant = payload_cache.variant(sections)
+    encoding = choose_encoding(request.headers.get('Accept-Encoding'), available_encodings())
+    if product_id and tenant_service.get_tenant_info(tenant_num):
+        cached = payload_cache.get(str(tenant_num), product_id, variant, encoding)
+        if cached:
+            return payload_response(cached[0], cached[1], encoding)
+
+    response_data, status = load_farm_info(tenant_num, product_id, sections)
+    if status == 200 and not response_data['data'].get('omitted_sections'):
+        # 只缓存完整的响应
+        payload = payload_cache.put(str(tenant_num), product_id, variant, response_data)
+        return payload_response(payload[encoding], payload['etag'].decode('utf-8'), encoding)
+    return jsonify(response_data), status
+
+
+def payload_response(body, etag, encoding):
+    """
+    返回预序列化的 JSON 响应，客户端缓存的 ETag 一致时返回 304
+
+    Args:
+        body: 已按 encoding 压缩的响应体
+        etag: 响应的 ETag
+        encoding: 内容编码，identity 表示未压缩
+    """
+    if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype='application/json')
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+    response.headers['ETag'] = etag
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def load_farm_info(tenant_num, product_id, sections=None):
+    """
+    获取农户完整信息的接口响应（/farm/info 接口和服务端渲染页面共用）
+
+    Args:
+        tenant_num: 租户编号
+        product_id: 产品ID（农户记录ID）
+        sections: 需要的数据块，为空时返回全部
 
+    Returns:
+        Tuple: (响应数据, HTTP状态码)
+    """
+    try:
         logger.info(f"开始获取农户完整信息，产品ID: {product_id}, 租户编号: {tenant_num}")
 
         # 验证产品ID参数
@@ -93,7 +242,7 @@ def get_farm_info():
                 'message': '缺少必要参数：product_id',
                 'data': None
             }
-            return jsonify(error_response), 400
+            return error_response, 400
         
         # 验证租户编号是否有效
         tenant_info = tenant_service.get_tenant_info(tenant_num)
@@ -103,7 +252,7 @@ def get_farm_info():
                 'message': '无效的租户编号',
                 'data': None
             }
-            return jsonify(error_response), 403
+            return error_response, 403
         
         # 验证农户ID是否在该租户的授权列表中
         # if not tenant_service.validate_farmer_access(tenant_num, product_id.strip()):
@@ -112,50 +261,39 @@ def get_farm_info():
         #         'message': '此记录不存在或授权农户数量已超限额',
         #         'data': None
         #     }
-        #     return jsonify(error_response), 403
+        #     return error_response, 403
         
-        # 使用租户专用的飞书服务获取数据
-        result = tenant_service.get_tenant_farm_info(tenant_num, product_id.strip())
+        # 使用租户专用的飞书服务获取数据，超出时间预算的数据块不返回
+        with deadline_scope(config.FARM_INFO_DEADLINE):
+            result = tenant_service.get_tenant_farm_info(tenant_num, product_id.strip(),
+                                                         feeding_page_size=config.FEEDING_PAGE_SIZE,
+                                                         sections=sections)
+            timed_out = expired()
         # 数据获取逻辑已在上面的多租户验证中处理
 
         if result['success']:
-            data = result['data']
-            feeding_records = data.get('feeding_records', [])
-            # 处理养殖流程时间格式
-            breeding_process = data.get('breeding_process', [])
-
-            # 处理产品信息中的封面图和监控地址格式
-            product_info = data.get('product_info', {}).copy()
-            
-            # 修改监控地址格式
-            if '监控地址' in product_info and product_info['监控地址'] and isinstance(product_info['监控地址'], list) and len(product_info['监控地址']) > 0:
-                    # 将 rtmp 协议改为 http，链接末尾增加 .m3u8  示例： https://srs.pxact.com/live/vbld6mb2kh.m3u8
-                    rtmp_url = product_info['监控地址'][0]['text']
-                    logger.info(f"原始监控地址: {rtmp_url}")
-                    # 提取 rtmp 地址中的流标识符
-                    parts = rtmp_url.split('?')[0].split('/')
-                    if len(parts) > 3:
-                        stream_id = parts[-1]
-                        product_info['监控地址'] = f"https://srs.pxact.com/live/{stream_id}{config.VIDEO_SUFFIX}"
-            
-            # 简化统计信息
-            statistics = data.get('statistics')
             # 格式化响应数据
             response_data = {
                 'code': 0,
                 'message': 'success',
-                'data': {
-                    'sensor': data.get('sensor', {}),
-                    'product_info': product_info,
-                    'feeding_records': feeding_records,
-                    'breeding_process': breeding_process,
-                    'statistics': statistics
-                }
+                'data': format_farm_data(result['data'], sections)
             }
 
-            return jsonify(response_data), 200
+            return response_data, 200
+        elif result.get('not_found'):
+            return {
+                'code': 1,
+                'message': '产品不存在',
+                'data': None
+            }, 404
+        elif timed_out:
+            return {
+                'code': 1,
+                'message': '获取农户信息超时，请稍后重试',
+                'data': None
+            }, 504
         else:
-            return jsonify(result), 500
+            return result, 500
 
     except Exception as e:
         logger.error(f"获取农户完整信息异常: {str(e)}")
@@ -166,9 +304,228 @@ def get_farm_info():
             'data': None
         }
 
-        return jsonify(error_response), 500
+        return error_response, 500
+
+# 饲喂记录分页接口单页允许的最大记录数
+MAX_FEEDING_PAGE_SIZE = 100
+
+
+@api_v1.route('/farm/<product_id>/feeding', methods=['GET'])
+@rate_limited()
+def get_feeding_records(product_id):
+    """
+    分页获取农户的饲喂记录（按操作时间倒序）
+
+    Query Parameters:
+        tenant_num: 租户编号
+        cursor: 上一页返回的 next_cursor，为空时从第一页开始
+        page_size: 每页记录数，默认为 FEEDING_PAGE_SIZE，最大 100
+
+    Returns:
+        JSON响应，data.records 为当前页饲喂记录，data.next_cursor 为下一页游标
+    """
+    try:
+        tenant_num = request.args.get('tenant_num') or 1
+        cursor = request.args.get('cursor') or None
+        try:
+            page_size = int(request.args.get('page_size') or config.FEEDING_PAGE_SIZE)
+        except ValueError:
+            return jsonify({
+                'code': 1,
+                'message': 'page_size 必须为整数',
+                'data': None
+            }), 400
+        if page_size < 1 or page_size > MAX_FEEDING_PAGE_SIZE:
+            return jsonify({
+                'code': 1,
+                'message': f'page_size 取值范围为 1-{MAX_FEEDING_PAGE_SIZE}',
+                'data': None
+            }), 400
+
+        if not tenant_service.get_tenant_info(tenant_num):
+            return jsonify({
+                'code': 1,
+                'message': '无效的租户编号',
+                'data': None
+            }), 403
+
+        result = tenant_service.get_tenant_feeding_records(tenant_num, product_id.strip(), page_size, cursor)
+        if result.get('not_found'):
+            return jsonify({
+                'code': 1,
+                'message': '产品不存在',
+                'data': None
+            }), 404
+        if not result['success']:
+            return jsonify(result), 500
+
+        return jsonify({
+            'code': 0,
+            'message': 'success',
+            'data': result['data']
+        }), 200
+
+    except Exception as e:
+        logger.error(f"分页获取饲喂记录异常: {str(e)}")
+        return jsonify({
+            'code': 1,
+            'message': f'服务器内部错误: {str(e)}',
+            'data': None
+        }), 500
+
+
+# 批量接口单次允许的最大产品数量
+MAX_BATCH_PRODUCTS = 100
+
+
+@api_v1.route('/farm/info/batch', methods=['GET', 'POST'])
+@rate_limited()
+def get_farm_info_batch():
+    """
+    批量获取多个农户完整信息（用于经销商、零售商的产品列表页）
+
+    Query Parameters (GET):
+        product_ids: 以逗号分隔的产品ID列表
+        tenant_num: 租户编号
+    JSON Body (POST):
+        { "product_ids": ["recxxx", ...], "tenant_num": 1 }
+
+    Returns:
+        JSON响应，data.items 为 {product_id: 农户完整信息}，data.missing 为未找到的产品ID
+    """
+    try:
+        if request.method == 'POST':
+            body = request.get_json(silent=True) or {}
+            product_ids = body.get('product_ids') or []
+            tenant_num = body.get('tenant_num') or request.args.get('tenant_num') or 1
+        else:
+            product_ids = (request.args.get('product_ids') or '').split(',')
+            tenant_num = request.args.get('tenant_num') or 1
+        tenant_num = str(tenant_num)
+
+        # 去除空值和重复ID，保持请求顺序
+        product_ids = list(dict.fromkeys(
+            str(product_id).strip() for product_id in product_ids if product_id and str(product_id).strip()
+        ))
+        if not product_ids:
+            return jsonify({
+                'code': 1,
+                'message': '缺少必要参数：product_ids',
+                'data': None
+            }), 400
+        if len(product_ids) > MAX_BATCH_PRODUCTS:
+            return jsonify({
+                'code': 1,
+                'message': f'单次最多查询 {MAX_BATCH_PRODUCTS} 个产品',
+                'data': None
+            }), 400
+
+        if not tenant_service.get_tenant_info(tenant_num):
+            return jsonify({
+                'code': 1,
+                'message': '无效的租户编号',
+                'data': None
+            }), 403
+
+        result = tenant_service.get_tenant_farms_info(tenant_num, product_ids,
+                                                      feeding_page_size=config.FEEDING_PAGE_SIZE)
+        if not result['success']:
+            return jsonify(result), 500
+
+        data = result['data']
+        return jsonify({
+            'code': 0,
+            'message': 'success',
+            'data': {
+                'items': {product_id: format_farm_data(info) for product_id, info in data['items'].items()},
+                'missing': data['missing']
+            }
+        }), 200
+
+    except Exception as e:
+        logger.error(f"批量获取农户完整信息异常: {str(e)}")
+        return jsonify({
+            'code': 1,
+            'message': f'服务器内部错误: {str(e)}',
+            'data': None
+        }), 500
+
+
+def format_farm_data(data, sections=None):
+    """
+    将飞书服务返回的农户完整信息转换为接口响应格式（处理监控地址等）
+
+    Args:
+        data: 农户完整信息
+        sections: 需要返回的数据块，为空时返回全部
+    """
+    feeding_records = data.get('feeding_records', [])
+    # 处理养殖流程时间格式
+    breeding_process = data.get('breeding_process', [])
+
+    # 处理产品信息中的封面图和监控地址格式
+    product_info = data.get('product_info', {}).copy()
+
+    # 修改监控地址格式
+    if '监控地址' in product_info and product_info['监控地址'] and isinstance(product_info['监控地址'], list) and len(product_info['监控地址']) > 0:
+            # 将 rtmp 协议改为 http，链接末尾增加 .m3u8  示例： https://srs.pxact.com/live/vbld6mb2kh.m3u8
+            rtmp_url = product_info['监控地址'][0]['text']
+            logger.info(f"原始监控地址: {rtmp_url}")
+            # 提取 rtmp 地址中的流标识符
+            parts = rtmp_url.split('?')[0].split('/')
+            if len(parts) > 3:
+                stream_id = parts[-1]
+                product_info['监控地址'] = f"https://srs.pxact.com/live/{stream_id}{config.VIDEO_SUFFIX}"
+
+    # 简化统计信息
+    statistics = data.get('statistics')
+    formatted = {
+        'sensor': data.get('sensor', {}),
+        'product_info': product_info,
+        'feeding_records': feeding_records,
+        'breeding_process': breeding_process,
+        'statistics': statistics
+    }
+    if sections is not None:
+        formatted = {key: value for key, value in formatted.items() if key in sections}
+    # 是否有监控视频，页面据此决定是否加载播放器
+    if 'product_info' in formatted:
+        stream_url = product_info.get('监控地址')
+        formatted['has_stream'] = isinstance(stream_url, str) and bool(stream_url.strip())
+    # 饲喂记录只返回了第一页时，附带下一页游标
+    if 'feeding_page' in data and 'feeding_records' in formatted:
+        formatted['feeding_page'] = data['feeding_page']
+    # 查询失败或超出时间预算而未返回的数据块
+    if data.get('omitted_sections'):
+        formatted['omitted_sections'] = data['omitted_sections']
+    return formatted
+
+
+def _first_image_url(images):
+    """取图片字段中第一张图片的地址，兼容地址字符串、地址列表和附件列表"""
+    if isinstance(images, str):
+        return images
+    if isinstance(images, list) and images:
+        image = images[0]
+        if isinstance(image, dict) and image.get('file_token'):
+            return f"/api/v1/img/{image['file_token']}"
+        if isinstance(image, str):
+            return image
+    return None
+
+
+def preload_image_urls(data, limit=4):
+    """
+    获取农户详情页首屏需要预加载的图片地址（封面图和养殖流程首张图片）
+    """
+    urls = [_first_image_url((data.get('product_info') or {}).get('封面图'))]
+    for process in data.get('breeding_process') or []:
+        urls.append(_first_image_url(process.get('images')))
+    return list(dict.fromkeys(url for url in urls if url))[:limit]
+
 
 @api_v1.route('/bdlot/<tenant_num>/receive', methods=['GET','POST'])
+@track_ingestion('bdlot')
 def receive_baidu_lot_data(tenant_num):
     """
     接收百度智能云 lot 数据接口
@@ -191,6 +548,56 @@ def receive_baidu_lot_data(tenant_num):
         'msg': 'ok'
     }), 200
 
+@api_v1.route('/feishu/event', methods=['POST'])
+@track_ingestion('feishu_event')
+def feishu_event():
+    """
+    飞书多维表格变更事件回调
+    支持 url_verification 校验、Verification Token / 签名校验、加密事件解密，
+    按 event_id 去重后精确刷新受影响的租户、数据表和记录缓存
+    订阅事件: drive.file.bitable_record_changed_v1、drive.file.bitable_field_changed_v1
+    """
+    if not config.FEISHU_EVENT_VERIFICATION_TOKEN:
+        return jsonify({'code': 403, 'msg': '未启用事件订阅'}), 403
+    body = request.get_data()
+    try:
+        payload = json.loads(body or b'{}')
+        if 'encrypt' in payload:
+            encrypt_key = config.FEISHU_EVENT_ENCRYPT_KEY
+            if not encrypt_key:
+                return jsonify({'code': 400, 'msg': '未配置 Encrypt Key'}), 400
+            signature = request.headers.get('X-Lark-Signature')
+            if signature and not verify_signature(request.headers.get('X-Lark-Request-Timestamp'),
+                                                  request.headers.get('X-Lark-Request-Nonce'),
+                                                  encrypt_key, body, signature):
+                logger.warning('feishu_event signature mismatch')
+                return jsonify({'code': 401, 'msg': '签名校验失败'}), 401
+            payload = decrypt_event(payload['encrypt'], encrypt_key)
+    except (ValueError, RuntimeError) as e:
+        logger.error(f'feishu_event payload error: {str(e)}')
+        return jsonify({'code': 400, 'msg': '事件格式错误'}), 400
+
+    if not verify_token(payload, config.FEISHU_EVENT_VERIFICATION_TOKEN):
+        logger.warning('feishu_event token mismatch')
+        return jsonify({'code': 401, 'msg': 'Verification Token 校验失败'}), 401
+
+    if payload.get('type') == 'url_verification':
+        return jsonify({'challenge': payload.get('challenge')})
+
+    header = payload.get('header') or {}
+    event_id = header.get('event_id') or payload.get('uuid')
+    if event_id and not tenant_service.cache_service.claim_event(event_id):
+        logger.info(f'feishu_event duplicate: {event_id}')
+        return jsonify({'code': 0, 'msg': 'ok'})
+    try:
+        tenant_service.handle_bitable_event(header.get('event_type'), payload.get('event') or {})
+    except Exception as e:
+        logger.error(f'feishu_event handle error: {str(e)}')
+        if event_id:
+            tenant_service.cache_service.release_event(event_id)
+        return jsonify({'code': 500, 'msg': '事件处理失败'}), 500
+    return jsonify({'code': 0, 'msg': 'ok'})
+
 @api_v1.route('/health', methods=['GET'])
 def health_check():
     """
@@ -204,11 +611,13 @@ def health_check():
         'message': 'API服务运行正常',
         'data': {
             'status': 'healthy',
-            'version': '1.0.0'
+            'version': '1.0.0',
+            'rate_limit': rate_limiter.get_stats()
         }
     }), 200
 
 @api_v1.route('/img/<file_token>', methods=['GET'])
+@rate_limited('num', default_tenant='2', route_class='image')
 def proxy_image(file_token):
     """
     图片代理接口
@@ -219,6 +628,11 @@ def proxy_image(file_token):
     Returns:
         图片数据流
     """
+    # 飞书文件令牌对应的文件内容不会改变，浏览器带着令牌作为 ETag 重新验证时直接返回 304
+    etag = f'"{file_token}"'
+    if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+        IMAGE_PROXY_RESPONSES.inc('client_cache')
+        return Response(status=304, headers={'ETag': etag, 'Cache-Control': 'public, max-age=3600'})
     try:
         logger.debug(f"开始代理图片，文件令牌: {file_token}")
         # 获取查询参数
@@ -242,14 +656,17 @@ def proxy_image(file_token):
             def generate():
                 for chunk in response.iter_content(chunk_size=8192):
                     if chunk:
+                        IMAGE_PROXY_BYTES.inc('upstream', amount=len(chunk))
                         yield chunk
 
             # 设置响应头
             response_headers = {
                 'Content-Type': content_type,
                 'Cache-Control': 'public, max-age=3600',  # 缓存1小时
+                'ETag': etag,
                 'Access-Control-Allow-Origin': '*'  # 允许跨域
             }
+            IMAGE_PROXY_RESPONSES.inc('upstream')
 
             if content_length:
                 response_headers['Content-Length'] = content_length
@@ -363,7 +780,10 @@ def update_sensor_data_to_feishu(humidity_temperature, tenant_num):
         # 4. 调用批量更新接口
         logger.info(f"更新传感器数据: {update_records}")
         update_result = feishu_service.batch_update_records('传感器', update_records)
-        return update_result.get('success', False)
+        if not update_result.get('success', False):
+            return False
+        tenant_service.notify_records_updated(tenant_num, '传感器', [record['record_id'] for record in update_records])
+        return True
         
     except Exception as e:
         logger.error(f"更新传感器数据异常: {str(e)}")
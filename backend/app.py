@@ -3,13 +3,21 @@ Flask应用主文件
 """
 import sys
 import os
-from flask import Flask, jsonify, render_template, send_from_directory
+from flask import Flask, jsonify, render_template, send_from_directory, request, make_response
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 import logging
 
 from config import config
-from api.routes import api_v1
+from api.routes import api_v1, load_farm_info, preload_image_urls, rate_limited
+from api.admin import admin
 from services.tenant_service import tenant_service
+from utils.compression import init_compression
+from utils.assets import AssetManifest, DIST_DIR, send_asset
+from utils.json_codec import FastJSONProvider
+from utils.metrics import init_request_metrics
+from utils.tracing import init_call_tracing
+from utils.profiler import init_profiler
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
@@ -20,7 +28,11 @@ def create_app():
     template_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'frontend', 'templates')
     static_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'frontend', 'static')
 
-    app = Flask(__name__, template_folder=template_dir, static_folder=static_dir)
+    # 静态文件由下方的 static_files 路由提供，不注册 Flask 默认的 static 路由（两者地址相同时默认路由优先）
+    app = Flask(__name__, template_folder=template_dir, static_folder=None)
+    
+    # jsonify 使用 orjson（未安装时回退到 ujson、标准库）
+    app.json = FastJSONProvider(app)
     
     # 配置应用
     app.config['SECRET_KEY'] = config.SECRET_KEY
@@ -29,11 +41,33 @@ def create_app():
     # 启用CORS
     CORS(app)
     
+    # 部署在 nginx 之后时只信任最后 TRUSTED_PROXY_COUNT 层代理追加的 X-Forwarded-For 地址
+    if config.TRUST_PROXY_HEADERS:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=config.TRUSTED_PROXY_COUNT)
+    
+    # JSON、HTML 等文本响应按 Accept-Encoding 压缩
+    if config.COMPRESS_ENABLED:
+        init_compression(app, min_size=config.COMPRESS_MIN_SIZE)
+    
+    # 按路由记录接口耗时，通过 /metrics 查看
+    init_request_metrics(app)
+    
+    # 飞书调用按接口路由记录来源，通过 /api/v1/admin/feishu/calls 查看
+    init_call_tracing(app)
+    
+    # 按需启用的采样分析器，未启用时不采样，通过 /api/v1/admin/profiler 控制
+    init_profiler(app)
+    
     # 配置日志
     setup_logging(app)
     
+    # 模板通过 asset_url() 引用带内容哈希的静态资源
+    assets = AssetManifest(static_dir)
+    app.jinja_env.globals['asset_url'] = assets.url
+    
     # 注册蓝图
     app.register_blueprint(api_v1)
+    app.register_blueprint(admin)
     
     # 初始化多租户系统
     init_multi_tenant_system(app)
@@ -44,10 +78,30 @@ def create_app():
         return render_template(f'{filename}.html')
 
 
+    # 服务端渲染的农户详情页，页面数据随HTML一起下发，省去一次 /farm/info 请求
+    @app.route('/farm/<product_id>')
+    @rate_limited('num', route_class='page')
+    def farm_page(product_id):
+        tenant_num = request.args.get('num') or 1
+        response_data, status = load_farm_info(tenant_num, product_id)
+        html = render_template('index.html', farm_payload=response_data, product_id=product_id,
+                               tenant_num=str(tenant_num), static_url='/static')
+        response = make_response(html, status)
+        if response_data.get('data'):
+            # 通过 Link 头让浏览器在解析页面前开始下载首屏图片
+            links = [f'<{url}>; rel=preload; as=image' for url in preload_image_urls(response_data['data'])]
+            if links:
+                response.headers['Link'] = ', '.join(links)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
     # 静态文件路由
     @app.route('/static/<path:filename>')
     def static_files(filename):
-        return send_from_directory(app.static_folder, filename)
+        if filename.startswith(f'{DIST_DIR}/'):
+            # 带内容哈希的资源永久缓存，并优先返回预压缩文件
+            return send_asset(static_dir, filename, request.headers.get('Accept-Encoding'))
+        return send_from_directory(static_dir, filename)
     
     # 错误处理
     @app.errorhandler(404)
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""JSON 编解码性能对比脚本
+
+使用与线上结构一致的农户详情响应和缓存数据，对比标准库 json、ujson、orjson 的编解码耗时，
+以及 utils.json_codec 当前选用的实现。未安装的实现自动跳过。
+
+    cd backend && python bench_json.py --number 2000
+"""
+
+import sys
+import os
+import json
+import timeit
+from typing import Callable, Dict, List, Tuple
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils import json_codec
+
+
+def farm_payload(feeding_count: int = 20, process_count: int = 8) -> Dict:
+    """构造一条 /farm/info 响应"""
+    image = {'file_token': 'boxcnrHpsg1QDqXAAAyachabcef', 'name': '喂养照片.jpg', 'size': 204800,
+             'type': 'image/jpeg', 'url': 'https://open.feishu.cn/open-apis/drive/v1/medias/boxcn/download'}
+    return {
+        'code': 0,
+        'message': 'success',
+        'data': {
+            'sensor': {'温度': '26.0', '湿度': '47.0', '光照': '1200', '氨气浓度': '3.2'},
+            'product_info': {
+                '标题': '云南泽铁苗寨土鸡', '商品名称': '农家散养土鸡', '是否有机': '有机', '国产/进口': '国产',
+                '饲养农户': '张三', '养殖企业': '昆明远纳农业发展有限公司', '鸡舍地址': '云南省昆明市寻甸县泽铁村',
+                '监控地址': 'https://srs.pxact.com/live/vbld6mb2kh.m3u8', '封面图': [image],
+                '第一次查询时间': '2025-07-01 18:45:16', '产品介绍': '林下散养三百天，喂食玉米、稻谷和野草。' * 5
+            },
+            'feeding_records': [{
+                'record_id': f'recuT3qmhc{i:04d}', 'food_name': '玉米', 'operator': '张三',
+                'operation_time': 1754444961181 + i, 'operation_time_formatted': '2025-08-06 09:49:21',
+                'created_time': 1754444961000, 'created_time_formatted': '2025-08-06 09:49:21',
+                'updated_time': 1754449882000, 'images': [image, image]
+            } for i in range(feeding_count)],
+            'breeding_process': [{
+                'record_id': f'recuT3qqrO{i:04d}', 'process_name': '防疫', 'operation_time': 1754444967842,
+                'operation_time_formatted': '2025-08-06 09:49:27', 'images': [image]
+            } for i in range(process_count)],
+            'statistics': {'feeding_count': 230, 'process_count': process_count},
+            'feeding_page': {'next_cursor': 'k:1754444961181:recuT3qmhc0019', 'has_more': True, 'page_size': 20},
+            'has_stream': True
+        }
+    }
+
+
+def cache_entries(farmer_count: int = 2000) -> Dict:
+    """构造租户缓存中的典型数据"""
+    return {
+        'tenant_info': {'tenant_num': '1', 'tenant_name': '昆明远纳农业发展有限公司', 'app_token': 'KnOFbTu1harM6wsNbWdcro2Rnoc',
+                        'personal_base_token': 'pt-xxxxxxxxxxxxxxxxxxxxxxxx', 'authorized_count': 1000,
+                        'cached_at': '2025-08-06T09:49:21.123456'},
+        'farmer_ids': {'farmer_ids': [f'recuT512gz{i:04d}' for i in range(farmer_count)],
+                       'authorized_count': farmer_count, 'total_count': farmer_count,
+                       'cached_at': '2025-08-06T09:49:21.123456'},
+    }
+
+
+def implementations() -> List[Tuple[str, Callable, Callable]]:
+    """返回已安装的 (名称, 编码函数, 解码函数)"""
+    impls = [('json', lambda obj: json.dumps(obj, ensure_ascii=False).encode('utf-8'), json.loads)]
+    if json_codec.ujson is not None:
+        impls.append(('ujson', lambda obj: json_codec.ujson.dumps(obj, ensure_ascii=False).encode('utf-8'),
+                      json_codec.ujson.loads))
+    if json_codec.orjson is not None:
+        impls.append(('orjson', json_codec.orjson.dumps, json_codec.orjson.loads))
+    impls.append((f'json_codec({json_codec.BACKEND})', json_codec.dumps_bytes, json_codec.loads))
+    return impls
+
+
+def run(number: int) -> List[Dict]:
+    """对每个数据集和实现分别计时，返回每次调用的平均耗时（微秒）"""
+    datasets = {'farm_info': farm_payload(), **cache_entries()}
+    results = []
+    for dataset, obj in datasets.items():
+        for name, encode, decode in implementations():
+            encoded = encode(obj)
+            results.append({
+                'dataset': dataset,
+                'impl': name,
+                'size': len(encoded),
+                'dumps_us': timeit.timeit(lambda: encode(obj), number=number) / number * 1e6,
+                'loads_us': timeit.timeit(lambda: decode(encoded), number=number) / number * 1e6,
+            })
+    return results
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='对比 JSON 编解码实现的性能')
+    parser.add_argument('--number', '-n', type=int, default=1000, help='每项测试的调用次数')
+    args = parser.parse_args()
+
+    print(f"{'数据':<12}{'实现':<22}{'字节数':>8}{'dumps(μs)':>12}{'loads(μs)':>12}")
+    for row in run(args.number):
+        print(f"{row['dataset']:<12}{row['impl']:<22}{row['size']:>8}{row['dumps_us']:>12.1f}{row['loads_us']:>12.1f}")
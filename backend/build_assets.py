@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""静态资源构建脚本
+
+将 frontend/static 下的 CSS、JS 等文本资源复制到 frontend/static/dist/，文件名带内容哈希，
+同时生成 .gz（以及安装了 Brotli 时的 .br）预压缩文件和 manifest.json。
+模板通过 asset_url() 引用资源，构建后自动指向带哈希的文件，可永久缓存。
+
+输出目录结构:
+    dist/<dir>/<name>.<hash>.<ext>        带内容哈希的资源
+    dist/<dir>/<name>.<hash>.<ext>.gz     gzip 预压缩
+    dist/<dir>/<name>.<hash>.<ext>.br     brotli 预压缩
+    dist/manifest.json                    {源文件路径: 带哈希的文件路径}
+
+不再被引用的旧版本文件会被删除。
+"""
+
+import sys
+import os
+import json
+import gzip
+import hashlib
+import logging
+from typing import Dict
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.assets import DIST_DIR, MANIFEST_FILE
+from utils.compression import brotli
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'frontend', 'static')
+
+# 需要构建的资源类型，图片等二进制文件不压缩
+ASSET_EXTENSIONS = ('.js', '.css', '.svg', '.json')
+
+
+def write_file(path: str, content: bytes):
+    """原子写入文件，避免服务读到写了一半的文件"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def fingerprint(path: str, content: bytes) -> str:
+    """在文件名中加入内容哈希: js/main.js -> js/main.<hash>.js"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.{hashlib.sha256(content).hexdigest()[:12]}{ext}"
+
+
+def build_assets(static_dir: str = STATIC_DIR) -> Dict[str, str]:
+    """构建全部静态资源
+
+    Args:
+        static_dir: 静态资源目录
+
+    Returns:
+        Dict: {源文件路径: 带哈希的文件路径}
+    """
+    dist_dir = os.path.join(static_dir, DIST_DIR)
+    assets = {}
+    for root, dirs, files in os.walk(static_dir):
+        if os.path.abspath(root) == os.path.abspath(static_dir):
+            dirs[:] = [d for d in dirs if d != DIST_DIR]
+        for name in sorted(files):
+            if not name.endswith(ASSET_EXTENSIONS):
+                continue
+            source = os.path.join(root, name)
+            path = os.path.relpath(source, static_dir).replace(os.sep, '/')
+            with open(source, 'rb') as f:
+                content = f.read()
+            target = fingerprint(path, content)
+            target_path = os.path.join(dist_dir, target)
+            assets[path] = target
+            if os.path.exists(target_path):
+                continue
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            # 构建时只压缩一次，使用最高压缩级别
+            write_file(f"{target_path}.gz", gzip.compress(content, compresslevel=9, mtime=0))
+            if brotli is not None:
+                write_file(f"{target_path}.br", brotli.compress(content, quality=11))
+            write_file(target_path, content)
+            logger.info(f"构建资源 {path} -> {target}")
+
+    # 删除旧版本文件
+    current = set(assets.values())
+    for root, _, files in os.walk(dist_dir):
+        for name in files:
+            path = os.path.relpath(os.path.join(root, name), dist_dir).replace(os.sep, '/')
+            base = path[:-3] if path.endswith(('.gz', '.br')) else path
+            if base != MANIFEST_FILE and base not in current:
+                os.remove(os.path.join(root, name))
+
+    write_file(os.path.join(dist_dir, MANIFEST_FILE),
+               json.dumps({'assets': assets}, ensure_ascii=False, indent=2, sort_keys=True).encode('utf-8'))
+    return assets
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='构建带内容哈希和预压缩的静态资源')
+    parser.add_argument('--static-dir', default=STATIC_DIR, help='静态资源目录')
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    assets = build_assets(args.static_dir)
+    print(f"✓ 已构建 {len(assets)} 个静态资源")
@@ -25,6 +25,36 @@ class Config:
     # 缓存更新配置 分钟
     CACHE_UPDATE_INTERVAL = int(os.environ.get('CACHE_UPDATE_INTERVAL', 60))
     REDIS_DB_PATH = os.environ.get('REDIS_DB_PATH', 'cache.db')
+    # 缓存后端：redislite（默认，进程内嵌 redis-server）、redis（CACHE_REDIS_URL，多台服务器共用）、
+    # sqlite（CACHE_SQLITE_PATH，同一台机器的多个进程共用）、memory（进程内，仅用于测试和开发）
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'redislite')
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', '')
+    CACHE_SQLITE_PATH = os.environ.get('CACHE_SQLITE_PATH', 'cache.sqlite3')
+    # 进程内缓存当前缓存版本号的时间（秒），缓存刷新切换版本后其他进程最迟在该时间后读到新版本
+    CACHE_GENERATION_CHECK_INTERVAL = float(os.environ.get('CACHE_GENERATION_CHECK_INTERVAL', 1))
+    
+    # 本地副本配置
+    # LOCAL_REPLICA_ENABLED 控制调度器是否同步副本，FEISHU_READ_MODE=replica 时查询优先读取副本
+    LOCAL_REPLICA_ENABLED = os.environ.get('LOCAL_REPLICA_ENABLED', 'False').lower() == 'true'
+    REPLICA_DB_DIR = os.environ.get('REPLICA_DB_DIR', 'replica')
+    FEISHU_READ_MODE = os.environ.get('FEISHU_READ_MODE', 'remote')
+    # 副本增量同步间隔、全量校对间隔 分钟
+    REPLICA_SYNC_INTERVAL = int(os.environ.get('REPLICA_SYNC_INTERVAL', 5))
+    REPLICA_FULL_SYNC_INTERVAL = int(os.environ.get('REPLICA_FULL_SYNC_INTERVAL', 1440))
+    
+    # 飞书接口超时 秒
+    FEISHU_TIMEOUT = float(os.environ.get('FEISHU_TIMEOUT', 10))
+    # 飞书读请求超过该操作近期 p95 耗时仍未返回时发出一次对冲请求，对冲等待时间不低于 FEISHU_HEDGE_MIN_DELAY 秒
+    FEISHU_HEDGE_ENABLED = os.environ.get('FEISHU_HEDGE_ENABLED', 'True').lower() == 'true'
+    FEISHU_HEDGE_MIN_DELAY = float(os.environ.get('FEISHU_HEDGE_MIN_DELAY', 0.2))
+    # 飞书调用记录的环形缓冲区大小（条），用于管理接口按租户、来源接口统计调用量
+    FEISHU_TRACE_SIZE = int(os.environ.get('FEISHU_TRACE_SIZE', 5000))
+    # 农户详情接口的时间预算 秒（0 表示不限制），超时未返回的饲喂记录、养殖流程、传感器数据不返回并在 omitted_sections 中标记
+    FARM_INFO_DEADLINE = float(os.environ.get('FARM_INFO_DEADLINE', 3))
+    
+    # 飞书事件订阅配置（多维表格变更事件回调）
+    FEISHU_EVENT_VERIFICATION_TOKEN = os.environ.get('FEISHU_EVENT_VERIFICATION_TOKEN')
+    FEISHU_EVENT_ENCRYPT_KEY = os.environ.get('FEISHU_EVENT_ENCRYPT_KEY')
     
     # Flask应用配置
     FLASK_ENV = os.environ.get('FLASK_ENV', 'development')
@@ -39,11 +69,45 @@ class Config:
     # 缓存配置
     CACHE_TIMEOUT = int(os.environ.get('CACHE_TIMEOUT', 3000))
     
-    # API限流配置
+    # 不存在产品ID的负缓存有效期 秒，有效期内直接返回 404 不再请求飞书
+    NEGATIVE_CACHE_TTL = int(os.environ.get('NEGATIVE_CACHE_TTL', 300))
+    
+    # 产品ID对应的饲养农户名称在进程内的缓存有效期 秒（0 表示不缓存），农户改名后最多延迟该时间生效
+    FARMER_NAME_TTL = int(os.environ.get('FARMER_NAME_TTL', 300))
+    
+    # 响应压缩配置：JSON、HTML 等文本响应超过最小长度（字节）时按 Accept-Encoding 使用 brotli 或 gzip 压缩
+    COMPRESS_ENABLED = os.environ.get('COMPRESS_ENABLED', 'True').lower() == 'true'
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+    
+    # 农户详情接口预序列化响应的有效期 秒（0 表示不缓存），数据变更事件、传感器数据写入、副本同步和缓存刷新会使缓存提前失效
+    PAYLOAD_CACHE_TTL = int(os.environ.get('PAYLOAD_CACHE_TTL', 60))
+    
+    # 农户详情接口首屏返回的饲喂记录条数，其余通过分页接口按需加载
+    FEEDING_PAGE_SIZE = int(os.environ.get('FEEDING_PAGE_SIZE', 10))
+    
+    # API限流配置（滑动窗口，0 表示不限制）
+    # API_RATE_LIMIT 为单个客户端IP在窗口内的请求数，TENANT_RATE_LIMIT 为单个租户在窗口内的请求总数
     API_RATE_LIMIT = int(os.environ.get('API_RATE_LIMIT', 100))
+    TENANT_RATE_LIMIT = int(os.environ.get('TENANT_RATE_LIMIT', 1000))
+    # 服务端渲染页面单个IP的额度（租户额度同 TENANT_RATE_LIMIT，单独计数）
+    PAGE_RATE_LIMIT = int(os.environ.get('PAGE_RATE_LIMIT', 60))
+    # 图片代理单个IP、单个租户的额度，一次页面访问会请求多张图片
+    IMAGE_RATE_LIMIT = int(os.environ.get('IMAGE_RATE_LIMIT', 1000))
+    IMAGE_TENANT_RATE_LIMIT = int(os.environ.get('IMAGE_TENANT_RATE_LIMIT', 20000))
+    # 限流窗口 秒
+    API_RATE_LIMIT_WINDOW = int(os.environ.get('API_RATE_LIMIT_WINDOW', 60))
+    # 部署在 nginx 之后时开启，按 X-Forwarded-For 中由 TRUSTED_PROXY_COUNT 层代理追加的地址取客户端IP；
+    # 直接对外提供服务时必须关闭，否则客户端可伪造 X-Forwarded-For 绕过限流
+    TRUST_PROXY_HEADERS = os.environ.get('TRUST_PROXY_HEADERS', 'False').lower() == 'true'
+    TRUSTED_PROXY_COUNT = int(os.environ.get('TRUSTED_PROXY_COUNT', 1))
     
     # 安全配置
     SECRET_KEY = os.environ.get('SECRET_KEY', 'default_secret_key')
+    # 管理接口（/metrics、/api/v1/admin/*）的访问令牌，请求头 Authorization: Bearer <令牌>；为空时管理接口不启用
+    ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')
+    # 采样分析器（/api/v1/admin/profiler）的结果目录和单次最长采样时间 秒
+    PROFILER_OUTPUT_DIR = os.environ.get('PROFILER_OUTPUT_DIR', 'logs/profiles')
+    PROFILER_MAX_SECONDS = int(os.environ.get('PROFILER_MAX_SECONDS', 600))
     # 视频后缀
     VIDEO_SUFFIX = os.environ.get('VIDEO_SUFFIX', '.m3u8')
     
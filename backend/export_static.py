@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""静态快照导出脚本
+
+按租户遍历授权农户，将农户详情页（index.html）及其 /farm/info 数据预渲染为静态文件，
+由 nginx 直接提供扫码访问，不再经过 Flask、redislite 和飞书。
+
+输出目录结构:
+    <output>/<tenant_num>/<product_id>.html              农户详情页（地址固定，短缓存）
+    <output>/<tenant_num>/data/<product_id>.<hash>.json  农户数据（文件名带内容哈希，可长期缓存）
+    <output>/<tenant_num>/sensor.json                    租户共用的传感器数据（每次导出都更新，短缓存）
+    <output>/<tenant_num>/manifest.json                  已导出农户的内容哈希，用于增量导出
+
+传感器数据为租户内全部农户共用且变化频繁，不计入农户数据哈希，否则每次温湿度变化都会重新渲染全部页面。
+饲喂记录与 /farm/info 一样只导出第一页（FEEDING_PAGE_SIZE），后续记录由页面通过分页接口加载。
+"""
+
+import sys
+import os
+import json
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from jinja2 import Environment, FileSystemLoader
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from api.routes import format_farm_data
+from config import config
+from services.tenant_service import tenant_service
+from utils.assets import AssetManifest
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'frontend', 'templates')
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'frontend', 'static')
+PAGE_TEMPLATE = 'index.html'
+MANIFEST_FILE = 'manifest.json'
+SENSOR_FILE = 'sensor.json'
+
+
+def content_hash(content: bytes) -> str:
+    """计算内容哈希（sha256 前12位）"""
+    return hashlib.sha256(content).hexdigest()[:12]
+
+
+def write_file(path: str, content: bytes):
+    """原子写入文件，避免 nginx 读到写了一半的文件"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+class StaticSnapshotExporter:
+    """农户详情页静态快照导出器"""
+
+    def __init__(self, output_dir: str, template_dir: str = TEMPLATE_DIR, base_url: str = '/snapshots',
+                 static_url: str = '/static', workers: int = 4, chunk_size: int = 50,
+                 static_dir: str = STATIC_DIR):
+        """
+        Args:
+            output_dir: 输出目录
+            template_dir: 模板目录
+            base_url: 输出目录对外访问的地址前缀，页面按该前缀引用数据文件
+            static_url: 页面引用的静态资源地址前缀
+            workers: 并行导出的线程数
+            chunk_size: 每次批量查询的农户数量
+            static_dir: 静态资源目录，页面按其中的资源清单引用带内容哈希的文件
+        """
+        self.output_dir = output_dir
+        self.base_url = base_url.rstrip('/')
+        self.static_url = static_url
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.env = Environment(loader=FileSystemLoader(template_dir), autoescape=True)
+        assets = AssetManifest(static_dir)
+        self.env.globals['asset_url'] = assets.url
+        with open(os.path.join(template_dir, PAGE_TEMPLATE), 'rb') as f:
+            # 模板或静态资源地址变化时需要重新渲染全部页面
+            self.template_hash = content_hash(
+                f.read() + f"{self.base_url}|{static_url}|{assets.digest()}".encode('utf-8'))
+
+    def _tenant_dir(self, tenant_num: str) -> str:
+        return os.path.join(self.output_dir, str(tenant_num))
+
+    def load_manifest(self, tenant_num: str) -> Dict:
+        """读取租户的导出清单"""
+        path = os.path.join(self._tenant_dir(tenant_num), MANIFEST_FILE)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'template_hash': None, 'farms': {}}
+
+    def render_page(self, tenant_num: str, product_id: str, data_url: str) -> bytes:
+        """渲染农户详情页"""
+        template = self.env.get_template(PAGE_TEMPLATE)
+        html = template.render(
+            farm_data_url=data_url,
+            sensor_data_url=f"{self.base_url}/{tenant_num}/{SENSOR_FILE}",
+            product_id=product_id,
+            tenant_num=str(tenant_num),
+            static_url=self.static_url
+        )
+        return html.encode('utf-8')
+
+    def _export_farm(self, tenant_num: str, product_id: str, farm_data: Dict, previous: Optional[Dict],
+                     template_changed: bool) -> Dict:
+        """导出单个农户，数据和模板均未变化时跳过"""
+        tenant_dir = self._tenant_dir(tenant_num)
+        data = format_farm_data(farm_data)
+        # 传感器数据单独导出到 sensor.json
+        data.pop('sensor', None)
+        payload = json.dumps({'code': 0, 'message': 'success', 'data': data},
+                             ensure_ascii=False, sort_keys=True).encode('utf-8')
+        data_hash = content_hash(payload)
+        data_file = f"data/{product_id}.{data_hash}.json"
+        html_file = f"{product_id}.html"
+
+        data_changed = not previous or previous.get('hash') != data_hash
+        if not data_changed and not template_changed \
+                and os.path.exists(os.path.join(tenant_dir, data_file)) \
+                and os.path.exists(os.path.join(tenant_dir, html_file)):
+            return {'entry': previous, 'status': 'unchanged'}
+
+        write_file(os.path.join(tenant_dir, data_file), payload)
+        data_url = f"{self.base_url}/{tenant_num}/{data_file}"
+        write_file(os.path.join(tenant_dir, html_file), self.render_page(tenant_num, product_id, data_url))
+        entry = {
+            'hash': data_hash,
+            'data': data_file,
+            'html': html_file,
+            'rendered_at': datetime.now().isoformat()
+        }
+        return {'entry': entry, 'status': 'rendered'}
+
+    def _export_chunk(self, tenant_num: str, product_ids: List[str], manifest: Dict,
+                      template_changed: bool) -> Dict:
+        """批量查询一组农户的数据并导出"""
+        result = tenant_service.get_tenant_farms_info(tenant_num, product_ids,
+                                                      feeding_page_size=config.FEEDING_PAGE_SIZE)
+        if not result['success']:
+            logger.error(f"获取农户数据失败 {tenant_num}: {result['message']}")
+            return {'entries': {}, 'failed': list(product_ids), 'missing': [], 'sensor': None}
+
+        entries = {}
+        failed = []
+        stats = {'rendered': 0, 'unchanged': 0}
+        sensor = None
+        for product_id, farm_data in result['data']['items'].items():
+            if farm_data.get('omitted_sections'):
+                # 数据不完整时保留上一次导出的页面
+                logger.error(f"农户数据不完整 {tenant_num}/{product_id}: {farm_data['omitted_sections']}")
+                failed.append(product_id)
+                continue
+            sensor = farm_data.get('sensor', {})
+            try:
+                exported = self._export_farm(tenant_num, product_id, farm_data,
+                                             manifest['farms'].get(product_id), template_changed)
+                entries[product_id] = exported['entry']
+                stats[exported['status']] += 1
+            except Exception as e:
+                logger.error(f"导出农户页面失败 {tenant_num}/{product_id}: {str(e)}")
+                failed.append(product_id)
+        return {'entries': entries, 'failed': failed, 'missing': result['data']['missing'],
+                'sensor': sensor, **stats}
+
+    @staticmethod
+    def _remove(tenant_dir: str, relative_path: str):
+        try:
+            os.remove(os.path.join(tenant_dir, relative_path))
+        except FileNotFoundError:
+            pass
+
+    def export_tenant(self, tenant_num: str, force: bool = False) -> Dict:
+        """导出指定租户的全部授权农户
+
+        Args:
+            tenant_num: 租户编号
+            force: 是否忽略导出清单，重新渲染全部农户
+
+        Returns:
+            Dict: 导出统计 rendered/unchanged/removed/failed
+        """
+        tenant_num = str(tenant_num)
+        stats = {'rendered': 0, 'unchanged': 0, 'removed': 0, 'failed': 0}
+        farmer_data = tenant_service.cache_service.get_farmer_ids(tenant_num)
+        if not farmer_data:
+            logger.warning(f"租户没有农户ID缓存: {tenant_num}")
+            return stats
+        farmer_ids = farmer_data.get('farmer_ids', [])
+
+        tenant_dir = self._tenant_dir(tenant_num)
+        os.makedirs(os.path.join(tenant_dir, 'data'), exist_ok=True)
+        previous_manifest = self.load_manifest(tenant_num)
+        manifest = {'template_hash': None, 'farms': {}} if force else previous_manifest
+        template_changed = manifest.get('template_hash') != self.template_hash
+
+        chunks = [farmer_ids[i:i + self.chunk_size] for i in range(0, len(farmer_ids), self.chunk_size)]
+        farms = {}
+        sensor = None
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(self._export_chunk, tenant_num, chunk, manifest, template_changed)
+                       for chunk in chunks]
+            for future in futures:
+                result = future.result()
+                farms.update(result['entries'])
+                if result['sensor'] is not None:
+                    sensor = result['sensor']
+                stats['rendered'] += result.get('rendered', 0)
+                stats['unchanged'] += result.get('unchanged', 0)
+                stats['failed'] += len(result['failed'])
+                # 查询失败的农户保留上一次导出的页面
+                for product_id in result['failed']:
+                    if product_id in previous_manifest['farms']:
+                        farms[product_id] = previous_manifest['farms'][product_id]
+
+        for product_id, entry in previous_manifest['farms'].items():
+            current = farms.get(product_id)
+            if current is None:
+                # 删除已取消授权或已删除的农户页面
+                self._remove(tenant_dir, entry['html'])
+                self._remove(tenant_dir, entry['data'])
+                stats['removed'] += 1
+            elif current['data'] != entry['data']:
+                # 删除旧版本的数据文件
+                self._remove(tenant_dir, entry['data'])
+
+        if sensor is not None:
+            write_file(os.path.join(tenant_dir, SENSOR_FILE),
+                       json.dumps({'code': 0, 'message': 'success', 'data': sensor},
+                                  ensure_ascii=False).encode('utf-8'))
+
+        manifest = {
+            'template_hash': self.template_hash,
+            'exported_at': datetime.now().isoformat(),
+            'farms': farms
+        }
+        write_file(os.path.join(tenant_dir, MANIFEST_FILE),
+                   json.dumps(manifest, ensure_ascii=False, indent=2).encode('utf-8'))
+        logger.info(f"租户 {tenant_num} 静态快照导出完成: {stats}")
+        return stats
+
+    def export_all(self, tenant_nums: Optional[List[str]] = None, force: bool = False) -> Dict[str, Dict]:
+        """导出多个租户，默认导出全部租户"""
+        if tenant_nums is None:
+            tenant_nums = tenant_service.cache_service.get_all_tenant_numbers()
+        return {str(tenant_num): self.export_tenant(tenant_num, force=force) for tenant_num in tenant_nums}
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='导出农户详情页静态快照')
+    parser.add_argument('--output', '-o', default='snapshots', help='输出目录')
+    parser.add_argument('--tenant', '-t', action='append', help='只导出指定租户，可重复指定')
+    parser.add_argument('--workers', '-w', type=int, default=4, help='并行线程数')
+    parser.add_argument('--base-url', default='/snapshots', help='输出目录对外访问的地址前缀')
+    parser.add_argument('--static-url', default='/static', help='页面引用的静态资源地址前缀')
+    parser.add_argument('--force', '-f', action='store_true', help='忽略导出清单，重新渲染全部农户')
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if not tenant_service.initialize_cache():
+        print("✗ 多租户缓存初始化失败")
+        sys.exit(1)
+
+    exporter = StaticSnapshotExporter(args.output, base_url=args.base_url, static_url=args.static_url,
+                                       workers=args.workers)
+    results = exporter.export_all(args.tenant, force=args.force)
+    for tenant_num, stats in results.items():
+        print(f"租户 {tenant_num}: 渲染 {stats['rendered']}，未变化 {stats['unchanged']}，"
+              f"删除 {stats['removed']}，失败 {stats['failed']}")
+    sys.exit(0 if all(stats['failed'] == 0 for stats in results.values()) else 1)
@@ -0,0 +1,563 @@
+"""缓存存储后端模块
+
+MultiTenantCacheService 通过 redis-py 的接口访问缓存，本模块按配置创建对应的客户端：
+- redislite: 每个进程启动一个内嵌的 redis-server（默认，单机部署）
+- redis: 连接独立部署的 Redis（CACHE_REDIS_URL），多台应用服务器共用一份缓存
+- sqlite: 单个 SQLite 文件，同一台机器上的多个进程共用，不需要 redis-server
+- memory: 进程内字典，用于测试和单进程开发环境
+
+sqlite 和 memory 实现了缓存服务用到的 Redis 命令子集（字符串、集合、哈希、过期时间、
+WATCH/MULTI/EXEC 事务），返回值与 redis-py 一致（值为 bytes）。
+"""
+
+import fnmatch
+import os
+import sqlite3
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from redis.exceptions import ResponseError, WatchError
+
+BACKENDS = ('redislite', 'redis', 'sqlite', 'memory')
+
+KIND_STRING = 'string'
+KIND_HASH = 'hash'
+KIND_SET = 'set'
+
+
+def create_cache_client(backend: str, db_path: str = None, url: str = None):
+    """创建缓存客户端
+
+    Args:
+        backend: 后端类型，取值见 BACKENDS
+        db_path: redislite、sqlite 的数据库文件路径
+        url: redis 的连接地址，如 redis://127.0.0.1:6379/0、unix:///tmp/redis.sock
+
+    Returns:
+        与 redis-py 接口兼容的客户端
+    """
+    if backend == 'redislite':
+        import redislite
+        return redislite.Redis(db_path)
+    if backend == 'redis':
+        import redis
+        if not url:
+            raise ValueError('使用 redis 缓存后端时需要配置 CACHE_REDIS_URL')
+        return redis.Redis.from_url(url)
+    if backend == 'sqlite':
+        return SQLiteCacheClient(db_path)
+    if backend == 'memory':
+        return MemoryCacheClient()
+    raise ValueError(f'不支持的缓存后端: {backend}，可选 {", ".join(BACKENDS)}')
+
+
+def _key(key) -> str:
+    return key.decode('utf-8') if isinstance(key, bytes) else str(key)
+
+
+def _value(value) -> bytes:
+    """按 redis-py 的规则将值转换为字节串"""
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, str):
+        return value.encode('utf-8')
+    if isinstance(value, float):
+        return repr(value).encode('utf-8')
+    return str(value).encode('utf-8')
+
+
+class LocalCacheClient:
+    """本地缓存客户端基类，子类只需实现键的读写
+
+    每个命令在 _transaction() 中执行，保证同一进程内命令的原子性；
+    WATCH 通过每个键的版本号实现，键每次被修改时版本号变化。
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._started = time.time()
+
+    # ---- 存储接口，由子类实现 ----
+
+    def _load(self, key: str) -> Optional[Tuple[str, Any, Optional[float]]]:
+        """读取键，返回 (类型, 值, 过期时间)"""
+        raise NotImplementedError
+
+    def _store(self, key: str, kind: str, value: Any, expire_at: Optional[float]):
+        raise NotImplementedError
+
+    def _remove(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def _all_keys(self) -> List[str]:
+        raise NotImplementedError
+
+    def _clear(self):
+        raise NotImplementedError
+
+    def _version(self, key: str) -> Optional[int]:
+        raise NotImplementedError
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            yield
+
+    # ---- 通用逻辑 ----
+
+    def _entry(self, key: str, kind: str = None):
+        entry = self._load(key)
+        if entry is None:
+            return None
+        if entry[2] is not None and entry[2] <= time.time():
+            self._remove(key)
+            return None
+        if kind is not None and entry[0] != kind:
+            raise ResponseError('WRONGTYPE Operation against a key holding the wrong kind of value')
+        return entry
+
+    def _live_keys(self) -> List[str]:
+        now = time.time()
+        keys = []
+        for key in self._all_keys():
+            entry = self._load(key)
+            if entry is not None and (entry[2] is None or entry[2] > now):
+                keys.append(key)
+        return keys
+
+    # ---- 通用命令 ----
+
+    def ping(self) -> bool:
+        return True
+
+    def exists(self, *keys) -> int:
+        with self._transaction():
+            return sum(1 for key in keys if self._entry(_key(key)) is not None)
+
+    def delete(self, *keys) -> int:
+        with self._transaction():
+            return sum(1 for key in keys if self._entry(_key(key)) is not None and self._remove(_key(key)))
+
+    def expire(self, key, seconds) -> bool:
+        with self._transaction():
+            entry = self._entry(_key(key))
+            if entry is None:
+                return False
+            self._store(_key(key), entry[0], entry[1], time.time() + int(seconds))
+            return True
+
+    def ttl(self, key) -> int:
+        with self._transaction():
+            entry = self._entry(_key(key))
+            if entry is None:
+                return -2
+            if entry[2] is None:
+                return -1
+            return max(int(round(entry[2] - time.time())), 0)
+
+    def keys(self, pattern: str = '*') -> List[bytes]:
+        pattern = _key(pattern)
+        with self._transaction():
+            return [key.encode('utf-8') for key in self._live_keys() if fnmatch.fnmatchcase(key, pattern)]
+
+    def scan_iter(self, match: str = None, count: int = None) -> Iterator[bytes]:
+        yield from self.keys(match or '*')
+
+    def dbsize(self) -> int:
+        with self._transaction():
+            return len(self._live_keys())
+
+    def flushall(self) -> bool:
+        with self._transaction():
+            self._clear()
+        return True
+
+    flushdb = flushall
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            'db0': {'keys': self.dbsize()},
+            'used_memory_human': 'N/A',
+            'uptime_in_seconds': int(time.time() - self._started)
+        }
+
+    def close(self):
+        pass
+
+    def pipeline(self, transaction: bool = True) -> 'LocalPipeline':
+        return LocalPipeline(self)
+
+    # ---- 字符串 ----
+
+    def get(self, key) -> Optional[bytes]:
+        with self._transaction():
+            entry = self._entry(_key(key), KIND_STRING)
+            return entry[1] if entry else None
+
+    def set(self, key, value, ex=None, px=None, nx: bool = False, xx: bool = False, keepttl: bool = False):
+        key = _key(key)
+        with self._transaction():
+            entry = self._entry(key)
+            if (nx and entry is not None) or (xx and entry is None):
+                return None
+            if ex is not None:
+                expire_at = time.time() + int(ex)
+            elif px is not None:
+                expire_at = time.time() + int(px) / 1000
+            elif keepttl and entry is not None:
+                expire_at = entry[2]
+            else:
+                expire_at = None
+            self._store(key, KIND_STRING, _value(value), expire_at)
+            return True
+
+    def incrby(self, key, amount: int = 1) -> int:
+        key = _key(key)
+        with self._transaction():
+            entry = self._entry(key, KIND_STRING)
+            try:
+                number = int(entry[1]) + amount if entry else amount
+            except ValueError:
+                raise ResponseError('value is not an integer or out of range')
+            self._store(key, KIND_STRING, str(number).encode('utf-8'), entry[2] if entry else None)
+            return number
+
+    def incr(self, key, amount: int = 1) -> int:
+        return self.incrby(key, amount)
+
+    # ---- 集合 ----
+
+    def sadd(self, key, *members) -> int:
+        key = _key(key)
+        with self._transaction():
+            entry = self._entry(key, KIND_SET)
+            current = set(entry[1]) if entry else set()
+            before = len(current)
+            current.update(_value(member) for member in members)
+            self._store(key, KIND_SET, current, entry[2] if entry else None)
+            return len(current) - before
+
+    def srem(self, key, *members) -> int:
+        key = _key(key)
+        with self._transaction():
+            entry = self._entry(key, KIND_SET)
+            if entry is None:
+                return 0
+            current = set(entry[1])
+            before = len(current)
+            current.difference_update(_value(member) for member in members)
+            if current:
+                self._store(key, KIND_SET, current, entry[2])
+            else:
+                self._remove(key)
+            return before - len(current)
+
+    def sismember(self, key, member) -> bool:
+        with self._transaction():
+            entry = self._entry(_key(key), KIND_SET)
+            return bool(entry) and _value(member) in entry[1]
+
+    def smembers(self, key) -> set:
+        with self._transaction():
+            entry = self._entry(_key(key), KIND_SET)
+            return set(entry[1]) if entry else set()
+
+    def scard(self, key) -> int:
+        return len(self.smembers(key))
+
+    # ---- 哈希 ----
+
+    def hset(self, key, field=None, value=None, mapping: Dict = None) -> int:
+        key = _key(key)
+        items = dict(mapping or {})
+        if field is not None:
+            items[field] = value
+        with self._transaction():
+            entry = self._entry(key, KIND_HASH)
+            current = dict(entry[1]) if entry else {}
+            added = 0
+            for item_field, item_value in items.items():
+                item_field = _value(item_field)
+                added += item_field not in current
+                current[item_field] = _value(item_value)
+            self._store(key, KIND_HASH, current, entry[2] if entry else None)
+            return added
+
+    def hget(self, key, field) -> Optional[bytes]:
+        with self._transaction():
+            entry = self._entry(_key(key), KIND_HASH)
+            return entry[1].get(_value(field)) if entry else None
+
+    def hmget(self, key, keys, *args) -> List[Optional[bytes]]:
+        fields = list(keys) if isinstance(keys, (list, tuple)) else [keys]
+        fields.extend(args)
+        with self._transaction():
+            entry = self._entry(_key(key), KIND_HASH)
+            values = entry[1] if entry else {}
+            return [values.get(_value(field)) for field in fields]
+
+    def hgetall(self, key) -> Dict[bytes, bytes]:
+        with self._transaction():
+            entry = self._entry(_key(key), KIND_HASH)
+            return dict(entry[1]) if entry else {}
+
+    def hincrby(self, key, field, amount: int = 1) -> int:
+        key = _key(key)
+        with self._transaction():
+            entry = self._entry(key, KIND_HASH)
+            current = dict(entry[1]) if entry else {}
+            number = int(current.get(_value(field), 0)) + amount
+            current[_value(field)] = str(number).encode('utf-8')
+            self._store(key, KIND_HASH, current, entry[2] if entry else None)
+            return number
+
+    def hdel(self, key, *fields) -> int:
+        key = _key(key)
+        with self._transaction():
+            entry = self._entry(key, KIND_HASH)
+            if entry is None:
+                return 0
+            current = dict(entry[1])
+            removed = sum(1 for field in fields if current.pop(_value(field), None) is not None)
+            if current:
+                self._store(key, KIND_HASH, current, entry[2])
+            else:
+                self._remove(key)
+            return removed
+
+    def hlen(self, key) -> int:
+        return len(self.hgetall(key))
+
+
+class LocalPipeline:
+    """本地客户端的管道，语义与 redis-py 一致
+
+    未调用 watch() 时命令进入队列，execute() 时在同一个事务中依次执行；
+    调用 watch() 后命令立即执行，直到 multi() 开始排队，execute() 时被监视的键有变化则抛出 WatchError。
+    """
+
+    def __init__(self, client: LocalCacheClient):
+        self.client = client
+        self._commands = []
+        self._watched = {}
+        self._immediate = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.reset()
+
+    def __getattr__(self, name: str):
+        if name.startswith('_') or not hasattr(self.client, name):
+            raise AttributeError(name)
+        command = getattr(self.client, name)
+        if self._immediate:
+            return command
+
+        def queue(*args, **kwargs):
+            self._commands.append((command, args, kwargs))
+            return self
+        return queue
+
+    def watch(self, *keys):
+        self._immediate = True
+        with self.client._transaction():
+            for key in keys:
+                self._watched[_key(key)] = self.client._version(_key(key))
+
+    def unwatch(self):
+        self._watched = {}
+
+    def multi(self):
+        self._immediate = False
+
+    def reset(self):
+        self._commands = []
+        self._watched = {}
+        self._immediate = False
+
+    def execute(self, raise_on_error: bool = True) -> List[Any]:
+        try:
+            with self.client._transaction():
+                for key, version in self._watched.items():
+                    if self.client._version(key) != version:
+                        raise WatchError('Watched variable changed.')
+                results = []
+                for command, args, kwargs in self._commands:
+                    try:
+                        results.append(command(*args, **kwargs))
+                    except ResponseError as e:
+                        results.append(e)
+        finally:
+            self.reset()
+        if raise_on_error:
+            for result in results:
+                if isinstance(result, ResponseError):
+                    raise result
+        return results
+
+
+class MemoryCacheClient(LocalCacheClient):
+    """进程内缓存"""
+
+    def __init__(self):
+        super().__init__()
+        self._data = {}
+        self._versions = {}
+        self._counter = 0
+
+    def _load(self, key):
+        return self._data.get(key)
+
+    def _store(self, key, kind, value, expire_at):
+        self._counter += 1
+        self._data[key] = (kind, value, expire_at)
+        self._versions[key] = self._counter
+
+    def _remove(self, key):
+        self._versions.pop(key, None)
+        return self._data.pop(key, None) is not None
+
+    def _all_keys(self):
+        return list(self._data)
+
+    def _clear(self):
+        self._data.clear()
+        self._versions.clear()
+
+    def _version(self, key):
+        self._entry(key)
+        return self._versions.get(key)
+
+
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    value BLOB NOT NULL,
+    expire_at REAL,
+    version INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_cache_entries_expire ON cache_entries(expire_at);
+CREATE TABLE IF NOT EXISTS cache_meta (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO cache_meta (name, value) VALUES ('version', 0);
+"""
+
+
+def _pack(items: List[bytes]) -> bytes:
+    """将字节串列表编码为 长度(4字节)+内容 的序列"""
+    return b''.join(struct.pack('>I', len(item)) + item for item in items)
+
+
+def _unpack(data: bytes) -> List[bytes]:
+    items, offset = [], 0
+    while offset < len(data):
+        (length,) = struct.unpack_from('>I', data, offset)
+        offset += 4
+        items.append(bytes(data[offset:offset + length]))
+        offset += length
+    return items
+
+
+class SQLiteCacheClient(LocalCacheClient):
+    """SQLite 文件缓存，同一台机器上的多个进程可以共用
+
+    每个命令在 BEGIN IMMEDIATE 事务中执行，跨进程同样是原子的；
+    过期的键在读取时删除，并在写入时定期批量清理。
+    """
+
+    # 批量清理过期键的间隔（秒）
+    PURGE_INTERVAL = 60
+
+    def __init__(self, db_path: str):
+        super().__init__()
+        self.db_path = db_path
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        # 所有命令都在 self._lock 内执行，单个连接即可
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(_SQLITE_SCHEMA)
+        self._depth = 0
+        self._purged_at = 0.0
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            if self._depth:
+                self._depth += 1
+                try:
+                    yield
+                finally:
+                    self._depth -= 1
+                return
+            self._conn.execute('BEGIN IMMEDIATE')
+            self._depth = 1
+            try:
+                yield
+            except BaseException:
+                self._depth = 0
+                self._conn.execute('ROLLBACK')
+                raise
+            self._depth = 0
+            self._conn.execute('COMMIT')
+
+    def _load(self, key):
+        row = self._conn.execute('SELECT kind, value, expire_at FROM cache_entries WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        kind, value, expire_at = row
+        value = bytes(value)
+        if kind == KIND_HASH:
+            items = _unpack(value)
+            value = dict(zip(items[::2], items[1::2]))
+        elif kind == KIND_SET:
+            value = set(_unpack(value))
+        return kind, value, expire_at
+
+    def _store(self, key, kind, value, expire_at):
+        if kind == KIND_HASH:
+            value = _pack([item for pair in value.items() for item in pair])
+        elif kind == KIND_SET:
+            value = _pack(sorted(value))
+        self._conn.execute(
+            'INSERT OR REPLACE INTO cache_entries (key, kind, value, expire_at, version) VALUES (?, ?, ?, ?, ?)',
+            (key, kind, sqlite3.Binary(value), expire_at, self._next_version()))
+        now = time.time()
+        if now - self._purged_at > self.PURGE_INTERVAL:
+            self._purged_at = now
+            self._conn.execute('DELETE FROM cache_entries WHERE expire_at IS NOT NULL AND expire_at <= ?', (now,))
+
+    def _next_version(self) -> int:
+        self._conn.execute("UPDATE cache_meta SET value = value + 1 WHERE name = 'version'")
+        return self._conn.execute("SELECT value FROM cache_meta WHERE name = 'version'").fetchone()[0]
+
+    def _remove(self, key):
+        return self._conn.execute('DELETE FROM cache_entries WHERE key = ?', (key,)).rowcount > 0
+
+    def _all_keys(self):
+        return [row[0] for row in self._conn.execute('SELECT key FROM cache_entries')]
+
+    def _live_keys(self):
+        return [row[0] for row in self._conn.execute(
+            'SELECT key FROM cache_entries WHERE expire_at IS NULL OR expire_at > ?', (time.time(),))]
+
+    def _clear(self):
+        self._conn.execute('DELETE FROM cache_entries')
+
+    def _version(self, key):
+        self._entry(key)
+        row = self._conn.execute('SELECT version FROM cache_entries WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
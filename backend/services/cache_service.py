@@ -5,54 +5,313 @@
 - 租户表数据缓存  
 - 农户ID列表缓存
 - 缓存更新机制
+- 飞书事件去重
+- 不存在产品ID的负缓存
+- 接口限流计数
+- 预序列化的接口响应
+
+租户信息、表信息、农户ID列表按版本（generation）存储，键名形如 tenant:<版本>:<租户编号>，
+版本 0 沿用不带版本的旧键名。缓存刷新把新数据全部写入新版本后再原子切换当前版本指针，
+读请求始终读到某一完整版本；上一版本保留到下次刷新，可以立即回滚。
+
+各命名空间（键名第一段，如 tenant、farmer_ids、payload）的命中率、读写耗时、写入值大小和回收数量
+记录在 utils.metrics 中，通过管理接口的缓存统计和 /metrics 查看。
+
+租户信息、表信息和农户ID列表使用 utils.cache_codec 的紧凑二进制格式存储，
+读取到旧的 JSON 字符串时自动改写为新格式。
 """
 
 import os
-import json
 import time
-import threading
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime, timedelta
-import redislite
+from redis.exceptions import WatchError
 import logging
 
+from config import config
+from services.cache_backends import create_cache_client
+from utils import cache_codec
+from utils.metrics import metrics, SIZE_BUCKETS
+
 logger = logging.getLogger(__name__)
 
+CACHE_REQUESTS = metrics.counter('cache_requests_total', '缓存读取次数，result 为 hit 或 miss', ('namespace', 'result'))
+CACHE_LATENCY = metrics.histogram('cache_operation_seconds', '缓存读写耗时（秒）', ('namespace', 'operation'))
+CACHE_VALUE_BYTES = metrics.histogram('cache_value_bytes', '写入缓存的值大小（字节）', ('namespace',), buckets=SIZE_BUCKETS)
+CACHE_EVICTIONS = metrics.counter('cache_evictions_total', '主动删除的缓存键数量', ('reason',))
+
+
+def _hit_ratios() -> Dict[tuple, float]:
+    """各命名空间本进程启动以来的命中率"""
+    totals = {}
+    for (namespace, result), count in CACHE_REQUESTS.collect().items():
+        hits, total = totals.get(namespace, (0, 0))
+        totals[namespace] = (hits + (count if result == 'hit' else 0), total + count)
+    return {(namespace,): hits / total for namespace, (hits, total) in totals.items() if total}
+
+
+metrics.gauge('cache_hit_ratio', '缓存命中率（本进程启动以来）', ('namespace',), func=_hit_ratios)
+
+
+def _namespace(key: str) -> str:
+    """缓存键的命名空间，即第一个冒号之前的部分"""
+    return key.split(':', 1)[0]
+
+
+def _record_read(namespace: str, started: float, hit: bool):
+    """记录一次缓存读取的耗时和命中情况"""
+    CACHE_LATENCY.observe(time.perf_counter() - started, namespace, 'get')
+    CACHE_REQUESTS.inc(namespace, 'hit' if hit else 'miss')
+
+
 class MultiTenantCacheService:
     """多租户缓存服务类"""
     
-    def __init__(self, db_path: str = None):
+    def __init__(self, db_path: str = None, backend: str = None, url: str = None,
+                 generation_check_interval: float = None):
         """初始化缓存服务
         
         Args:
-            db_path: Redis数据库文件路径，默认为项目根目录下的cache.db
+            db_path: redislite/sqlite 数据库文件路径，默认为项目根目录下的 REDIS_DB_PATH/CACHE_SQLITE_PATH
+            backend: 缓存后端 redislite、redis、sqlite、memory，默认为 CACHE_BACKEND
+            url: redis 后端的连接地址，默认为 CACHE_REDIS_URL
+            generation_check_interval: 重新读取当前缓存版本的间隔（秒），默认为 CACHE_GENERATION_CHECK_INTERVAL
         """
-        if db_path is None:
+        self.backend = backend or config.CACHE_BACKEND
+        if db_path is None and self.backend in ('redislite', 'sqlite'):
             project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-            db_path = os.path.join(project_root, 'cache.db')
+            db_name = config.REDIS_DB_PATH if self.backend == 'redislite' else config.CACHE_SQLITE_PATH
+            db_path = os.path.join(project_root, db_name)
             
-        self.redis_client = redislite.Redis(db_path)
-        self._lock = threading.Lock()
+        self.redis_client = create_cache_client(self.backend, db_path, url or config.CACHE_REDIS_URL)
         
         # 缓存键前缀
         self.TENANT_PREFIX = "tenant:"
         self.TENANT_TABLES_PREFIX = "tenant_tables:"
         self.FARMER_IDS_PREFIX = "farmer_ids:"
         self.SYSTEM_PREFIX = "system:"
+        self.EVENT_PREFIX = "feishu_event:"
+        self.KNOWN_FARMERS_PREFIX = "known_farmers:"
+        self.MISSING_PRODUCT_PREFIX = "missing_product:"
+        self.RATE_LIMIT_PREFIX = "rate_limit:"
+        self.RATE_LIMITED_KEY = "rate_limited"
+        self.PAYLOAD_PREFIX = "payload:"
+        self.PAYLOAD_GENERATION_PREFIX = "payload_gen:"
+        # 已缓存的租户编号集合，枚举租户时不必扫描全部键（版本 N 的集合为 system:tenants:N）
+        self.TENANT_REGISTRY_KEY = f"{self.SYSTEM_PREFIX}tenants"
+        # 缓存版本：当前版本指针、回滚用的上一版本、版本号计数器、尚未回收的版本集合
+        self.GENERATION_KEY = f"{self.SYSTEM_PREFIX}generation"
+        self.PREVIOUS_GENERATION_KEY = f"{self.SYSTEM_PREFIX}generation:previous"
+        self.GENERATION_COUNTER_KEY = f"{self.SYSTEM_PREFIX}generation:counter"
+        self.GENERATIONS_KEY = f"{self.SYSTEM_PREFIX}generations"
+        # 按租户存储的命名空间，统计键数量时逐个租户检查
+        self.TENANT_NAMESPACES = {
+            'tenant': self._get_tenant_key,
+            'tenant_tables': self._get_tenant_tables_key,
+            'farmer_ids': self._get_farmer_ids_key,
+            'known_farmers': self._get_known_farmers_key,
+        }
         
-        logger.info(f"多租户缓存服务初始化完成，数据库路径: {db_path}")
+        # 当前版本在进程内缓存 generation_check_interval 秒，读请求不必每次读取版本指针；
+        # 切换后上一版本仍保留，其他进程在此期间读到的仍是完整数据
+        if generation_check_interval is None:
+            generation_check_interval = config.CACHE_GENERATION_CHECK_INTERVAL
+        self.generation_check_interval = generation_check_interval
+        self._generation = (0, float('-inf'))
+        
+        logger.info(f"多租户缓存服务初始化完成，后端: {self.backend}，数据库路径: {db_path or url or config.CACHE_REDIS_URL}")
+    
+    def _get_value(self, key: str) -> Optional[Any]:
+        """读取并解码缓存值，旧的 JSON 格式读取后改写为新格式"""
+        started = time.perf_counter()
+        value = self.redis_client.get(key)
+        _record_read(_namespace(key), started, value is not None)
+        if value is None:
+            return None
+        data = cache_codec.decode(value)
+        if cache_codec.is_legacy(value):
+            self._migrate_value(key, value, data)
+        return data
+
+    def _migrate_value(self, key: str, value: bytes, data: Any):
+        """将旧格式的值改写为新格式，期间值被其他写入修改时放弃"""
+        try:
+            with self.redis_client.pipeline() as pipe:
+                pipe.watch(key)
+                if pipe.get(key) == value:
+                    pipe.multi()
+                    pipe.set(key, cache_codec.encode(data))
+                    pipe.execute()
+                    logger.debug(f"缓存值已迁移为新格式: {key}")
+        except WatchError:
+            pass
+        except Exception as e:
+            logger.warning(f"迁移缓存值失败 {key}: {str(e)}")
+
+    def _get_generation_key(self, prefix: str, tenant_num: str, generation: int = None) -> str:
+        """获取按版本存储的缓存键，版本为空时使用当前版本"""
+        if generation is None:
+            generation = self.get_generation()
+        return f"{prefix}{generation}:{tenant_num}" if generation else f"{prefix}{tenant_num}"
     
-    def _get_tenant_key(self, tenant_num: str) -> str:
+    def _get_tenant_key(self, tenant_num: str, generation: int = None) -> str:
         """获取租户信息缓存键"""
-        return f"{self.TENANT_PREFIX}{tenant_num}"
+        return self._get_generation_key(self.TENANT_PREFIX, tenant_num, generation)
     
-    def _get_tenant_tables_key(self, tenant_num: str) -> str:
+    def _get_tenant_tables_key(self, tenant_num: str, generation: int = None) -> str:
         """获取租户表信息缓存键"""
-        return f"{self.TENANT_TABLES_PREFIX}{tenant_num}"
+        return self._get_generation_key(self.TENANT_TABLES_PREFIX, tenant_num, generation)
     
-    def _get_farmer_ids_key(self, tenant_num: str) -> str:
+    def _get_farmer_ids_key(self, tenant_num: str, generation: int = None) -> str:
         """获取农户ID列表缓存键"""
-        return f"{self.FARMER_IDS_PREFIX}{tenant_num}"
+        return self._get_generation_key(self.FARMER_IDS_PREFIX, tenant_num, generation)
+    
+    def _get_known_farmers_key(self, tenant_num: str, generation: int = None) -> str:
+        """获取全部农户ID集合缓存键"""
+        return self._get_generation_key(self.KNOWN_FARMERS_PREFIX, tenant_num, generation)
+    
+    def _get_tenant_registry_key(self, generation: int) -> str:
+        """获取租户编号集合的缓存键"""
+        return f"{self.TENANT_REGISTRY_KEY}:{generation}" if generation else self.TENANT_REGISTRY_KEY
+    
+    def _get_missing_product_key(self, tenant_num: str, product_id: str) -> str:
+        """获取不存在产品ID的负缓存键"""
+        return f"{self.MISSING_PRODUCT_PREFIX}{tenant_num}:{product_id}"
+    
+    def get_generation(self, refresh: bool = False) -> int:
+        """获取当前缓存版本
+        
+        Args:
+            refresh: 是否忽略进程内缓存，立即读取版本指针
+            
+        Returns:
+            int: 当前版本，尚未切换过版本时为 0
+        """
+        generation, checked_at = self._generation
+        now = time.monotonic()
+        if not refresh and now - checked_at < self.generation_check_interval:
+            return generation
+        try:
+            generation = int(self.redis_client.get(self.GENERATION_KEY) or 0)
+        except Exception as e:
+            logger.error(f"获取缓存版本失败: {str(e)}")
+            return generation
+        self._generation = (generation, now)
+        return generation
+    
+    def new_generation(self) -> int:
+        """分配一个新的缓存版本号，写入完成后调用 activate_generation 切换
+        
+        Returns:
+            int: 新版本号
+        """
+        generation = int(self.redis_client.incr(self.GENERATION_COUNTER_KEY))
+        self.redis_client.sadd(self.GENERATIONS_KEY, generation)
+        return generation
+    
+    def activate_generation(self, generation: int) -> bool:
+        """原子切换当前缓存版本，原版本保留用于回滚，更早的版本回收
+        
+        Args:
+            generation: 已写入完成的新版本号
+            
+        Returns:
+            bool: 切换是否成功
+        """
+        try:
+            with self.redis_client.pipeline() as pipe:
+                pipe.watch(self.GENERATION_KEY)
+                current = int(pipe.get(self.GENERATION_KEY) or 0)
+                pipe.multi()
+                pipe.set(self.GENERATION_KEY, generation)
+                pipe.set(self.PREVIOUS_GENERATION_KEY, current)
+                pipe.sadd(self.GENERATIONS_KEY, current, generation)
+                pipe.execute()
+        except WatchError:
+            logger.error(f"切换缓存版本失败，版本指针已被其他进程修改: {generation}")
+            return False
+        except Exception as e:
+            logger.error(f"切换缓存版本失败 {generation}: {str(e)}")
+            return False
+        self._generation = (generation, time.monotonic())
+        logger.info(f"缓存版本已切换: {current} -> {generation}")
+        self.collect_generations(keep=(generation, current))
+        return True
+    
+    def rollback_generation(self) -> bool:
+        """回滚到上一缓存版本（再次调用则恢复到回滚前的版本）
+        
+        Returns:
+            bool: 回滚是否成功
+        """
+        try:
+            with self.redis_client.pipeline() as pipe:
+                pipe.watch(self.GENERATION_KEY, self.PREVIOUS_GENERATION_KEY)
+                previous = pipe.get(self.PREVIOUS_GENERATION_KEY)
+                if previous is None:
+                    logger.warning("没有可回滚的缓存版本")
+                    return False
+                current = int(pipe.get(self.GENERATION_KEY) or 0)
+                previous = int(previous)
+                pipe.multi()
+                pipe.set(self.GENERATION_KEY, previous)
+                pipe.set(self.PREVIOUS_GENERATION_KEY, current)
+                pipe.execute()
+        except WatchError:
+            logger.error("回滚缓存版本失败，版本指针已被其他进程修改")
+            return False
+        except Exception as e:
+            logger.error(f"回滚缓存版本失败: {str(e)}")
+            return False
+        self._generation = (previous, time.monotonic())
+        logger.info(f"缓存版本已回滚: {current} -> {previous}")
+        return True
+    
+    def collect_generations(self, keep: Tuple[int, ...]):
+        """回收 keep 以外的全部缓存版本
+        
+        Args:
+            keep: 需要保留的版本号（当前版本和上一版本）
+        """
+        for member in self.redis_client.smembers(self.GENERATIONS_KEY):
+            generation = int(member)
+            if generation not in keep:
+                self.drop_generation(generation)
+    
+    def drop_generation(self, generation: int) -> int:
+        """删除一个缓存版本的全部键，按租户编号集合逐个租户删除，不扫描全部键
+        
+        Args:
+            generation: 版本号，不能是当前版本
+            
+        Returns:
+            int: 删除的键数量
+        """
+        if generation == self.get_generation(refresh=True):
+            logger.warning(f"不能删除当前缓存版本: {generation}")
+            return 0
+        try:
+            keys = [self._get_tenant_registry_key(generation)]
+            for tenant_num in self.get_all_tenant_numbers(generation):
+                keys.extend(get_key(tenant_num, generation) for get_key in self.TENANT_NAMESPACES.values())
+            deleted_count = 0
+            for start in range(0, len(keys), 500):
+                deleted_count += self.redis_client.delete(*keys[start:start + 500])
+            self.redis_client.srem(self.GENERATIONS_KEY, generation)
+            CACHE_EVICTIONS.inc('generation', amount=deleted_count)
+            logger.info(f"回收缓存版本: {generation}, 删除键数量: {deleted_count}")
+            return deleted_count
+        except Exception as e:
+            logger.error(f"回收缓存版本失败 {generation}: {str(e)}")
+            return 0
+    
+    def write_batch(self, generation: int = None) -> 'CacheWriteBatch':
+        """创建批量写入，一次缓存刷新的全部写入通过 MULTI/EXEC 一次提交
+        
+        Args:
+            generation: 写入的缓存版本，默认为当前版本
+        """
+        return CacheWriteBatch(self, generation)
     
     def cache_tenant_info(self, tenant_num: str, tenant_data: Dict[str, Any]) -> bool:
         """缓存租户授权信息
@@ -64,18 +323,9 @@ class MultiTenantCacheService:
         Returns:
             bool: 缓存是否成功
         """
-        try:
-            with self._lock:
-                key = self._get_tenant_key(tenant_num)
-                # 添加缓存时间戳
-                tenant_data['cached_at'] = datetime.now().isoformat()
-                value = json.dumps(tenant_data, ensure_ascii=False)
-                self.redis_client.set(key, value)
-                logger.debug(f"成功缓存租户信息: {tenant_num}")
-                return True
-        except Exception as e:
-            logger.error(f"缓存租户信息失败 {tenant_num}: {str(e)}")
-            return False
+        batch = self.write_batch()
+        batch.cache_tenant_info(tenant_num, tenant_data)
+        return batch.execute()
     
     def get_tenant_info(self, tenant_num: str) -> Optional[Dict[str, Any]]:
         """获取租户授权信息
@@ -87,11 +337,7 @@ class MultiTenantCacheService:
             Dict: 租户信息，如果不存在返回None
         """
         try:
-            key = self._get_tenant_key(tenant_num)
-            value = self.redis_client.get(key)
-            if value:
-                return json.loads(value.decode('utf-8'))
-            return None
+            return self._get_value(self._get_tenant_key(tenant_num))
         except Exception as e:
             logger.error(f"获取租户信息失败 {tenant_num}: {str(e)}")
             return None
@@ -106,20 +352,9 @@ class MultiTenantCacheService:
         Returns:
             bool: 缓存是否成功
         """
-        try:
-            with self._lock:
-                key = self._get_tenant_tables_key(tenant_num)
-                cache_data = {
-                    'tables': tables_data,
-                    'cached_at': datetime.now().isoformat()
-                }
-                value = json.dumps(cache_data, ensure_ascii=False)
-                self.redis_client.set(key, value)
-                logger.debug(f"成功缓存租户表信息: {tenant_num}, 表数量: {len(tables_data)}")
-                return True
-        except Exception as e:
-            logger.error(f"缓存租户表信息失败 {tenant_num}: {str(e)}")
-            return False
+        batch = self.write_batch()
+        batch.cache_tenant_tables(tenant_num, tables_data)
+        return batch.execute()
     
     def get_tenant_tables(self, tenant_num: str) -> Optional[List[Dict[str, str]]]:
         """获取租户表信息
@@ -131,10 +366,8 @@ class MultiTenantCacheService:
             List: 表信息列表，如果不存在返回None
         """
         try:
-            key = self._get_tenant_tables_key(tenant_num)
-            value = self.redis_client.get(key)
-            if value:
-                cache_data = json.loads(value.decode('utf-8'))
+            cache_data = self._get_value(self._get_tenant_tables_key(tenant_num))
+            if cache_data:
                 return cache_data.get('tables', [])
             return None
         except Exception as e:
@@ -152,24 +385,9 @@ class MultiTenantCacheService:
         Returns:
             bool: 缓存是否成功
         """
-        try:
-            with self._lock:
-                key = self._get_farmer_ids_key(tenant_num)
-                # 只缓存授权数量内的农户ID
-                authorized_ids = farmer_ids[:authorized_count]
-                cache_data = {
-                    'farmer_ids': authorized_ids,
-                    'authorized_count': authorized_count,
-                    'total_count': len(farmer_ids),
-                    'cached_at': datetime.now().isoformat()
-                }
-                value = json.dumps(cache_data, ensure_ascii=False)
-                self.redis_client.set(key, value)
-                logger.info(f"成功缓存农户ID列表: {tenant_num}, 授权数量: {len(authorized_ids)}/{len(farmer_ids)}")
-                return True
-        except Exception as e:
-            logger.error(f"缓存农户ID列表失败 {tenant_num}: {str(e)}")
-            return False
+        batch = self.write_batch()
+        batch.cache_farmer_ids(tenant_num, farmer_ids, authorized_count)
+        return batch.execute()
     
     def get_farmer_ids(self, tenant_num: str) -> Optional[Dict[str, Any]]:
         """获取农户ID列表
@@ -181,11 +399,7 @@ class MultiTenantCacheService:
             Dict: 包含farmer_ids、authorized_count等信息，如果不存在返回None
         """
         try:
-            key = self._get_farmer_ids_key(tenant_num)
-            value = self.redis_client.get(key)
-            if value:
-                return json.loads(value.decode('utf-8'))
-            return None
+            return self._get_value(self._get_farmer_ids_key(tenant_num))
         except Exception as e:
             logger.error(f"获取农户ID列表失败 {tenant_num}: {str(e)}")
             return None
@@ -205,25 +419,280 @@ class MultiTenantCacheService:
             return farmer_id in farmer_data.get('farmer_ids', [])
         return False
     
-    def get_all_tenant_numbers(self) -> List[str]:
+    def is_known_farmer(self, tenant_num: str, farmer_id: str) -> Optional[bool]:
+        """检查农户ID是否存在于租户的农户管理表中
+        
+        Args:
+            tenant_num: 租户编号
+            farmer_id: 农户ID
+            
+        Returns:
+            Optional[bool]: 存在返回True，不存在返回False，农户ID集合尚未加载时返回None
+        """
+        try:
+            key = self._get_known_farmers_key(tenant_num)
+            started = time.perf_counter()
+            if self.redis_client.sismember(key, farmer_id):
+                _record_read(self.KNOWN_FARMERS_PREFIX[:-1], started, True)
+                return True
+            loaded = self.redis_client.exists(key)
+            _record_read(self.KNOWN_FARMERS_PREFIX[:-1], started, bool(loaded))
+            return False if loaded else None
+        except Exception as e:
+            logger.error(f"检查农户ID失败 {tenant_num}/{farmer_id}: {str(e)}")
+            return None
+    
+    def mark_product_missing(self, tenant_num: str, product_id: str, ttl: int = 300):
+        """记录不存在的产品ID，在有效期内直接拒绝该产品的请求
+        
+        Args:
+            tenant_num: 租户编号
+            product_id: 产品ID
+            ttl: 负缓存有效期（秒）
+        """
+        try:
+            started = time.perf_counter()
+            self.redis_client.set(self._get_missing_product_key(tenant_num, product_id), '1', ex=ttl)
+            CACHE_LATENCY.observe(time.perf_counter() - started, self.MISSING_PRODUCT_PREFIX[:-1], 'set')
+        except Exception as e:
+            logger.error(f"记录不存在的产品ID失败 {tenant_num}/{product_id}: {str(e)}")
+    
+    def is_product_missing(self, tenant_num: str, product_id: str) -> bool:
+        """检查产品ID是否在负缓存中
+        
+        Args:
+            tenant_num: 租户编号
+            product_id: 产品ID
+            
+        Returns:
+            bool: 负缓存有效期内返回True
+        """
+        try:
+            started = time.perf_counter()
+            missing = bool(self.redis_client.exists(self._get_missing_product_key(tenant_num, product_id)))
+            _record_read(self.MISSING_PRODUCT_PREFIX[:-1], started, missing)
+            return missing
+        except Exception as e:
+            logger.error(f"检查产品ID负缓存失败 {tenant_num}/{product_id}: {str(e)}")
+            return False
+    
+    def clear_missing_products(self, tenant_num: str, product_ids: List[str]):
+        """清除产品ID的负缓存（农户新增时调用）
+        
+        Args:
+            tenant_num: 租户编号
+            product_ids: 产品ID列表
+        """
+        if not product_ids:
+            return
+        try:
+            self.redis_client.delete(*[self._get_missing_product_key(tenant_num, product_id)
+                                       for product_id in product_ids])
+        except Exception as e:
+            logger.error(f"清除产品ID负缓存失败 {tenant_num}: {str(e)}")
+    
+    def count_request(self, scope: str, identity: str, window: int) -> Tuple[int, int, float]:
+        """在固定窗口计数器中记录一次请求，用于滑动窗口限流
+        
+        Args:
+            scope: 限流维度，如 ip、tenant
+            identity: 客户端IP或租户编号
+            window: 窗口长度（秒）
+            
+        Returns:
+            Tuple: (当前窗口请求数, 上一窗口请求数, 当前窗口已过去的比例)
+        """
+        now = time.time()
+        bucket = int(now // window)
+        key = f"{self.RATE_LIMIT_PREFIX}{scope}:{identity}:"
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.incr(f"{key}{bucket}")
+        pipe.expire(f"{key}{bucket}", window * 2)
+        pipe.get(f"{key}{bucket - 1}")
+        current, _, previous = pipe.execute()
+        return int(current), int(previous or 0), (now % window) / window
+    
+    def record_rate_limited(self, scope: str):
+        """累计被限流拒绝的请求数"""
+        try:
+            self.redis_client.hincrby(self.RATE_LIMITED_KEY, scope, 1)
+        except Exception as e:
+            logger.error(f"记录限流次数失败 {scope}: {str(e)}")
+    
+    def get_rate_limited_counts(self) -> Dict[str, int]:
+        """获取各限流维度累计拒绝的请求数"""
+        try:
+            counts = self.redis_client.hgetall(self.RATE_LIMITED_KEY)
+            return {scope.decode('utf-8'): int(count) for scope, count in counts.items()}
+        except Exception as e:
+            logger.error(f"获取限流次数失败: {str(e)}")
+            return {}
+    
+    def get_payload_generation(self, tenant_num: str) -> int:
+        """获取租户响应缓存的版本号，数据变更时递增使旧响应全部失效"""
+        try:
+            return int(self.redis_client.get(f"{self.PAYLOAD_GENERATION_PREFIX}{tenant_num}") or 0)
+        except Exception as e:
+            logger.error(f"获取响应缓存版本失败 {tenant_num}: {str(e)}")
+            return 0
+    
+    def bump_payload_generation(self, tenant_num: str):
+        """递增租户响应缓存的版本号，旧版本的响应随有效期自然过期"""
+        try:
+            self.redis_client.incr(f"{self.PAYLOAD_GENERATION_PREFIX}{tenant_num}")
+        except Exception as e:
+            logger.error(f"更新响应缓存版本失败 {tenant_num}: {str(e)}")
+    
+    def get_payload(self, key: str, fields: List[str]) -> List[Optional[bytes]]:
+        """读取预序列化响应的指定字段
+        
+        Args:
+            key: 响应缓存键（不含前缀）
+            fields: 字段名列表，如 etag、gzip
+            
+        Returns:
+            List: 与 fields 对应的值，不存在时为 None
+        """
+        try:
+            started = time.perf_counter()
+            values = self.redis_client.hmget(f"{self.PAYLOAD_PREFIX}{key}", fields)
+            _record_read(self.PAYLOAD_PREFIX[:-1], started, values[0] is not None)
+            return values
+        except Exception as e:
+            logger.error(f"读取响应缓存失败 {key}: {str(e)}")
+            return [None] * len(fields)
+    
+    def set_payload(self, key: str, payload: Dict[str, bytes], ttl: int):
+        """保存预序列化响应
+        
+        Args:
+            key: 响应缓存键（不含前缀）
+            payload: 字段名到字节串的映射
+            ttl: 有效期（秒）
+        """
+        try:
+            started = time.perf_counter()
+            pipe = self.redis_client.pipeline()
+            pipe.delete(f"{self.PAYLOAD_PREFIX}{key}")
+            pipe.hset(f"{self.PAYLOAD_PREFIX}{key}", mapping=payload)
+            pipe.expire(f"{self.PAYLOAD_PREFIX}{key}", ttl)
+            pipe.execute()
+            namespace = self.PAYLOAD_PREFIX[:-1]
+            CACHE_LATENCY.observe(time.perf_counter() - started, namespace, 'set')
+            CACHE_VALUE_BYTES.observe(sum(len(value) for value in payload.values()), namespace)
+        except Exception as e:
+            logger.error(f"保存响应缓存失败 {key}: {str(e)}")
+    
+    def claim_event(self, event_id: str, ttl: int = 86400) -> bool:
+        """标记飞书事件为已处理，用于事件回调的幂等处理
+        
+        Args:
+            event_id: 飞书事件ID
+            ttl: 去重记录保留时间（秒），需覆盖飞书的重试窗口
+            
+        Returns:
+            bool: 首次处理返回True，重复推送返回False
+        """
+        try:
+            key = f"{self.EVENT_PREFIX}{event_id}"
+            return bool(self.redis_client.set(key, '1', nx=True, ex=ttl))
+        except Exception as e:
+            logger.error(f"记录飞书事件失败 {event_id}: {str(e)}")
+            return True
+    
+    def release_event(self, event_id: str):
+        """撤销事件处理标记，处理失败时允许飞书重试推送
+        
+        Args:
+            event_id: 飞书事件ID
+        """
+        try:
+            self.redis_client.delete(f"{self.EVENT_PREFIX}{event_id}")
+        except Exception as e:
+            logger.error(f"撤销飞书事件记录失败 {event_id}: {str(e)}")
+    
+    def get_all_tenant_numbers(self, generation: int = None) -> List[str]:
         """获取所有租户编号
         
+        从租户编号集合读取；集合不存在时（升级前写入的缓存）扫描一次租户键并补建集合
+        
+        Args:
+            generation: 缓存版本，默认为当前版本
+            
         Returns:
             List: 租户编号列表
         """
         try:
-            pattern = f"{self.TENANT_PREFIX}*"
-            keys = self.redis_client.keys(pattern)
-            tenant_numbers = []
-            for key in keys:
-                key_str = key.decode('utf-8') if isinstance(key, bytes) else key
-                tenant_num = key_str.replace(self.TENANT_PREFIX, '')
-                tenant_numbers.append(tenant_num)
+            if generation is None:
+                generation = self.get_generation()
+            registry_key = self._get_tenant_registry_key(generation)
+            members = self.redis_client.smembers(registry_key)
+            if members:
+                return sorted(member.decode('utf-8') for member in members)
+            tenant_numbers = self.scan_tenant_numbers(generation)
+            if tenant_numbers:
+                self.redis_client.sadd(registry_key, *tenant_numbers)
+                logger.info(f"补建租户编号集合，租户数量: {len(tenant_numbers)}")
             return tenant_numbers
         except Exception as e:
             logger.error(f"获取租户编号列表失败: {str(e)}")
             return []
     
+    def scan_tenant_numbers(self, generation: int = None) -> List[str]:
+        """用 SCAN 逐批扫描租户键获取租户编号，不阻塞缓存服务，供管理工具校对租户编号集合
+        
+        Args:
+            generation: 缓存版本，默认为当前版本
+            
+        Returns:
+            List: 租户编号列表
+        """
+        if generation is None:
+            generation = self.get_generation()
+        prefix = self._get_tenant_key('', generation)
+        tenant_numbers = []
+        for key in self.redis_client.scan_iter(match=f"{prefix}*", count=500):
+            tenant_num = key.decode('utf-8')[len(prefix):]
+            # 版本 0 的前缀也匹配其他版本的键
+            if generation or ':' not in tenant_num:
+                tenant_numbers.append(tenant_num)
+        return sorted(tenant_numbers)
+    
+    def scan_key_counts(self) -> Dict[str, int]:
+        """用 SCAN 统计全部命名空间（含负缓存、限流计数等带有效期的键）的键数量
+        
+        需遍历全部键，只供管理工具使用，接口统计使用 get_cache_stats
+        
+        Returns:
+            Dict: 命名空间到键数量的映射
+        """
+        counts = {}
+        for key in self.redis_client.scan_iter(count=500):
+            namespace = key.decode('utf-8').split(':', 1)[0]
+            counts[namespace] = counts.get(namespace, 0) + 1
+        return counts
+    
+    def get_namespace_key_counts(self, tenant_numbers: List[str] = None) -> Dict[str, int]:
+        """统计按租户存储的各命名空间的键数量，一次管道请求检查每个租户的键，耗时与租户数量成正比
+        
+        Args:
+            tenant_numbers: 租户编号列表，默认为全部租户
+            
+        Returns:
+            Dict: 命名空间到键数量的映射
+        """
+        generation = self.get_generation()
+        if tenant_numbers is None:
+            tenant_numbers = self.get_all_tenant_numbers(generation)
+        pipe = self.redis_client.pipeline(transaction=False)
+        for tenant_num in tenant_numbers:
+            for get_key in self.TENANT_NAMESPACES.values():
+                pipe.exists(get_key(tenant_num, generation))
+        results = pipe.execute() if tenant_numbers else []
+        width = len(self.TENANT_NAMESPACES)
+        return {namespace: sum(1 for result in results[index::width] if result)
+                for index, namespace in enumerate(self.TENANT_NAMESPACES)}
+    
     def clear_tenant_cache(self, tenant_num: str) -> bool:
         """清除指定租户的所有缓存
         
@@ -234,35 +703,40 @@ class MultiTenantCacheService:
             bool: 清除是否成功
         """
         try:
-            with self._lock:
-                keys_to_delete = [
-                    self._get_tenant_key(tenant_num),
-                    self._get_tenant_tables_key(tenant_num),
-                    self._get_farmer_ids_key(tenant_num)
-                ]
-                
-                deleted_count = 0
-                for key in keys_to_delete:
-                    if self.redis_client.delete(key):
-                        deleted_count += 1
-                
-                logger.info(f"清除租户缓存: {tenant_num}, 删除键数量: {deleted_count}")
-                return deleted_count > 0
+            generation = self.get_generation()
+            pipe = self.redis_client.pipeline()
+            pipe.delete(*[get_key(tenant_num, generation) for get_key in self.TENANT_NAMESPACES.values()])
+            pipe.srem(self._get_tenant_registry_key(generation), tenant_num)
+            deleted_count = pipe.execute()[0]
+            logger.info(f"清除租户缓存: {tenant_num}, 删除键数量: {deleted_count}")
+            return deleted_count > 0
         except Exception as e:
             logger.error(f"清除租户缓存失败 {tenant_num}: {str(e)}")
             return False
     
     def clear_all_cache(self) -> bool:
-        """清除所有缓存
+        """清除派生缓存
+        
+        逐批删除预序列化响应和负缓存，不改动当前缓存版本的租户信息、数据表和农户列表：
+        切换到空版本会让刷新前的所有租户查询都失败（与 FLUSHALL 一样不可用）。
+        需要重新加载租户数据时调用 tenant_service.initialize_cache()，它在新版本中加载完成后才切换。
+        不使用 FLUSHALL，限流计数和事件去重记录也不受影响
         
         Returns:
             bool: 清除是否成功
         """
         try:
-            with self._lock:
-                self.redis_client.flushall()
-                logger.info("成功清除所有缓存")
-                return True
+            for prefix in (self.PAYLOAD_PREFIX, self.MISSING_PRODUCT_PREFIX):
+                keys = []
+                for key in self.redis_client.scan_iter(match=f"{prefix}*", count=500):
+                    keys.append(key)
+                    if len(keys) >= 500:
+                        CACHE_EVICTIONS.inc('clear', amount=self.redis_client.delete(*keys))
+                        keys = []
+                if keys:
+                    CACHE_EVICTIONS.inc('clear', amount=self.redis_client.delete(*keys))
+            logger.info("成功清除所有缓存")
+            return True
         except Exception as e:
             logger.error(f"清除所有缓存失败: {str(e)}")
             return False
@@ -274,13 +748,23 @@ class MultiTenantCacheService:
             Dict: 缓存统计信息
         """
         try:
-            tenant_count = len(self.get_all_tenant_numbers())
+            tenant_numbers = self.get_all_tenant_numbers()
             
             # 获取数据库信息
             info = self.redis_client.info()
             
+            evictions = {reason: int(count) for (reason,), count in CACHE_EVICTIONS.collect().items()}
+            # redis 因 maxmemory 淘汰和因过期删除的键（本地后端不统计）
+            evictions['maxmemory'] = info.get('evicted_keys', 0)
+            evictions['expired'] = info.get('expired_keys', 0)
+            
             stats = {
-                'tenant_count': tenant_count,
+                'backend': self.backend,
+                'generation': self.get_generation(),
+                'tenant_count': len(tenant_numbers),
+                'namespace_keys': self.get_namespace_key_counts(tenant_numbers),
+                'namespaces': self.get_namespace_metrics(),
+                'evictions': evictions,
                 'total_keys': info.get('db0', {}).get('keys', 0),
                 'memory_usage': info.get('used_memory_human', 'N/A'),
                 'uptime': info.get('uptime_in_seconds', 0)
@@ -291,6 +775,24 @@ class MultiTenantCacheService:
             logger.error(f"获取缓存统计信息失败: {str(e)}")
             return {}
     
+    def get_namespace_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """汇总本进程启动以来各命名空间的命中率、读写耗时（毫秒）和写入值大小（字节）
+        
+        Returns:
+            Dict: 命名空间到指标的映射
+        """
+        namespaces = {}
+        for (namespace, result), count in CACHE_REQUESTS.collect().items():
+            entry = namespaces.setdefault(namespace, {'hits': 0, 'misses': 0})
+            entry['hits' if result == 'hit' else 'misses'] += int(count)
+        for entry in namespaces.values():
+            entry['hit_ratio'] = round(entry['hits'] / (entry['hits'] + entry['misses']), 4)
+        for (namespace, operation), values in CACHE_LATENCY.collect().items():
+            namespaces.setdefault(namespace, {})[f'{operation}_ms'] = CACHE_LATENCY.summarize(values, scale=1000)
+        for (namespace,), values in CACHE_VALUE_BYTES.collect().items():
+            namespaces.setdefault(namespace, {})['value_bytes'] = CACHE_VALUE_BYTES.summarize(values)
+        return namespaces
+    
     def close(self):
         """关闭缓存连接"""
         try:
@@ -300,5 +802,121 @@ class MultiTenantCacheService:
         except Exception as e:
             logger.error(f"关闭缓存连接失败: {str(e)}")
 
+
+class CacheWriteBatch:
+    """缓存批量写入
+
+    写入先进入 MULTI/EXEC 管道，execute() 时一次提交：只需一次往返，
+    读请求要么看到提交前、要么看到提交后的全部数据，不会看到只更新了一部分的租户。
+    写入尚未切换的新版本时，提交后还需调用 activate_generation 才对读请求可见。
+    """
+
+    def __init__(self, cache_service: MultiTenantCacheService, generation: int = None):
+        self.cache_service = cache_service
+        self.generation = cache_service.get_generation() if generation is None else generation
+        self.pipe = cache_service.redis_client.pipeline(transaction=True)
+        self.size = 0
+        # 已写入的 (命名空间, 租户编号)，carry_over 据此只复制未写入的数据
+        self.written = set()
+
+    def _set(self, key: str, value: bytes):
+        self.pipe.set(key, value)
+        CACHE_VALUE_BYTES.observe(len(value), _namespace(key))
+
+    def cache_tenant_info(self, tenant_num: str, tenant_data: Dict[str, Any]):
+        """写入租户授权信息"""
+        tenant_data['cached_at'] = datetime.now().isoformat()
+        self._set(self.cache_service._get_tenant_key(tenant_num, self.generation), cache_codec.encode(tenant_data))
+        self.pipe.sadd(self.cache_service._get_tenant_registry_key(self.generation), tenant_num)
+        self.written.add(('tenant', tenant_num))
+        self.size += 1
+
+    def cache_tenant_tables(self, tenant_num: str, tables_data: List[Dict[str, str]]):
+        """写入租户表信息"""
+        cache_data = {
+            'tables': tables_data,
+            'cached_at': datetime.now().isoformat()
+        }
+        self._set(self.cache_service._get_tenant_tables_key(tenant_num, self.generation), cache_codec.encode(cache_data))
+        self.written.add(('tenant_tables', tenant_num))
+        self.size += 1
+
+    def cache_farmer_ids(self, tenant_num: str, farmer_ids: List[str], authorized_count: int):
+        """写入农户ID列表，只缓存授权数量内的农户ID"""
+        authorized_ids = farmer_ids[:authorized_count]
+        cache_data = {
+            'farmer_ids': authorized_ids,
+            'authorized_count': authorized_count,
+            'total_count': len(farmer_ids),
+            'cached_at': datetime.now().isoformat()
+        }
+        self._set(self.cache_service._get_farmer_ids_key(tenant_num, self.generation), cache_codec.encode(cache_data))
+        # 全部农户ID（含超出授权数量的）单独存为集合，用于O(1)判断产品ID是否存在
+        known_key = self.cache_service._get_known_farmers_key(tenant_num, self.generation)
+        self.pipe.delete(known_key)
+        if farmer_ids:
+            self.pipe.sadd(known_key, *farmer_ids)
+            CACHE_VALUE_BYTES.observe(sum(len(farmer_id) for farmer_id in farmer_ids), _namespace(known_key))
+        self.written.update({('farmer_ids', tenant_num), ('known_farmers', tenant_num)})
+        self.size += 1
+        logger.debug(f"待写入农户ID列表: {tenant_num}, 授权数量: {len(authorized_ids)}/{len(farmer_ids)}")
+
+    def carry_over(self, tenant_numbers: List[str]):
+        """把当前版本中这些租户本批次未写入的数据复制到写入的版本
+
+        刷新时个别租户的农户ID加载失败，新版本沿用上一版本的数据，不会因缺少数据拒绝该租户的请求
+
+        Args:
+            tenant_numbers: 租户编号列表
+        """
+        source = self.cache_service.get_generation(refresh=True)
+        if source == self.generation:
+            return
+        client = self.cache_service.redis_client
+        for tenant_num in tenant_numbers:
+            for namespace, get_key in self.cache_service.TENANT_NAMESPACES.items():
+                if (namespace, tenant_num) in self.written:
+                    continue
+                source_key, target_key = get_key(tenant_num, source), get_key(tenant_num, self.generation)
+                if namespace == 'known_farmers':
+                    members = client.smembers(source_key)
+                    if members:
+                        self.pipe.sadd(target_key, *members)
+                        self.size += 1
+                    continue
+                value = client.get(source_key)
+                if value is not None:
+                    self.pipe.set(target_key, value)
+                    if namespace == 'tenant':
+                        self.pipe.sadd(self.cache_service._get_tenant_registry_key(self.generation), tenant_num)
+                    self.size += 1
+                    logger.debug(f"沿用上一版本缓存: {source_key}")
+
+    def execute(self) -> bool:
+        """提交全部写入
+
+        Returns:
+            bool: 提交是否成功
+        """
+        if not self.size:
+            return True
+        try:
+            started = time.perf_counter()
+            self.pipe.execute()
+            # 只写一个命名空间时按命名空间记录耗时（农户ID集合随列表一起写入），刷新周期的整批写入记为 batch
+            namespaces = {namespace for namespace, _ in self.written} - {'known_farmers'}
+            namespace = namespaces.pop() if len(namespaces) == 1 else 'batch'
+            CACHE_LATENCY.observe(time.perf_counter() - started, namespace, 'set')
+            logger.debug(f"批量写入缓存完成，数据项数量: {self.size}")
+            return True
+        except Exception as e:
+            logger.error(f"批量写入缓存失败: {str(e)}")
+            return False
+        finally:
+            self.pipe.reset()
+            self.size = 0
+            self.written = set()
+
+
 # 全局缓存服务实例
 cache_service = MultiTenantCacheService()
\ No newline at end of file
@@ -9,25 +9,134 @@ from venv import logger
 from urllib3 import fields
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+import re
 import requests
 import json
+import time
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from typing import Dict, List, Optional
 from config import config
+from utils.deadline import request_timeout
+from utils.metrics import metrics
+from utils.tracing import CallTraceBuffer
 from utils.time_formatter import TimeFormatter
+from services.replica_service import (
+    parse_filter, parse_sort, field_text, SORT_COLUMNS,
+    sort_records, records_after, make_keyset_cursor, parse_keyset_cursor
+)
+
+# 饲喂记录分页按操作时间倒序，最新的记录在前
+FEEDING_RECORDS_SORT = '["操作时间 DESC"]'
+# 农户完整信息包含的数据块，可通过 fields 参数只查询其中一部分
+FARM_SECTIONS = ('sensor', 'product_info', 'feeding_records', 'breeding_process', 'statistics')
+# 索引列对应的排序字段名
+SORT_FIELDS = {column: field_name for field_name, column in SORT_COLUMNS.items()}
+# 飞书「记录不存在」错误码
+RECORD_NOT_FOUND_CODES = {1254043}
+# 从请求地址中取出表ID
+TABLE_ID_PATTERN = re.compile(r'/tables/([^/?]+)')
+
+class LatencyTracker:
+    """按操作记录最近的飞书接口耗时，用于计算对冲请求的触发时间"""
+
+    def __init__(self, size: int = 200):
+        self.size = size
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, operation: str, seconds: float):
+        with self._lock:
+            self._samples.setdefault(operation, deque(maxlen=self.size)).append(seconds)
+
+    def percentile(self, operation: str, pct: float = 0.95, min_samples: int = 20) -> Optional[float]:
+        """最近耗时的分位数，样本不足时返回 None"""
+        with self._lock:
+            samples = sorted(self._samples.get(operation, ()))
+        if len(samples) < min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * pct))]
+
+
+class FarmerNameCache:
+    """产品ID -> 饲养农户名称的 LRU 缓存，条目超过有效期后重新查询农户管理表
+
+    未启用事件订阅时农户改名收不到通知，有效期保证最多 ttl 秒后按新名称查询饲喂记录。
+    """
+
+    def __init__(self, ttl: float = 300, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, product_id: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(product_id)
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                del self._entries[product_id]
+                return None
+            self._entries.move_to_end(product_id)
+            return entry[0]
+
+    def __setitem__(self, product_id: str, farmer_name: str):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[product_id] = (farmer_name, time.monotonic() + self.ttl)
+            self._entries.move_to_end(product_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, product_id: str, default=None):
+        with self._lock:
+            entry = self._entries.pop(product_id, None)
+        return default if entry is None else entry[0]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# 全部租户共用的飞书接口耗时统计和对冲请求线程池
+feishu_latency = LatencyTracker()
+_hedge_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='feishu-hedge')
+# 全部租户共用的飞书调用记录，通过 /api/v1/admin/feishu/calls 查看
+feishu_calls = CallTraceBuffer(config.FEISHU_TRACE_SIZE)
+
+FEISHU_REQUESTS = metrics.counter('feishu_requests_total', '飞书接口请求次数，status 为 HTTP 状态码或 timeout、error',
+                                  ('operation', 'tenant', 'status'))
+FEISHU_LATENCY = metrics.histogram('feishu_request_seconds', '飞书接口耗时（秒，含对冲请求的等待）', ('operation', 'tenant'))
+metrics.gauge('feishu_hedge_queue_depth', '等待线程池执行的飞书请求数',
+              func=lambda: {(): _hedge_executor._work_queue.qsize()})
+
 
 class FeishuService:
     """飞书API服务类"""
 
-    def __init__(self, app_token: str, personal_base_token: str ):
+    def __init__(self, app_token: str, personal_base_token: str, replica=None, tenant_num: str = None):
         self.base_url = config.FEISHU_API_BASE_URL
+        # 租户编号，用于按租户统计飞书接口调用
+        self.tenant_num = tenant_num
         self.app_token = app_token
         self.personal_base_token = personal_base_token
+        # 本地副本（TenantReplica），读取模式为 replica 时优先从副本查询
+        self.replica = replica
+        self.read_mode = config.FEISHU_READ_MODE
         if not app_token or not personal_base_token:
             raise ValueError(f"缺少必要的配置项: app_token={app_token}, personal_base_token={personal_base_token}")
         # 数据表缓存
         self.tables_cache = {}
         self.time_format_cache = {}
         self.attachment_fields_cache = {}
+        # 产品ID -> 饲养农户名称，饲喂记录翻页时不再重复查询农户管理表
+        self.farmer_names = FarmerNameCache(config.FARMER_NAME_TTL)
         # 初始化时获取数据表列表并缓存
         self._init_tables_cache()
         self._init_time_cache()
@@ -40,12 +149,89 @@ class FeishuService:
         }
         
         
+    def _request(self, method: str, url: str, operation: str, hedge: bool = True, **kwargs) -> requests.Response:
+        """发送飞书请求，按操作和租户记录请求次数、耗时和失败，并写入调用记录（参数同 _send）"""
+        tenant = str(self.tenant_num) if self.tenant_num is not None else 'unknown'
+        started = time.perf_counter()
+        status = 'error'
+        size = 0
+        try:
+            response = self._send(method, url, operation, hedge, **kwargs)
+            status = str(response.status_code)
+            size = self._response_size(response)
+            return response
+        except requests.exceptions.Timeout:
+            status = 'timeout'
+            raise
+        finally:
+            seconds = time.perf_counter() - started
+            FEISHU_LATENCY.observe(seconds, operation, tenant)
+            FEISHU_REQUESTS.inc(operation, tenant, status)
+            feishu_calls.record(tenant, self._table_of(url), operation, status, seconds, size)
+
+    def _table_of(self, url: str) -> str:
+        """请求地址对应的表名，不涉及数据表的请求返回空字符串"""
+        match = TABLE_ID_PATTERN.search(url)
+        if not match:
+            return ''
+        return self.get_table_name_by_id(match.group(1)) or match.group(1)
+
+    @staticmethod
+    def _response_size(response: requests.Response) -> int:
+        """响应体字节数（请求均未使用 stream，响应体已完整读取）"""
+        try:
+            return len(response.content)
+        except TypeError:
+            return 0
+
+    def _send(self, method: str, url: str, operation: str, hedge: bool = True, **kwargs) -> requests.Response:
+        """发送飞书请求
+
+        超时时间不超过当前请求的剩余时间预算；读请求超过该操作 p95 耗时仍未返回时，
+        再发出一次相同的对冲请求，取先返回的结果。
+
+        Args:
+            method: GET 或 POST
+            url: 请求地址
+            operation: 操作名称，用于分别统计耗时
+            hedge: 是否允许对冲请求，写操作不能重复发送
+        """
+        timeout = request_timeout(config.FEISHU_TIMEOUT)
+        send = getattr(requests, method.lower())
+        kwargs['headers'] = self._get_headers()
+        delay = feishu_latency.percentile(operation) if hedge and config.FEISHU_HEDGE_ENABLED else None
+        start = time.monotonic()
+        if delay is None or max(delay, config.FEISHU_HEDGE_MIN_DELAY) >= timeout:
+            response = send(url, timeout=timeout, **kwargs)
+            feishu_latency.record(operation, time.monotonic() - start)
+            return response
+
+        futures = {_hedge_executor.submit(send, url, timeout=timeout, **kwargs)}
+        done, _ = wait(futures, timeout=max(delay, config.FEISHU_HEDGE_MIN_DELAY))
+        if not done:
+            logger.info(f"飞书请求超过 p95 耗时 {delay:.3f}s，发出对冲请求: {operation}")
+            futures.add(_hedge_executor.submit(send, url, timeout=timeout, **kwargs))
+        error = None
+        while futures:
+            done, futures = wait(futures, timeout=max(0, start + timeout - time.monotonic()),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    feishu_latency.record(operation, time.monotonic() - start)
+                    return future.result()
+                error = future.exception()
+        if error is not None and not futures:
+            raise error
+        raise requests.exceptions.Timeout(f'飞书请求超时: {operation}')
+
     def _init_tables_cache(self):
         """初始化数据表缓存"""
         try:
             # 从飞书接口获取数据表列表
             url = f"{self.base_url}/open-apis/bitable/v1/apps/{self.app_token}/tables"
-            response = requests.get(url, headers=self._get_headers())
+            response = self._request('GET', url, 'list_tables', hedge=False)
             response.raise_for_status()
             
             data = response.json()
@@ -71,7 +257,7 @@ class FeishuService:
         if not table_id:
             return []
         url = f"{self.base_url}/open-apis/bitable/v1/apps/{self.app_token}/tables/{table_id}/fields"
-        response = requests.get(url, headers=self._get_headers())
+        response = self._request('GET', url, 'list_fields', hedge=False)
         response.raise_for_status()
         data = response.json()
         if data.get('code') != 0:
@@ -80,26 +266,193 @@ class FeishuService:
 
     def _init_time_cache(self):
         for name in self.tables_cache.keys():
-            fields = self.get_table_fields(name)
-            for field in fields:
-                
-                if field.get('ui_type') == 'DateTime':
-                    if not self.time_format_cache.get(name):
-                        self.time_format_cache[name] = {}
-                    self.time_format_cache[name][field.get('field_name')] = field.get('property').get('date_formatter')
-                elif field.get('ui_type') == 'Attachment':
-                    if not self.attachment_fields_cache.get(name):
-                        self.attachment_fields_cache[name] = []
-                    self.attachment_fields_cache[name].append(field.get('field_name'))
-                    #print(field)
-            print(f'time_format_cache,{name}:{self.time_format_cache.get(name)}')
-            print(f'attachment_fields_cache,{name}:{self.attachment_fields_cache.get(name)}')
+            self._load_table_schema(name)
+
+    def _load_table_schema(self, name: str):
+        """加载单张表的时间字段格式和附件字段"""
+        self.time_format_cache.pop(name, None)
+        self.attachment_fields_cache.pop(name, None)
+        fields = self.get_table_fields(name)
+        for field in fields:
+            
+            if field.get('ui_type') == 'DateTime':
+                if not self.time_format_cache.get(name):
+                    self.time_format_cache[name] = {}
+                self.time_format_cache[name][field.get('field_name')] = field.get('property').get('date_formatter')
+            elif field.get('ui_type') == 'Attachment':
+                if not self.attachment_fields_cache.get(name):
+                    self.attachment_fields_cache[name] = []
+                self.attachment_fields_cache[name].append(field.get('field_name'))
+                #print(field)
+        print(f'time_format_cache,{name}:{self.time_format_cache.get(name)}')
+        print(f'attachment_fields_cache,{name}:{self.attachment_fields_cache.get(name)}')
+
+    def refresh_table_schema(self, table_id: str) -> str:
+        """表结构变更后重新加载数据表列表和该表的字段缓存
+
+        Args:
+            table_id: 表ID
+
+        Returns:
+            str: 表名，表不存在时返回空字符串
+        """
+        self._init_tables_cache()
+        table_name = self.get_table_name_by_id(table_id)
+        if table_name:
+            self._load_table_schema(table_name)
+        return table_name
+
+    def get_table_name_by_id(self, table_id: str) -> str:
+        """根据表ID获取表名"""
+        for table_name, cached_id in self.tables_cache.items():
+            if cached_id == table_id:
+                return table_name
+        return ''
         
 
     def get_table_id_by_name(self, table_name: str) -> str:
         """根据表名获取表ID"""
         return self.tables_cache.get(table_name, '')
+
+    def _use_replica(self, table_name: str) -> bool:
+        """是否从本地副本读取指定表（副本未同步时回退到飞书）"""
+        return self.read_mode == 'replica' and self.replica is not None and self.replica.is_synced(table_name)
+
+    def list_all_records(self, table_name: str, page_size: int = 500) -> Dict:
+        """分页获取指定表的全部原始记录（用于同步本地副本）
+
+        Args:
+            table_name: 表名
+            page_size: 每页记录数，飞书上限为500
+
+        Returns:
+            包含记录列表的字典，data 为 [{'record_id': ..., 'fields': {...}}]
+        """
+        table_id = self.get_table_id_by_name(table_name)
+        if not table_id:
+            return {
+                'success': False,
+                'data': None,
+                'message': f'未找到表名为 {table_name} 的数据表'
+            }
+
+        url = f"{self.base_url}/open-apis/bitable/v1/apps/{self.app_token}/tables/{table_id}/records"
+        records = []
+        page_token = None
+        try:
+            while True:
+                params = {'page_size': page_size}
+                if page_token:
+                    params['page_token'] = page_token
+                response = self._request('GET', url, 'list_records', params=params)
+                response.raise_for_status()
+                data = response.json()
+                if data.get('code') != 0:
+                    return {
+                        'success': False,
+                        'data': None,
+                        'message': data.get('msg', '未知错误')
+                    }
+                page = data.get('data') or {}
+                records.extend(page.get('items') or [])
+                page_token = page.get('page_token')
+                if not page.get('has_more') or not page_token:
+                    break
+            return {
+                'success': True,
+                'data': records,
+                'message': 'success'
+            }
+        except requests.exceptions.RequestException as e:
+            return {
+                'success': False,
+                'data': None,
+                'message': f'请求失败: {str(e)}'
+            }
         
+    def list_records_updated_since(self, table_name: str, since: int, page_size: int = 100) -> Dict:
+        """获取「更新」时间不早于指定时间戳的原始记录（用于增量同步本地副本）
+
+        按「更新」倒序分页读取，遇到早于 since 的记录即停止，请求次数与变更量成正比
+
+        Args:
+            table_name: 表名
+            since: 毫秒时间戳水位线
+            page_size: 每页记录数
+
+        Returns:
+            包含记录列表的字典，data 为 [{'record_id': ..., 'fields': {...}}]
+        """
+        table_id = self.get_table_id_by_name(table_name)
+        if not table_id:
+            return {
+                'success': False,
+                'data': None,
+                'message': f'未找到表名为 {table_name} 的数据表'
+            }
+
+        url = f"{self.base_url}/open-apis/bitable/v1/apps/{self.app_token}/tables/{table_id}/records"
+        records = []
+        page_token = None
+        try:
+            while True:
+                params = {'page_size': page_size, 'sort': '["更新 DESC"]'}
+                if page_token:
+                    params['page_token'] = page_token
+                response = self._request('GET', url, 'list_records', params=params)
+                response.raise_for_status()
+                data = response.json()
+                if data.get('code') != 0:
+                    return {
+                        'success': False,
+                        'data': None,
+                        'message': data.get('msg', '未知错误')
+                    }
+                page = data.get('data') or {}
+                reached_watermark = False
+                for item in page.get('items') or []:
+                    updated = (item.get('fields') or {}).get('更新')
+                    if updated is not None and int(updated) < since:
+                        reached_watermark = True
+                        break
+                    records.append(item)
+                page_token = page.get('page_token')
+                if reached_watermark or not page.get('has_more') or not page_token:
+                    break
+            return {
+                'success': True,
+                'data': records,
+                'message': 'success'
+            }
+        except (requests.exceptions.RequestException, ValueError) as e:
+            return {
+                'success': False,
+                'data': None,
+                'message': f'请求失败: {str(e)}'
+            }
+
+    def get_all_record_ids(self, table_name: str) -> Dict:
+        """获取指定表全部记录的ID（飞书模式下分页读取整张表）
+
+        Args:
+            table_name: 表名
+
+        Returns:
+            包含记录ID列表的字典，顺序与表中记录顺序一致
+        """
+        if self._use_replica(table_name):
+            records = self.replica.list_records(table_name)
+        else:
+            result = self.list_all_records(table_name)
+            if not result['success']:
+                return result
+            records = result['data']
+        return {
+            'success': True,
+            'data': [record['record_id'] for record in records if record.get('record_id')],
+            'message': 'success'
+        }
+
     def get_table_records(self, table_name: str) -> Dict:
         """获取指定表名的记录
         
@@ -109,6 +462,14 @@ class FeishuService:
         Returns:
             包含记录数据的字典
         """
+        if self._use_replica(table_name):
+            items = self.replica.list_records(table_name)
+            return {
+                'success': True,
+                'data': {'items': items, 'total': len(items), 'has_more': False},
+                'message': 'success'
+            }
+
         # 从缓存中获取表ID
         table_id = self.get_table_id_by_name(table_name)
         if not table_id:
@@ -121,7 +482,7 @@ class FeishuService:
         url = f"{self.base_url}/open-apis/bitable/v1/apps/{self.app_token}/tables/{table_id}/records"
         
         try:
-            response = requests.get(url, headers=self._get_headers())
+            response = self._request('GET', url, 'list_records')
             response.raise_for_status()
             
             data = response.json()
@@ -155,6 +516,23 @@ class FeishuService:
         Returns:
             包含记录数据的字典
         """
+        result = self._list_records_filter(table_name, filter, sort)
+        if result['success']:
+            result['data'] = self._format_items(table_name, result['data'])
+        return result
+
+    def _list_records_filter(self, table_name: str, filter: str, sort: str) -> Dict:
+        """获取指定表中符合过滤条件的全部原始记录，data 为 [{'record_id': ..., 'fields': {...}}]"""
+        if self._use_replica(table_name):
+            conditions = parse_filter(filter)
+            order = parse_sort(sort)
+            if conditions is not None and order is not None:
+                return {
+                    'success': True,
+                    'data': self.replica.query(table_name, conditions, order),
+                    'message': 'success'
+                }
+
         # 从缓存中获取表ID
         table_id = self.get_table_id_by_name(table_name)
         if not table_id:
@@ -164,28 +542,32 @@ class FeishuService:
                 'message': f'未找到表名为 {table_name} 的数据表'
             }
             
-        url = f"{self.base_url}/open-apis/bitable/v1/apps/{self.app_token}/tables/{table_id}/records?filter={filter}&sort={sort}"
+        url = f"{self.base_url}/open-apis/bitable/v1/apps/{self.app_token}/tables/{table_id}/records"
         
         try:
-            response = requests.get(url, headers=self._get_headers())
-            response.raise_for_status()
-            data = response.json()
-            if data.get('code') != 0 or not data.get('data'):
-                return {
-                    'success': False,
-                    'data': None,
-                    'message': data.get('msg', '未知错误')
-                }
-            # table_time_formater = self.time_format_cache.get(table_name)
-            items = data.get('data').get('items')
-            table_time_formater = self.time_format_cache.get(table_name)
-            table_attachment_fields = self.attachment_fields_cache.get(table_name)
-            records = []
-            for item in items:
-                records.append(self.format_record(item.get('fields'),table_time_formater, table_attachment_fields))
+            # 分页读取全部匹配记录（默认每页仅20条）
+            items = []
+            page_token = None
+            while True:
+                params = {'filter': filter, 'sort': sort, 'page_size': 500}
+                if page_token:
+                    params['page_token'] = page_token
+                response = self._request('GET', url, 'list_records', params=params)
+                response.raise_for_status()
+                data = response.json()
+                if data.get('code') != 0 or not data.get('data'):
+                    return {
+                        'success': False,
+                        'data': None,
+                        'message': data.get('msg', '未知错误')
+                    }
+                items.extend(data.get('data').get('items') or [])
+                page_token = data.get('data').get('page_token')
+                if not data.get('data').get('has_more') or not page_token:
+                    break
             return {
                 'success': True,
-                'data': records,
+                'data': items,
                 'message': 'success'
             }
                 
@@ -204,93 +586,452 @@ class FeishuService:
             }
             
 
-    def get_farm_complete_info(self, product_id: str) -> Dict:
-        """
-        获取农户的完整信息，包括商品信息、饲喂记录、养殖流程等
+    def get_table_records_page(self, table_name: str, filter: str, sort: str,
+                               page_size: int, page_token: Optional[str] = None) -> Dict:
+        """分页获取指定表的记录（带过滤条件）
+
+        分页令牌有两种：飞书返回的 page_token 原样转发；k:<排序值>:<记录ID> 形式的游标
+        定位到上一页最后一条记录，由副本查询或读取后本地定位，翻页期间新增记录不会导致重复或遗漏
 
         Args:
-            product_id: 产品ID（农户记录ID）
+            table_name: 表名
+            filter: 过滤条件，例如 'CurrentValue.[农户]="张三"'
+            sort: 排序，例如 '["操作时间 DESC"]'，游标分页只支持单个排序字段
+            page_size: 每页记录数
+            page_token: 分页令牌，为空时从第一页开始
 
         Returns:
-            包含农户完整信息的字典
+            包含当前页数据的字典，data 为 {'items', 'page_token', 'has_more', 'total'}
         """
-        
-        # 初始化结果数据
-        complete_info = {
-            'sensor': {},
-            'product_info': {},
+        order = parse_sort(sort)
+        keyset = len(order) == 1 if order else False
+        after = None
+        if page_token and page_token.startswith('k:'):
+            after = parse_keyset_cursor(page_token)
+            if after is None or not keyset:
+                return {
+                    'success': False,
+                    'data': None,
+                    'message': '无效的分页令牌'
+                }
+
+        if keyset and self._use_replica(table_name):
+            conditions = parse_filter(filter)
+            column, direction = order[0]
+            page = None
+            if conditions is not None:
+                if page_token and after is None:
+                    # 副本可以回答的查询只会发出游标分页令牌
+                    return {
+                        'success': False,
+                        'data': None,
+                        'message': '无效的分页令牌'
+                    }
+                page = self.replica.query_page(table_name, conditions, column, direction, page_size + 1, after)
+            if page is not None:
+                items, total = page
+                return self._keyset_page(table_name, items, total, page_size, order)
+
+        if after is not None:
+            # 飞书不支持按游标定位，读取全部匹配记录后在本地定位
+            result = self._list_records_filter(table_name, filter, sort)
+            if not result['success']:
+                return result
+            field_name = SORT_FIELDS[order[0][0]]
+            records = sort_records(result['data'], field_name, order[0][1])
+            items = records_after(records, field_name, order[0][1], after)[:page_size + 1]
+            return self._keyset_page(table_name, items, len(records), page_size, order)
+
+        table_id = self.get_table_id_by_name(table_name)
+        if not table_id:
+            return {
+                'success': False,
+                'data': None,
+                'message': f'未找到表名为 {table_name} 的数据表'
+            }
+
+        url = f"{self.base_url}/open-apis/bitable/v1/apps/{self.app_token}/tables/{table_id}/records"
+        params = {'filter': filter, 'sort': sort, 'page_size': page_size}
+        if page_token:
+            params['page_token'] = page_token
+        try:
+            response = self._request('GET', url, 'list_records', params=params)
+            response.raise_for_status()
+            data = response.json()
+            if data.get('code') != 0:
+                return {
+                    'success': False,
+                    'data': None,
+                    'message': data.get('msg', '未知错误')
+                }
+            page = data.get('data') or {}
+            has_more = bool(page.get('has_more'))
+            return {
+                'success': True,
+                'data': {
+                    'items': self._format_items(table_name, page.get('items') or []),
+                    'page_token': page.get('page_token') if has_more else None,
+                    'has_more': has_more,
+                    'total': page.get('total', 0)
+                },
+                'message': 'success'
+            }
+        except (requests.exceptions.RequestException, ValueError) as e:
+            return {
+                'success': False,
+                'data': None,
+                'message': f'请求失败: {str(e)}'
+            }
+
+    def _keyset_page(self, table_name: str, items: List[Dict], total: int, page_size: int,
+                     order: List) -> Dict:
+        """根据多读取一条的原始记录生成游标分页结果"""
+        has_more = len(items) > page_size
+        items = items[:page_size]
+        next_token = None
+        if has_more:
+            last = items[-1]
+            next_token = make_keyset_cursor(last['fields'].get(SORT_FIELDS[order[0][0]]), last['record_id'])
+        return {
+            'success': True,
+            'data': {
+                'items': self._format_items(table_name, items),
+                'page_token': next_token,
+                'has_more': has_more,
+                'total': total
+            },
+            'message': 'success'
+        }
+
+    def _get_sensor_info(self) -> Optional[Dict[str, str]]:
+        """从「传感器」表获取传感器数据，转换为 {'温度': '26.0', '湿度': '47.0', ...} 格式，查询失败返回None"""
+        sensor_info = {}
+        sensor_result = self.get_table_records('传感器')
+        if not sensor_result['success']:
+            return None
+        sensor_records = sensor_result.get('data',{}).get('items', [])
+        for record in sensor_records:
+            fields = record.get('fields', {})
+            sensor_name = fields.get('名称', '')
+            sensor_value = fields.get('数据', '') or fields.get('数值', '')
+            
+            if sensor_name and sensor_value:
+                sensor_info[sensor_name] = str(sensor_value)
+        return sensor_info
+
+    @staticmethod
+    def _new_farm_info(sensor_info: Dict[str, str], product_info: Dict) -> Dict:
+        """初始化单个农户的完整信息结构"""
+        return {
+            'sensor': dict(sensor_info),
+            'product_info': product_info,
             'feeding_records': [],
             'breeding_process': [],
             'statistics': {}
         }
-            
-        # 从「传感器」表获取传感器数据
-        sensor_result = self.get_table_records('传感器')
-        if sensor_result['success']:
-            sensor_records = sensor_result.get('data',{}).get('items', [])
-            
-            # 处理传感器数据，将其转换为 {'温度': '26.0', '湿度': '47.0', ...} 格式
-            for record in sensor_records:
-                fields = record.get('fields', {})
-                sensor_name = fields.get('名称', '')
-                sensor_value = fields.get('数据', '') or fields.get('数值', '')
-                
-                if sensor_name and sensor_value:
-                    complete_info['sensor'][sensor_name] = str(sensor_value)
-        
-        # 使用「根据记录ID查询记录详情」接口获取农户信息
-        farmer_result = self.get_record_by_id('农户管理', product_id)
-        if not farmer_result.get('data'):
-            return {
-                'success': False,
-                'data': None,
-                'message': f'未找到记录ID为 {product_id} 的农户信息'
+
+    @staticmethod
+    def _mark_omitted(complete_info: Dict, section: str):
+        """标记查询失败或超出时间预算而未返回的数据块"""
+        complete_info.setdefault('omitted_sections', []).append(section)
+
+    @staticmethod
+    def _format_feeding_record(record: Dict) -> Dict:
+        """转换单条饲喂记录"""
+        return {
+            'food_name': record.get('食物', ''),
+            'operator': record.get('操作人', ''),
+            'operation_time': record.get('操作时间'),
+            'images': record.get('图片', []),
+            'created_time': record.get('创建'),
+            'updated_time': record.get('更新')
+        }
+
+    @classmethod
+    def _apply_feeding_records(cls, complete_info: Dict, feeding_records: List[Dict]):
+        """将饲喂记录写入农户完整信息"""
+        if not feeding_records:
+            return
+        complete_info['statistics']['feeding_count'] = len(feeding_records)
+        for record in feeding_records:
+            complete_info['feeding_records'].append(cls._format_feeding_record(record))
+
+    @classmethod
+    def _apply_feeding_page(cls, complete_info: Dict, page: Dict, page_size: int):
+        """将饲喂记录第一页和分页信息写入农户完整信息"""
+        cls._apply_feeding_records(complete_info, page['items'])
+        if page['total']:
+            complete_info['statistics']['feeding_count'] = page['total']
+        complete_info['feeding_page'] = {
+            'next_cursor': page['page_token'],
+            'has_more': page['has_more'],
+            'page_size': page_size
+        }
+
+    @staticmethod
+    def _apply_breeding_process(complete_info: Dict, breeding_records: List[Dict]):
+        """将养殖流程写入农户完整信息"""
+        complete_info['statistics']['process_count'] = len(breeding_records)
+        for fields in breeding_records:
+            process_record = {
+                'process_name': fields.get('流程', ''),
+                'operation_time': fields.get('操作时间'),
+                'created_time': fields.get('创建'),
+                'updated_time': fields.get('更新'),
+                'images': fields.get('图片', []),
+                'operator': fields.get('操作人', '')
             }
-        complete_info['product_info'] = farmer_result['data']
-        farmer_name = complete_info['product_info'].get('饲养农户', '')
+            complete_info['breeding_process'].append(process_record)
+
+    def get_farm_complete_info(self, product_id: str, feeding_page_size: Optional[int] = None,
+                               sections: Optional[set] = None) -> Dict:
+        """
+        获取农户的完整信息，包括商品信息、饲喂记录、养殖流程等
+
+        Args:
+            product_id: 产品ID（农户记录ID）
+            feeding_page_size: 饲喂记录只返回第一页时的每页记录数，为空时返回全部饲喂记录
+            sections: 需要的数据块（FARM_SECTIONS 的子集），为空时返回全部；不需要的数据块不查询飞书，
+                statistics 依赖饲喂记录和养殖流程的查询
+
+        Returns:
+            包含农户完整信息的字典；饲喂记录、养殖流程、传感器数据查询失败（包括超出时间预算）时
+            不返回该部分，并在 omitted_sections 中列出
+        """
+        sections = set(FARM_SECTIONS) if sections is None else set(sections)
+        need_feeding = bool(sections & {'feeding_records', 'statistics'})
+        need_breeding = bool(sections & {'breeding_process', 'statistics'})
+        farmer_name = self.farmer_names.get(product_id)
+
+        # 使用「根据记录ID查询记录详情」接口获取农户信息，其余数据按重要程度依次查询，时间预算不足时优先保证前面的数据
+        if 'product_info' in sections or ((need_feeding or need_breeding) and farmer_name is None):
+            farmer_result = self.get_record_by_id('农户管理', product_id)
+            if not farmer_result.get('data'):
+                return {
+                    'success': False,
+                    'data': None,
+                    'message': f'未找到记录ID为 {product_id} 的农户信息',
+                    'not_found': farmer_result.get('not_found', False)
+                }
+            complete_info = self._new_farm_info({}, farmer_result['data'])
+            farmer_name = complete_info['product_info'].get('饲养农户', '')
+            self.farmer_names[product_id] = farmer_name
+        else:
+            complete_info = self._new_farm_info({}, {})
         # 从「饲喂记录」表获取饲喂记录
         filter_str = f'CurrentValue.[农户]="{farmer_name}"'
-        feeding_result = self.get_table_records_filter('饲喂记录',filter_str)
-        #print(f'饲喂记录:{feeding_result}')
-        if feeding_result['data']:
-            feeding_records = feeding_result['data']
-            complete_info['statistics']['feeding_count'] = len(feeding_records)
-            for record in feeding_records:
-                feeding_record = {
-                    'food_name': record.get('食物', ''),
-                    'operator': record.get('操作人', ''),
-                    'operation_time': record.get('操作时间'),
-                    'images': record.get('图片', []),
-                    'created_time': record.get('创建'),
-                    'updated_time': record.get('更新')
-                }
-                complete_info['feeding_records'].append(feeding_record)
+        if need_feeding and feeding_page_size:
+            # 只返回第一页，其余由分页接口按需加载
+            feeding_result = self.get_table_records_page('饲喂记录', filter_str, FEEDING_RECORDS_SORT, feeding_page_size)
+            if feeding_result['success']:
+                self._apply_feeding_page(complete_info, feeding_result['data'], feeding_page_size)
+            else:
+                self._mark_omitted(complete_info, 'feeding_records')
+        elif need_feeding:
+            feeding_result = self.get_table_records_filter('饲喂记录',filter_str)
+            if feeding_result['data']:
+                self._apply_feeding_records(complete_info, feeding_result['data'])
+            if not feeding_result['success']:
+                self._mark_omitted(complete_info, 'feeding_records')
             
         # 从「养殖流程」表获取养殖流程
-        breeding_result = self.get_table_records_filter('养殖流程',filter_str)
-        if breeding_result['success']:
-            breeding_records = breeding_result['data']
-            complete_info['statistics']['process_count'] = len(breeding_records)
-            # 处理养殖流程
-            for fields in breeding_records:
-                process_record = {
-                    'process_name': fields.get('流程', ''),
-                    'operation_time': fields.get('操作时间'),
-                    'created_time': fields.get('创建'),
-                    'updated_time': fields.get('更新'),
-                    'images': fields.get('图片', []),
-                    'operator': fields.get('操作人', '')
-                }
-                complete_info['breeding_process'].append(process_record)
+        if need_breeding:
+            breeding_result = self.get_table_records_filter('养殖流程',filter_str)
+            if breeding_result['success']:
+                self._apply_breeding_process(complete_info, breeding_result['data'])
+            else:
+                self._mark_omitted(complete_info, 'breeding_process')
         
+        if 'sensor' in sections:
+            sensor_info = self._get_sensor_info()
+            if sensor_info is None:
+                self._mark_omitted(complete_info, 'sensor')
+            else:
+                complete_info['sensor'] = sensor_info
         
         return {
             'success': True,
             'data': complete_info,
             'message': 'success'
         }
-            
 
+    def get_feeding_records_page(self, product_id: str, page_size: int, cursor: Optional[str] = None) -> Dict:
+        """
+        按操作时间倒序分页获取农户的饲喂记录
+
+        Args:
+            product_id: 产品ID（农户记录ID）
+            page_size: 每页记录数
+            cursor: 上一页返回的 next_cursor，为空时从第一页开始
+
+        Returns:
+            包含当前页饲喂记录的字典，data 为 {'records', 'next_cursor', 'has_more', 'total'}
+        """
+        farmer_name = self.farmer_names.get(product_id)
+        if farmer_name is None:
+            farmer_result = self.get_record_by_id('农户管理', product_id)
+            if not farmer_result.get('data'):
+                return {
+                    'success': False,
+                    'data': None,
+                    'message': f'未找到记录ID为 {product_id} 的农户信息',
+                    'not_found': farmer_result.get('not_found', False)
+                }
+            farmer_name = farmer_result['data'].get('饲养农户', '')
+            self.farmer_names[product_id] = farmer_name
+        filter_str = f'CurrentValue.[农户]="{farmer_name}"'
+        result = self.get_table_records_page('饲喂记录', filter_str, FEEDING_RECORDS_SORT, page_size, cursor)
+        if not result['success']:
+            return result
+        page = result['data']
+        return {
+            'success': True,
+            'data': {
+                'records': [self._format_feeding_record(record) for record in page['items']],
+                'next_cursor': page['page_token'],
+                'has_more': page['has_more'],
+                'total': page['total']
+            },
+            'message': 'success'
+        }
+
+    def forget_farmer_names(self, product_ids: List[str]):
+        """农户管理表记录变更后丢弃缓存的农户名称"""
+        for product_id in product_ids:
+            self.farmer_names.pop(product_id, None)
+
+    def get_records_by_ids(self, table_name: str, record_ids: List[str]) -> Dict:
+        """根据记录ID批量获取格式化后的记录
+
+        Args:
+            table_name: 表名
+            record_ids: 记录ID列表
+
+        Returns:
+            包含记录的字典，data 为 {record_id: fields}，不存在的记录不在其中
+        """
+        if self._use_replica(table_name):
+            records = {}
+            for record_id in record_ids:
+                fields = self.replica.get_record(table_name, record_id)
+                if fields is not None:
+                    records[record_id] = fields
+            items = [{'record_id': record_id, 'fields': fields} for record_id, fields in records.items()]
+        else:
+            result = self.batch_get_records(table_name, record_ids)
+            if not result['success']:
+                return result
+            items = result['data']
+        formatted = self._format_items(table_name, items)
+        return {
+            'success': True,
+            'data': {item.get('record_id'): fields for item, fields in zip(items, formatted)},
+            'message': 'success'
+        }
+
+    def _get_records_by_farmers(self, table_name: str, farmer_names: List[str], sort: str = '["更新 ASC"]',
+                                chunk_size: int = 20) -> Dict:
+        """使用 OR 组合的过滤条件一次查询多个农户的原始记录，并按农户拆分
+
+        Args:
+            table_name: 表名
+            farmer_names: 农户名称列表
+            sort: 排序
+            chunk_size: 每次查询合并的农户数量，避免过滤条件过长
+
+        Returns:
+            包含记录的字典，data 为 {农户名称: [{'record_id': ..., 'fields': {...}}]}
+        """
+        records_by_farmer = {name: [] for name in farmer_names}
+        for start in range(0, len(farmer_names), chunk_size):
+            chunk = farmer_names[start:start + chunk_size]
+            conditions = [f'CurrentValue.[农户]="{name}"' for name in chunk]
+            filter_str = conditions[0] if len(conditions) == 1 else f'OR({",".join(conditions)})'
+            result = self._list_records_filter(table_name, filter_str, sort)
+            if not result['success']:
+                return result
+            for record in result['data']:
+                name = field_text(record['fields'].get('农户'))
+                if name in records_by_farmer:
+                    records_by_farmer[name].append(record)
+        return {
+            'success': True,
+            'data': records_by_farmer,
+            'message': 'success'
+        }
+
+    def get_farms_complete_info(self, product_ids: List[str], feeding_page_size: Optional[int] = None) -> Dict:
+        """
+        批量获取多个农户的完整信息：共享一次传感器查询，农户信息使用 batch_get，
+        饲喂记录和养殖流程使用 OR 组合的过滤条件查询后按农户拆分
+
+        Args:
+            product_ids: 产品ID（农户记录ID）列表
+            feeding_page_size: 饲喂记录只返回第一页时的每页记录数，为空时返回全部饲喂记录，
+                与 get_farm_complete_info 一致
+
+        Returns:
+            包含完整信息的字典，data 为 {'items': {product_id: 完整信息}, 'missing': [未找到的产品ID]}
+        """
+        farmer_result = self.get_records_by_ids('农户管理', product_ids)
+        if not farmer_result['success']:
+            return {
+                'success': False,
+                'data': None,
+                'message': farmer_result['message']
+            }
+        items = {}
+        farmer_names = {}
+        missing = []
+        for product_id in product_ids:
+            product_info = farmer_result['data'].get(product_id)
+            if not product_info:
+                missing.append(product_id)
+                continue
+            items[product_id] = self._new_farm_info({}, product_info)
+            farmer_names[product_id] = field_text(product_info.get('饲养农户', ''))
+            self.farmer_names[product_id] = farmer_names[product_id]
+
+        names = sorted(set(farmer_names.values()))
+        if names:
+            feeding_sort = FEEDING_RECORDS_SORT if feeding_page_size else '["更新 ASC"]'
+            feeding_result = self._get_records_by_farmers('饲喂记录', names, feeding_sort)
+            breeding_result = self._get_records_by_farmers('养殖流程', names)
+            for product_id, complete_info in items.items():
+                farmer_name = farmer_names[product_id]
+                if not feeding_result['success']:
+                    self._mark_omitted(complete_info, 'feeding_records')
+                else:
+                    records = feeding_result['data'][farmer_name]
+                    if feeding_page_size:
+                        # 与单个查询相同的第一页和游标
+                        order = parse_sort(FEEDING_RECORDS_SORT)
+                        field_name = SORT_FIELDS[order[0][0]]
+                        records = sort_records(records, field_name, order[0][1])
+                        page = self._keyset_page('饲喂记录', records[:feeding_page_size + 1], len(records),
+                                                 feeding_page_size, order)['data']
+                        self._apply_feeding_page(complete_info, page, feeding_page_size)
+                    else:
+                        self._apply_feeding_records(complete_info, self._format_items('饲喂记录', records))
+                if breeding_result['success']:
+                    self._apply_breeding_process(complete_info,
+                                                 self._format_items('养殖流程', breeding_result['data'][farmer_name]))
+                else:
+                    self._mark_omitted(complete_info, 'breeding_process')
+
+        if items:
+            sensor_info = self._get_sensor_info()
+            for complete_info in items.values():
+                if sensor_info is None:
+                    self._mark_omitted(complete_info, 'sensor')
+                else:
+                    complete_info['sensor'] = dict(sensor_info)
+
+        return {
+            'success': True,
+            'data': {'items': items, 'missing': missing},
+            'message': 'success'
+        }
 
     def batch_update_records(self, table_name: str, records: List[Dict]) -> Dict:
         """批量更新多条记录
@@ -318,11 +1059,14 @@ class FeishuService:
         }
         
         try:
-            response = requests.post(url, headers=self._get_headers(), json=payload)
+            response = self._request('POST', url, 'batch_update', json=payload, hedge=False)
             response.raise_for_status()
             
             data = response.json()
             if data.get('code') == 0:
+                # 同步更新本地副本，避免下一次同步前读到旧数据
+                if self.replica is not None:
+                    self.replica.update_fields(table_name, records)
                 return {
                     'success': True,
                     'data': data.get('data', {}),
@@ -348,6 +1092,51 @@ class FeishuService:
                 'message': f'处理失败: {str(e)}'
             }
     
+    def batch_get_records(self, table_name: str, record_ids: List[str]) -> Dict:
+        """根据记录ID批量获取原始记录（不经过本地副本，不做格式化）
+
+        Args:
+            table_name: 表名
+            record_ids: 记录ID列表，每次请求最多100条
+
+        Returns:
+            包含记录列表的字典，data 为 [{'record_id': ..., 'fields': {...}}]
+        """
+        table_id = self.get_table_id_by_name(table_name)
+        if not table_id:
+            return {
+                'success': False,
+                'data': None,
+                'message': f'未找到表名为 {table_name} 的数据表'
+            }
+
+        url = f"{self.base_url}/open-apis/bitable/v1/apps/{self.app_token}/tables/{table_id}/records/batch_get"
+        records = []
+        try:
+            for start in range(0, len(record_ids), 100):
+                payload = {'record_ids': record_ids[start:start + 100]}
+                response = self._request('POST', url, 'batch_get', json=payload)
+                response.raise_for_status()
+                data = response.json()
+                if data.get('code') != 0:
+                    return {
+                        'success': False,
+                        'data': None,
+                        'message': data.get('msg', '未知错误')
+                    }
+                records.extend((data.get('data') or {}).get('records') or [])
+            return {
+                'success': True,
+                'data': records,
+                'message': 'success'
+            }
+        except requests.exceptions.RequestException as e:
+            return {
+                'success': False,
+                'data': None,
+                'message': f'请求失败: {str(e)}'
+            }
+
     def get_record_by_id(self, table_name: str, record_id: str) -> Dict:
         """根据记录ID获取单条记录
         
@@ -358,6 +1147,22 @@ class FeishuService:
         Returns:
             包含记录数据的字典
         """
+        if self._use_replica(table_name):
+            fields = self.replica.get_record(table_name, record_id)
+            if fields is None:
+                return {
+                    'success': False,
+                    'data': None,
+                    'message': f'未找到记录ID为 {record_id} 的记录',
+                    'not_found': True
+                }
+            return {
+                'success': True,
+                'data': self.format_record(fields, self.time_format_cache.get(table_name),
+                                           self.attachment_fields_cache.get(table_name)),
+                'message': 'success'
+            }
+
         # 从缓存中获取表ID
         table_id = self.get_table_id_by_name(table_name)
         if not table_id:
@@ -369,14 +1174,21 @@ class FeishuService:
         url = f"{self.base_url}/open-apis/bitable/v1/apps/{self.app_token}/tables/{table_id}/records/{record_id}"
         
         try:
-            response = requests.get(url, headers=self._get_headers())
-            response.raise_for_status()
-            data = response.json()
+            response = self._request('GET', url, 'get_record')
+            if response.status_code in (400, 404):
+                # 记录不存在时飞书返回 4xx 和错误码，需要与网络错误区分
+                data = response.json()
+            else:
+                response.raise_for_status()
+                data = response.json()
             if not data.get('code') == 0 or not data.get('data'):
-                logger.info(data)
-                logger.info(f'url:{url}')
-                logger.info(self._get_headers())
-                return data
+                logger.info(f"获取记录失败 {table_name}/{record_id}: code={data.get('code')}, msg={data.get('msg')}")
+                return {
+                    'success': False,
+                    'data': None,
+                    'message': data.get('msg', '未知错误'),
+                    'not_found': data.get('code') in RECORD_NOT_FOUND_CODES
+                }
             table_time_formater = self.time_format_cache.get(table_name)
             table_attachment_fields = self.attachment_fields_cache.get(table_name)
             fields = data['data'].get('record',{}).get('fields',{})
@@ -388,7 +1200,7 @@ class FeishuService:
             }
 
                 
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, ValueError) as e:
             
             return {
                 'success': False,
@@ -405,7 +1217,7 @@ class FeishuService:
         url = f"{self.base_url}/open-apis/bitable/v1/apps/{self.app_token}/tables"
         
         try:
-            response = requests.get(url, headers=self._get_headers())
+            response = self._request('GET', url, 'list_tables')
             response.raise_for_status()
             
             data = response.json()
@@ -430,6 +1242,13 @@ class FeishuService:
             }
 
 
+    def _format_items(self, table_name: str, items: List[Dict]) -> List[Dict]:
+        """格式化记录列表中每条记录的字段"""
+        table_time_formater = self.time_format_cache.get(table_name)
+        table_attachment_fields = self.attachment_fields_cache.get(table_name)
+        return [self.format_record(item.get('fields'), table_time_formater, table_attachment_fields)
+                for item in items]
+
     def format_record(self, fields: Dict, table_time_formater: Dict, table_attachment_fields: List) -> Dict:
         logger.debug(f"fields:{fields}, \n table_time_formater:{table_time_formater},  \n table_attachment_fields:{table_attachment_fields}")
         if not table_time_formater and not table_attachment_fields:
@@ -0,0 +1,69 @@
+"""预序列化响应缓存模块
+
+农户详情接口的完整响应序列化一次后，连同 gzip、brotli 压缩结果和 ETag 一起保存在缓存服务中，
+命中时按客户端支持的编码直接返回字节串，不再重复格式化、序列化和压缩。
+
+租户的任意表发生变更（事件回调、本服务写入传感器数据）、本地副本同步完成或缓存刷新切换版本时
+递增该租户的缓存版本号，旧响应不再被读取并随有效期过期。
+"""
+
+import hashlib
+import logging
+from typing import Dict, Optional, Tuple
+
+from config import config
+from services.cache_service import cache_service
+from utils.compression import compress, available_encodings
+from utils import json_codec
+
+logger = logging.getLogger(__name__)
+
+
+class FarmPayloadCache:
+    """农户详情接口响应缓存"""
+
+    def __init__(self, cache_service, ttl: int = None):
+        """
+        Args:
+            cache_service: 缓存服务
+            ttl: 响应有效期（秒），0 表示不缓存
+        """
+        self.cache_service = cache_service
+        self.ttl = config.PAYLOAD_CACHE_TTL if ttl is None else ttl
+
+    def _key(self, tenant_num: str, product_id: str, variant: str) -> str:
+        generation = self.cache_service.get_payload_generation(tenant_num)
+        return f"{tenant_num}:{generation}:{product_id}:{variant}"
+
+    @staticmethod
+    def variant(sections: Optional[set]) -> str:
+        """同一产品不同 fields 参数的响应分别缓存"""
+        return 'all' if not sections else ','.join(sorted(sections))
+
+    def get(self, tenant_num: str, product_id: str, variant: str,
+            encoding: str) -> Optional[Tuple[bytes, str]]:
+        """读取缓存的响应
+
+        Returns:
+            Tuple: (指定编码的响应体, ETag)，未命中返回 None
+        """
+        if self.ttl <= 0:
+            return None
+        etag, body = self.cache_service.get_payload(self._key(tenant_num, product_id, variant),
+                                                    ['etag', encoding])
+        if etag is None or body is None:
+            return None
+        return body, etag.decode('utf-8')
+
+    def put(self, tenant_num: str, product_id: str, variant: str, response_data: Dict) -> Dict[str, bytes]:
+        """序列化并压缩响应，返回各编码的响应体和 ETag"""
+        body = json_codec.dumps_bytes(response_data)
+        payload = {encoding: compress(body, encoding) for encoding in available_encodings()}
+        payload['etag'] = f'"{hashlib.sha1(body).hexdigest()[:20]}"'.encode('utf-8')
+        if self.ttl > 0:
+            self.cache_service.set_payload(self._key(tenant_num, product_id, variant), payload, self.ttl)
+        return payload
+
+
+# 全局响应缓存实例
+payload_cache = FarmPayloadCache(cache_service)
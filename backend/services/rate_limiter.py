@@ -0,0 +1,110 @@
+"""接口限流服务模块
+
+按客户端IP和租户编号两个维度做滑动窗口限流，计数保存在缓存服务中，
+在请求飞书之前拒绝超限的请求：
+- 单个IP超限时直接拒绝，且不计入租户的请求数，避免一个爬虫耗尽整个租户的额度
+- 租户超限时拒绝该租户的全部请求，保护租户共用的飞书接口配额
+
+接口按类别（api: JSON 接口，page: 服务端渲染页面，image: 图片代理）分别计数和设置额度，
+打开一次页面会带来多次图片请求，不能和 JSON 接口共用同一个额度。
+"""
+
+import math
+import logging
+from typing import Dict, Optional, Tuple
+
+from config import config
+from services.cache_service import cache_service
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """滑动窗口限流器
+
+    使用相邻两个固定窗口的计数按时间加权估算滑动窗口内的请求数，每次检查只需一次缓存往返。
+    """
+
+    def __init__(self, cache_service, ip_limit: int = None, tenant_limit: int = None, window: int = None,
+                 class_limits: Dict[str, Tuple[int, int]] = None):
+        """
+        Args:
+            cache_service: 缓存服务
+            ip_limit: JSON 接口单个IP在窗口内允许的请求数，0 表示不限制
+            tenant_limit: JSON 接口单个租户在窗口内允许的请求数，0 表示不限制
+            window: 窗口长度（秒）
+            class_limits: 其他接口类别的额度 {类别: (单个IP额度, 单个租户额度)}
+        """
+        self.cache_service = cache_service
+        self.ip_limit = config.API_RATE_LIMIT if ip_limit is None else ip_limit
+        self.tenant_limit = config.TENANT_RATE_LIMIT if tenant_limit is None else tenant_limit
+        self.window = window or config.API_RATE_LIMIT_WINDOW
+        self.class_limits = {
+            'page': (config.PAGE_RATE_LIMIT, config.TENANT_RATE_LIMIT),
+            'image': (config.IMAGE_RATE_LIMIT, config.IMAGE_TENANT_RATE_LIMIT),
+        } if class_limits is None else class_limits
+
+    def _limits(self, route_class: str) -> Tuple[int, int]:
+        if route_class == 'api':
+            return self.ip_limit, self.tenant_limit
+        return self.class_limits[route_class]
+
+    def _hit(self, scope: str, identity: str, limit: int) -> Tuple[bool, int]:
+        """记录一次请求并判断是否超限
+
+        Returns:
+            Tuple: (是否允许, 建议重试等待秒数)
+        """
+        if limit <= 0:
+            return True, 0
+        try:
+            current, previous, elapsed = self.cache_service.count_request(scope, identity, self.window)
+        except Exception as e:
+            # 缓存不可用时不影响正常访问
+            logger.error(f"限流计数失败 {scope}/{identity}: {str(e)}")
+            return True, 0
+        estimated = previous * (1 - elapsed) + current
+        if estimated <= limit:
+            return True, 0
+        return False, max(1, math.ceil(self.window * (1 - elapsed)))
+
+    def check(self, client_ip: str, tenant_num: Optional[str] = None,
+              route_class: str = 'api') -> Tuple[bool, int, Optional[str]]:
+        """检查请求是否允许通过
+
+        Args:
+            client_ip: 客户端IP
+            tenant_num: 租户编号，调用方需先确认租户存在，为空时只按IP限流
+            route_class: 接口类别 api/page/image
+
+        Returns:
+            Tuple: (是否允许, 建议重试等待秒数, 触发限流的维度 ip/tenant)
+        """
+        ip_limit, tenant_limit = self._limits(route_class)
+        allowed, retry_after = self._hit(f'{route_class}:ip', client_ip, ip_limit)
+        if not allowed:
+            self.cache_service.record_rate_limited(f'{route_class}:ip')
+            logger.warning(f"客户端请求过于频繁: {client_ip} ({route_class})")
+            return False, retry_after, 'ip'
+        if tenant_num is not None:
+            allowed, retry_after = self._hit(f'{route_class}:tenant', str(tenant_num), tenant_limit)
+            if not allowed:
+                self.cache_service.record_rate_limited(f'{route_class}:tenant')
+                logger.warning(f"租户请求过于频繁: {tenant_num} ({route_class})")
+                return False, retry_after, 'tenant'
+        return True, 0, None
+
+    def get_stats(self):
+        """获取限流配置和累计拒绝的请求数"""
+        return {
+            'ip_limit': self.ip_limit,
+            'tenant_limit': self.tenant_limit,
+            'class_limits': {route_class: {'ip_limit': ip_limit, 'tenant_limit': tenant_limit}
+                             for route_class, (ip_limit, tenant_limit) in self.class_limits.items()},
+            'window': self.window,
+            'rejected': self.cache_service.get_rate_limited_counts()
+        }
+
+
+# 全局限流器实例
+rate_limiter = RateLimiter(cache_service)
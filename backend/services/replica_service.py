@@ -0,0 +1,602 @@
+"""租户数据本地副本服务模块
+
+在本地 SQLite（WAL 模式）中为每个租户维护业务表的只读副本，包括：
+- 农户管理、饲喂记录、养殖流程、传感器 四张表的记录
+- 农户、操作时间、record_id 索引
+- 由调度器从飞书同步，页面查询直接读取本地副本
+- 基于「更新」时间水位线的增量同步，定期全量校对以处理删除
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import re
+import json
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Any, Tuple
+from datetime import datetime, timedelta
+import logging
+
+from config import config
+from utils import json_codec
+
+logger = logging.getLogger(__name__)
+
+# 需要在本地保留副本的数据表
+REPLICATED_TABLES = ['农户管理', '饲喂记录', '养殖流程', '传感器']
+
+# 各表中用于建立“农户”索引的字段，默认为「农户」
+FARMER_FIELDS = {
+    '农户管理': '饲养农户'
+}
+
+# 可以直接映射到索引列的排序字段
+SORT_COLUMNS = {
+    '更新': 'updated_time',
+    '创建': 'created_time',
+    '操作时间': 'operation_time'
+}
+
+# 形如 CurrentValue.[农户]="张三" 的等值过滤条件
+_CONDITION_PATTERN = re.compile(r'CurrentValue\.\[([^\]]+)\]\s*=\s*"((?:[^"\\]|\\.)*)"')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    table_name TEXT NOT NULL,
+    record_id TEXT NOT NULL,
+    farmer TEXT,
+    operation_time INTEGER,
+    created_time INTEGER,
+    updated_time INTEGER,
+    position INTEGER NOT NULL,
+    fields TEXT NOT NULL,
+    PRIMARY KEY (table_name, record_id)
+);
+CREATE INDEX IF NOT EXISTS idx_records_farmer ON records (table_name, farmer);
+CREATE INDEX IF NOT EXISTS idx_records_operation_time ON records (table_name, operation_time);
+CREATE INDEX IF NOT EXISTS idx_records_record_id ON records (record_id);
+CREATE TABLE IF NOT EXISTS sync_state (
+    table_name TEXT PRIMARY KEY,
+    record_count INTEGER NOT NULL DEFAULT 0,
+    synced_at TEXT,
+    watermark INTEGER,
+    full_synced_at TEXT
+);
+"""
+
+# 早期版本的 sync_state 缺少的列
+_SYNC_STATE_COLUMNS = {
+    'watermark': 'INTEGER',
+    'full_synced_at': 'TEXT'
+}
+
+
+def field_text(value: Any) -> str:
+    """将飞书字段值转换为用于比较的文本
+
+    飞书文本字段可能是字符串，也可能是 [{'text': 'xx', 'type': 'text'}] 形式的分段列表
+
+    Args:
+        value: 飞书字段原始值
+
+    Returns:
+        str: 字段文本
+    """
+    if value is None:
+        return ''
+    if isinstance(value, list):
+        return ''.join(field_text(item) for item in value)
+    if isinstance(value, dict):
+        if 'text' in value:
+            return str(value.get('text') or '')
+        if 'value' in value:
+            return field_text(value.get('value'))
+        return ''
+    return str(value)
+
+
+def _to_int(value: Any) -> Optional[int]:
+    """将时间戳类字段转换为整数，无法转换时返回None"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def sort_value(value: Any) -> int:
+    """排序字段的比较值，与副本分页查询的 COALESCE(列, 0) 保持一致"""
+    number = _to_int(value)
+    return 0 if number is None else number
+
+
+def make_keyset_cursor(value: Any, record_id: str) -> str:
+    """根据一页最后一条记录的排序值和记录ID生成分页游标 k:<排序值>:<记录ID>"""
+    return f'k:{sort_value(value)}:{record_id}'
+
+
+def parse_keyset_cursor(cursor: str) -> Optional[Tuple[int, str]]:
+    """解析分页游标，格式错误返回None"""
+    parts = (cursor or '').split(':', 2)
+    if len(parts) != 3 or parts[0] != 'k' or not parts[2]:
+        return None
+    try:
+        return int(parts[1]), parts[2]
+    except ValueError:
+        return None
+
+
+def sort_records(records: List[Dict[str, Any]], field_name: str, direction: str) -> List[Dict[str, Any]]:
+    """按 (排序字段, 记录ID) 对记录排序，与游标分页的顺序一致"""
+    return sorted(records, key=lambda record: (sort_value(record['fields'].get(field_name)), record['record_id']),
+                  reverse=direction == 'DESC')
+
+
+def records_after(records: List[Dict[str, Any]], field_name: str, direction: str,
+                  after: Tuple[int, str]) -> List[Dict[str, Any]]:
+    """返回已排序记录中位于游标之后的记录"""
+    if direction == 'DESC':
+        return [record for record in records
+                if (sort_value(record['fields'].get(field_name)), record['record_id']) < after]
+    return [record for record in records
+            if (sort_value(record['fields'].get(field_name)), record['record_id']) > after]
+
+
+def parse_filter(filter_str: str) -> Optional[List[Tuple[str, List[str]]]]:
+    """解析飞书过滤条件
+
+    支持单个等值条件 CurrentValue.[字段]="值"，以及同一字段多个等值条件的
+    OR(CurrentValue.[字段]="值1",CurrentValue.[字段]="值2")，
+    其余格式返回None，由调用方回退到飞书查询
+
+    Args:
+        filter_str: 飞书过滤条件
+
+    Returns:
+        List: [(字段名, [可选值])]，无法解析时返回None
+    """
+    if not filter_str:
+        return []
+    filter_str = filter_str.strip()
+    match = _CONDITION_PATTERN.fullmatch(filter_str)
+    if match:
+        return [(match.group(1), [match.group(2).replace('\\"', '"')])]
+    if not (filter_str.startswith('OR(') and filter_str.endswith(')')):
+        return None
+    body = filter_str[3:-1]
+    matches = list(_CONDITION_PATTERN.finditer(body))
+    # 条件之间只能有逗号和空白
+    remainder = _CONDITION_PATTERN.sub('', body).replace(',', '').strip()
+    if not matches or remainder or len({m.group(1) for m in matches}) != 1:
+        return None
+    return [(matches[0].group(1), [m.group(2).replace('\\"', '"') for m in matches])]
+
+
+def parse_sort(sort: Any) -> Optional[List[Tuple[str, str]]]:
+    """解析飞书排序参数，例如 '["更新 ASC"]'
+
+    Returns:
+        List: [(列名, 'ASC'/'DESC')]，包含无法映射的字段时返回None
+    """
+    if not sort:
+        return []
+    try:
+        items = json.loads(sort) if isinstance(sort, str) else list(sort)
+    except (TypeError, ValueError):
+        return None
+    order = []
+    for item in items:
+        parts = str(item).split()
+        column = SORT_COLUMNS.get(parts[0]) if parts else None
+        if not column:
+            return None
+        direction = parts[1].upper() if len(parts) > 1 else 'ASC'
+        order.append((column, 'DESC' if direction == 'DESC' else 'ASC'))
+    return order
+
+
+class TenantReplica:
+    """单个租户的本地数据副本"""
+
+    def __init__(self, db_path: str):
+        """初始化租户副本
+
+        Args:
+            db_path: SQLite 数据库文件路径
+        """
+        self.db_path = db_path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        conn = self._get_connection()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript(_SCHEMA)
+        existing = {row[1] for row in conn.execute('PRAGMA table_info(sync_state)')}
+        for column, column_type in _SYNC_STATE_COLUMNS.items():
+            if column not in existing:
+                conn.execute(f'ALTER TABLE sync_state ADD COLUMN {column} {column_type}')
+        conn.commit()
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """获取当前线程的数据库连接（WAL 模式下读操作互不阻塞）"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _build_row(table_name: str, record: Dict[str, Any], position: int) -> tuple:
+        """将飞书记录转换为数据库行"""
+        fields = record.get('fields') or {}
+        farmer_field = FARMER_FIELDS.get(table_name, '农户')
+        return (
+            table_name,
+            record.get('record_id'),
+            field_text(fields.get(farmer_field)),
+            _to_int(fields.get('操作时间')),
+            _to_int(fields.get('创建')),
+            _to_int(fields.get('更新')),
+            position,
+            json_codec.dumps(fields)
+        )
+
+    def replace_table(self, table_name: str, records: List[Dict[str, Any]]) -> int:
+        """使用全量数据替换指定表的副本
+
+        Args:
+            table_name: 表名
+            records: 飞书原始记录列表，每条包含 record_id 和 fields
+
+        Returns:
+            int: 写入的记录数
+        """
+        rows = [self._build_row(table_name, record, position)
+                for position, record in enumerate(records) if record.get('record_id')]
+        updated_times = [row[5] for row in rows if row[5] is not None]
+        watermark = max(updated_times) if updated_times else None
+        now = datetime.now().isoformat()
+        with self._write_lock:
+            conn = self._get_connection()
+            with conn:
+                conn.execute('DELETE FROM records WHERE table_name = ?', (table_name,))
+                conn.executemany('INSERT INTO records VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+                conn.execute(
+                    'INSERT OR REPLACE INTO sync_state '
+                    '(table_name, record_count, synced_at, watermark, full_synced_at) VALUES (?, ?, ?, ?, ?)',
+                    (table_name, len(rows), now, watermark, now)
+                )
+        return len(rows)
+
+    def apply_changes(self, table_name: str, records: List[Dict[str, Any]]) -> int:
+        """应用增量同步获取到的变更记录，并推进水位线
+
+        Args:
+            table_name: 表名
+            records: 「更新」时间晚于水位线的飞书原始记录
+
+        Returns:
+            int: 写入的记录数
+        """
+        count = self.upsert_records(table_name, records)
+        updated_times = [_to_int((record.get('fields') or {}).get('更新')) for record in records]
+        updated_times = [value for value in updated_times if value is not None]
+        with self._write_lock:
+            conn = self._get_connection()
+            with conn:
+                conn.execute(
+                    'UPDATE sync_state SET synced_at = ?, watermark = MAX(COALESCE(watermark, 0), ?), '
+                    'record_count = (SELECT COUNT(*) FROM records WHERE table_name = ?) WHERE table_name = ?',
+                    (datetime.now().isoformat(), max(updated_times, default=0), table_name, table_name)
+                )
+        return count
+
+    def get_sync_state(self, table_name: str) -> Optional[Dict[str, Any]]:
+        """获取指定表的同步状态
+
+        Returns:
+            Dict: 包含 record_count、synced_at、watermark、full_synced_at，未同步时返回None
+        """
+        row = self._get_connection().execute(
+            'SELECT record_count, synced_at, watermark, full_synced_at FROM sync_state WHERE table_name = ?',
+            (table_name,)
+        ).fetchone()
+        if not row:
+            return None
+        return {
+            'record_count': row[0],
+            'synced_at': row[1],
+            'watermark': row[2],
+            'full_synced_at': row[3]
+        }
+
+    def upsert_records(self, table_name: str, records: List[Dict[str, Any]]) -> int:
+        """插入或更新记录，已存在的记录保持原有顺序
+
+        Args:
+            table_name: 表名
+            records: 飞书原始记录列表
+
+        Returns:
+            int: 写入的记录数
+        """
+        count = 0
+        with self._write_lock:
+            conn = self._get_connection()
+            with conn:
+                for record in records:
+                    record_id = record.get('record_id')
+                    if not record_id:
+                        continue
+                    row = conn.execute(
+                        'SELECT position FROM records WHERE table_name = ? AND record_id = ?',
+                        (table_name, record_id)
+                    ).fetchone()
+                    if row:
+                        position = row[0]
+                    else:
+                        position = conn.execute(
+                            'SELECT COALESCE(MAX(position), -1) + 1 FROM records WHERE table_name = ?',
+                            (table_name,)
+                        ).fetchone()[0]
+                    conn.execute('INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                                 self._build_row(table_name, record, position))
+                    count += 1
+        return count
+
+    def update_fields(self, table_name: str, records: List[Dict[str, Any]]) -> int:
+        """将部分字段的更新合并到已有记录中（用于写入飞书后的本地同步）
+
+        Args:
+            table_name: 表名
+            records: 记录列表，每条包含 record_id 和需要更新的 fields
+
+        Returns:
+            int: 更新的记录数
+        """
+        merged = []
+        for record in records:
+            current = self.get_record(table_name, record.get('record_id'))
+            if current is None:
+                continue
+            current.update(record.get('fields') or {})
+            merged.append({'record_id': record.get('record_id'), 'fields': current})
+        return self.upsert_records(table_name, merged)
+
+    def delete_records(self, table_name: str, record_ids: List[str]) -> int:
+        """删除记录
+
+        Args:
+            table_name: 表名
+            record_ids: 记录ID列表
+
+        Returns:
+            int: 删除的记录数
+        """
+        if not record_ids:
+            return 0
+        with self._write_lock:
+            conn = self._get_connection()
+            with conn:
+                cursor = conn.executemany(
+                    'DELETE FROM records WHERE table_name = ? AND record_id = ?',
+                    [(table_name, record_id) for record_id in record_ids]
+                )
+                return cursor.rowcount
+
+    def is_synced(self, table_name: str) -> bool:
+        """指定表是否已完成过同步"""
+        row = self._get_connection().execute(
+            'SELECT synced_at FROM sync_state WHERE table_name = ?', (table_name,)
+        ).fetchone()
+        return bool(row and row[0])
+
+    def get_record(self, table_name: str, record_id: str) -> Optional[Dict[str, Any]]:
+        """根据记录ID获取记录字段
+
+        Returns:
+            Dict: 原始字段，不存在时返回None
+        """
+        row = self._get_connection().execute(
+            'SELECT fields FROM records WHERE table_name = ? AND record_id = ?',
+            (table_name, record_id)
+        ).fetchone()
+        return json_codec.loads(row[0]) if row else None
+
+    def list_records(self, table_name: str) -> List[Dict[str, Any]]:
+        """按飞书返回顺序列出整张表的记录
+
+        Returns:
+            List: 每条包含 record_id 和 fields
+        """
+        rows = self._get_connection().execute(
+            'SELECT record_id, fields FROM records WHERE table_name = ? ORDER BY position',
+            (table_name,)
+        ).fetchall()
+        return [{'record_id': record_id, 'fields': json_codec.loads(fields)} for record_id, fields in rows]
+
+    def query(self, table_name: str, conditions: List[Tuple[str, List[str]]],
+              order: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        """按等值条件查询记录
+
+        农户字段的条件走索引，其余条件在读取后逐条比较
+
+        Args:
+            table_name: 表名
+            conditions: [(字段名, [可选值])]，同一条件内为“或”，条件之间为“且”
+            order: [(列名, 'ASC'/'DESC')]
+
+        Returns:
+            List: 每条包含 record_id 和 fields
+        """
+        sql = 'SELECT record_id, fields FROM records WHERE table_name = ?'
+        params = [table_name]
+        farmer_field = FARMER_FIELDS.get(table_name, '农户')
+        for field_name, values in conditions:
+            if field_name == farmer_field:
+                sql += f" AND farmer IN ({', '.join('?' * len(values))})"
+                params.extend(values)
+        order_sql = [f'{column} {direction}' for column, direction in order] + ['position ASC']
+        sql += ' ORDER BY ' + ', '.join(order_sql)
+
+        records = []
+        for record_id, fields_json in self._get_connection().execute(sql, params):
+            fields = json_codec.loads(fields_json)
+            if all(field_text(fields.get(name)) in values for name, values in conditions):
+                records.append({'record_id': record_id, 'fields': fields})
+        return records
+
+    def query_page(self, table_name: str, conditions: List[Tuple[str, List[str]]], column: str, direction: str,
+                   limit: int, after: Optional[Tuple[int, str]] = None) -> Optional[Tuple[List[Dict[str, Any]], int]]:
+        """按 (排序列, 记录ID) 游标分页查询记录
+
+        游标定位到上一页最后一条记录，翻页期间新增或删除记录不会导致重复或遗漏
+
+        Args:
+            table_name: 表名
+            conditions: [(字段名, [可选值])]，只支持农户字段的条件
+            column: 排序列名
+            direction: 'ASC' 或 'DESC'
+            limit: 每页记录数
+            after: 上一页最后一条记录的 (排序值, 记录ID)，为空时从第一页开始
+
+        Returns:
+            Tuple: (当前页记录, 符合条件的记录总数)，条件包含非农户字段时返回None
+        """
+        farmer_field = FARMER_FIELDS.get(table_name, '农户')
+        if any(field_name != farmer_field for field_name, _ in conditions) \
+                or column not in SORT_COLUMNS.values() or direction not in ('ASC', 'DESC'):
+            return None
+
+        where = 'table_name = ?'
+        params = [table_name]
+        for _, values in conditions:
+            where += f" AND farmer IN ({', '.join('?' * len(values))})"
+            params.extend(values)
+        conn = self._get_connection()
+        total = conn.execute(f'SELECT COUNT(*) FROM records WHERE {where}', params).fetchone()[0]
+
+        key = f'COALESCE({column}, 0)'
+        page_where, page_params = where, list(params)
+        if after is not None:
+            op = '<' if direction == 'DESC' else '>'
+            page_where += f' AND ({key} {op} ? OR ({key} = ? AND record_id {op} ?))'
+            page_params += [after[0], after[0], after[1]]
+        rows = conn.execute(
+            f'SELECT record_id, fields FROM records WHERE {page_where} '
+            f'ORDER BY {key} {direction}, record_id {direction} LIMIT ?',
+            page_params + [limit]
+        ).fetchall()
+        return [{'record_id': record_id, 'fields': json_codec.loads(fields)} for record_id, fields in rows], total
+
+    def close(self):
+        """关闭当前线程的数据库连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class LocalReplicaService:
+    """多租户本地副本管理服务"""
+
+    def __init__(self, base_dir: str = None):
+        """初始化副本服务
+
+        Args:
+            base_dir: 副本数据库目录，默认为配置项 REPLICA_DB_DIR（相对路径基于项目根目录）
+        """
+        if base_dir is None:
+            base_dir = config.REPLICA_DB_DIR
+        if not os.path.isabs(base_dir):
+            project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+            base_dir = os.path.join(project_root, base_dir)
+        self.base_dir = base_dir
+        # 全量校对间隔（分钟）
+        self.full_sync_interval = config.REPLICA_FULL_SYNC_INTERVAL
+        self.sync_overlap_ms = 1000
+        self._replicas = {}
+        self._lock = threading.Lock()
+
+    def get_replica(self, tenant_num: str) -> TenantReplica:
+        """获取（必要时创建）指定租户的本地副本
+
+        Args:
+            tenant_num: 租户编号
+
+        Returns:
+            TenantReplica: 租户副本
+        """
+        tenant_num = str(tenant_num)
+        replica = self._replicas.get(tenant_num)
+        if replica is not None:
+            return replica
+        with self._lock:
+            if tenant_num not in self._replicas:
+                os.makedirs(self.base_dir, exist_ok=True)
+                db_path = os.path.join(self.base_dir, f'tenant_{tenant_num}.db')
+                self._replicas[tenant_num] = TenantReplica(db_path)
+                logger.info(f"租户本地副本已就绪: {tenant_num}, 路径: {db_path}")
+            return self._replicas[tenant_num]
+
+    def _full_sync_table(self, replica: TenantReplica, tenant_num: str, table_name: str, feishu_service) -> bool:
+        """全量同步单张表，用于首次同步和定期校对（可发现已删除的记录）"""
+        result = feishu_service.list_all_records(table_name)
+        if not result['success']:
+            logger.error(f"全量同步租户副本失败 {tenant_num}/{table_name}: {result['message']}")
+            return False
+        count = replica.replace_table(table_name, result['data'])
+        logger.info(f"全量同步租户副本: {tenant_num}/{table_name}, 记录数: {count}")
+        return True
+
+    def _needs_full_sync(self, state: Optional[Dict[str, Any]]) -> bool:
+        """判断是否需要全量校对：未同步过、没有水位线或距上次全量同步超过间隔"""
+        if not state or not state.get('full_synced_at') or state.get('watermark') is None:
+            return True
+        last_full_sync = datetime.fromisoformat(state['full_synced_at'])
+        return datetime.now() - last_full_sync >= timedelta(minutes=self.full_sync_interval)
+
+    def sync_tenant(self, tenant_num: str, feishu_service, full: bool = False) -> bool:
+        """同步租户的所有副本表
+
+        默认只拉取「更新」时间晚于水位线的记录，同步成本与变更量成正比；
+        首次同步或距上次全量同步超过 REPLICA_FULL_SYNC_INTERVAL 时执行全量校对
+
+        Args:
+            tenant_num: 租户编号
+            feishu_service: 租户专用的飞书服务
+            full: 是否强制全量同步
+
+        Returns:
+            bool: 所有表是否同步成功
+        """
+        replica = self.get_replica(tenant_num)
+        success = True
+        for table_name in REPLICATED_TABLES:
+            if not feishu_service.get_table_id_by_name(table_name):
+                continue
+            state = replica.get_sync_state(table_name)
+            if full or self._needs_full_sync(state):
+                success = self._full_sync_table(replica, tenant_num, table_name, feishu_service) and success
+                continue
+
+            # 回退一小段时间，避免遗漏与水位线同一毫秒内的更新（重复写入是幂等的）
+            since = state['watermark'] - self.sync_overlap_ms
+            result = feishu_service.list_records_updated_since(table_name, since)
+            if not result['success']:
+                logger.error(f"增量同步租户副本失败 {tenant_num}/{table_name}: {result['message']}")
+                success = False
+                continue
+            count = replica.apply_changes(table_name, result['data'])
+            logger.debug(f"增量同步租户副本: {tenant_num}/{table_name}, 变更记录数: {count}")
+        return success
+
+    def close(self):
+        """关闭所有副本连接"""
+        with self._lock:
+            for replica in self._replicas.values():
+                replica.close()
+
+
+# 全局副本服务实例
+replica_service = LocalReplicaService()
@@ -5,6 +5,7 @@
 
 import sys
 import os
+import re
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import traceback
 
@@ -18,22 +19,38 @@ import logging
 from config import config
 from services.cache_service import cache_service
 from services.feishu_service import FeishuService
+from services.replica_service import replica_service
+from utils.metrics import metrics
+from utils.tracing import trace_scope
 
 
 
 logger = logging.getLogger(__name__)
 
+# 飞书多维表格记录ID格式，如 recuT512gzx6yw
+RECORD_ID_PATTERN = re.compile(r'^rec[0-9A-Za-z]{1,30}$')
+
+SCHEDULER_RUNS = metrics.counter('scheduler_runs_total', '定时任务执行次数，result 为 success、failure 或 error',
+                                 ('job', 'result'))
+SCHEDULER_SECONDS = metrics.histogram('scheduler_run_seconds', '定时任务耗时（秒）', ('job',),
+                                      buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600))
+
 class TenantService:
     """多租户管理服务类"""
     
     def __init__(self):
         """初始化租户服务"""
         self.cache_service = cache_service
+        self.replica_service = replica_service
         self.tenant_nums = set()
+        # 最近一次从系统管理表读取的租户信息，刷新周期内不必回读缓存
+        self.tenant_infos = {}
         self.system_feishu_service = None
         self.tenat_feishu_service = {}
         self._update_thread = None
         self._stop_update = False
+        # 数据变更监听器，签名为 listener(tenant_num, table_name, record_ids)
+        self._change_listeners = []
         
         # 系统管理表配置
         self.sys_app_token = getattr(config, 'SYS_APP_TOKEN', None)
@@ -43,6 +60,16 @@ class TenantService:
         # 缓存更新间隔（分钟）
         self.cache_update_interval = getattr(config, 'CACHE_UPDATE_INTERVAL', 60)
         
+        # 本地副本配置
+        self.replica_enabled = getattr(config, 'LOCAL_REPLICA_ENABLED', False)
+        
+        # 不存在产品ID的负缓存有效期（秒）
+        self.negative_cache_ttl = getattr(config, 'NEGATIVE_CACHE_TTL', 300)
+        # 农户新增时清除对应产品ID的负缓存
+        self.add_change_listener(self._clear_missing_farmers)
+        # 任意表变更后预序列化的农户响应全部失效
+        self.add_change_listener(self._invalidate_payloads)
+        
         logger.info("多租户管理服务初始化完成")
     
     def _init_system_feishu_service(self) -> bool:
@@ -57,7 +84,7 @@ class TenantService:
                 return False
             
             # 创建系统级飞书服务实例
-            self.system_feishu_service= FeishuService(self.sys_app_token, self.sys_personal_base_token)
+            self.system_feishu_service= FeishuService(self.sys_app_token, self.sys_personal_base_token, tenant_num='system')
             
             logger.info("系统级飞书服务初始化成功")
             return True
@@ -65,9 +92,12 @@ class TenantService:
             logger.error(f"初始化系统级飞书服务失败: {str(e)}")
             return False
     
-    def load_system_tenants(self) -> bool:
+    def load_system_tenants(self, batch=None) -> bool:
         """从系统管理表加载租户信息
         
+        Args:
+            batch: 缓存批量写入，为空时本方法内单独提交
+            
         Returns:
             bool: 加载是否成功
         """
@@ -90,6 +120,10 @@ class TenantService:
                 logger.warning("系统管理表中没有租户数据")
                 return True
             
+            own_batch = batch is None
+            if own_batch:
+                batch = self.cache_service.write_batch()
+            
             tenant_count = 0
             for record in records:
                 fields = record.get('fields', {})
@@ -122,11 +156,14 @@ class TenantService:
                 }
                 
                 # 缓存租户信息
-                if self.cache_service.cache_tenant_info(tenant_num, tenant_data):
-                    tenant_count += 1
-                    logger.debug(f"成功加载租户: {tenant_name} ({tenant_num})")
-                else:
-                    logger.error(f"缓存租户信息失败,编号: {tenant_num}")
+                self.tenant_infos[tenant_num] = tenant_data
+                batch.cache_tenant_info(tenant_num, tenant_data)
+                tenant_count += 1
+                logger.debug(f"成功加载租户: {tenant_name} ({tenant_num})")
+            
+            if own_batch and not batch.execute():
+                logger.error("缓存租户信息失败")
+                return False
             
             logger.info(f"成功加载 {tenant_count} 个租户信息")
             return tenant_count > 0
@@ -135,6 +172,10 @@ class TenantService:
             logger.error(f"加载系统租户信息失败: {str(e)}")
             return False
     
+    def _get_loaded_tenant_info(self, tenant_num: str) -> Optional[Dict[str, Any]]:
+        """获取租户信息，优先使用本周期从系统管理表读取的数据（此时可能尚未提交到缓存）"""
+        return self.tenant_infos.get(tenant_num) or self.cache_service.get_tenant_info(tenant_num)
+    
     def load_tenant_tables(self, tenant_num: str) -> bool:
         """加载指定租户的表信息
         
@@ -146,8 +187,10 @@ class TenantService:
         """
         try:
             # 创建租户专用的飞书服务
-            tenant_info = self.cache_service.get_tenant_info(tenant_num)
-            tenant_feishu = FeishuService(tenant_info['app_token'], tenant_info['personal_base_token'])
+            tenant_info = self._get_loaded_tenant_info(tenant_num)
+            replica = self.replica_service.get_replica(tenant_num) if self.replica_enabled else None
+            tenant_feishu = FeishuService(tenant_info['app_token'], tenant_info['personal_base_token'], replica=replica,
+                                          tenant_num=tenant_num)
             self.tenat_feishu_service[tenant_num] = tenant_feishu
             logger.info(f"成功加载租户表信息: {tenant_num}, 表数量: {len(tenant_feishu.tables_cache)}")
             return len(tenant_feishu.tables_cache) > 0
@@ -163,11 +206,12 @@ class TenantService:
         return tenant_feishu
     
 
-    def load_tenant_farmer_ids(self, tenant_num: str) -> bool:
+    def load_tenant_farmer_ids(self, tenant_num: str, batch=None) -> bool:
         """加载指定租户的农户ID列表
         
         Args:
             tenant_num: 租户编号
+            batch: 缓存批量写入，为空时本方法内单独提交
             
         Returns:
             bool: 加载是否成功
@@ -177,16 +221,19 @@ class TenantService:
             # 获取租户表信息
             tenant_feishu = self.get_tenant_feishu_service(tenant_num)
             
-            farmer_data = tenant_feishu.get_table_records('农户管理')
+            farmer_data = tenant_feishu.get_all_record_ids('农户管理')
             if not farmer_data['success']:
                 logger.error(f"获取农户管理表数据失败: {farmer_data['message']}")
                 return False
-            # 获取农户数据
-            records = farmer_data['data'].get('items', [])
-            farmer_ids = [record.get('record_id') for record in records if record.get('record_id')]
+            # 获取农户数据（分页读取整张表）
+            farmer_ids = farmer_data['data']
             # 缓存农户ID列表
-            tenant_info = self.cache_service.get_tenant_info(tenant_num)
+            tenant_info = self._get_loaded_tenant_info(tenant_num)
             authorized_count = tenant_info.get('authorized_count', 0)
+            if batch is not None:
+                batch.cache_farmer_ids(tenant_num, farmer_ids, authorized_count)
+                logger.info(f"租户：{tenant_num} , 授权: {len(farmer_ids)}、{authorized_count}")
+                return True
             if self.cache_service.cache_farmer_ids(tenant_num, farmer_ids, authorized_count):
                 logger.info(f"租户：{tenant_num} , 授权: {len(farmer_ids)}、{authorized_count}")
                 return True
@@ -198,6 +245,40 @@ class TenantService:
             logger.error(f"加载农户ID列表失败 {tenant_num}: {str(e)}")
             return False
     
+    def sync_tenant_replica(self, tenant_num: str, full: bool = False) -> bool:
+        """同步指定租户的本地副本（默认增量同步，按需全量校对）
+        
+        Args:
+            tenant_num: 租户编号
+            full: 是否强制全量同步
+            
+        Returns:
+            bool: 同步是否成功
+        """
+        if not self.replica_enabled:
+            return False
+        try:
+            tenant_feishu = self.get_tenant_feishu_service(tenant_num)
+            if not self.replica_service.sync_tenant(tenant_num, tenant_feishu, full=full):
+                return False
+            # 同步拉取的变更不经过事件回调，需要单独使旧响应失效
+            self.cache_service.bump_payload_generation(tenant_num)
+            return True
+        except Exception as e:
+            logger.error(f"同步租户本地副本失败 {tenant_num}: {str(e)}")
+            return False
+    
+    def sync_replicas(self) -> bool:
+        """增量同步所有租户的本地副本（由调度器定时调用）
+        
+        Returns:
+            bool: 是否全部同步成功
+        """
+        success = True
+        for tenant_num in list(self.tenat_feishu_service.keys()):
+            success = self.sync_tenant_replica(tenant_num) and success
+        return success
+    
     def initialize_cache(self) -> bool:
         """初始化所有缓存数据
         
@@ -207,9 +288,14 @@ class TenantService:
         try:
             #logger.info("开始初始化多租户缓存数据")
             
+            # 本周期的数据全部写入新的缓存版本，完成后一次切换，读请求看到的始终是完整的某一周期数据
+            generation = self.cache_service.new_generation()
+            batch = self.cache_service.write_batch(generation)
+            
             # 1. 加载系统租户信息
-            if not self.load_system_tenants():
+            if not self.load_system_tenants(batch=batch):
                 logger.error("加载系统租户信息失败")
+                self.cache_service.drop_generation(generation)
                 return False
             
             # 3. 为每个租户加载表信息和农户ID
@@ -219,8 +305,10 @@ class TenantService:
                     # 加载表信息
                     logger.info(f"开始加载租户表信息: {tenant_num}")
                     if self.load_tenant_tables(tenant_num):
+                        # 先同步本地副本，副本读取模式下农户ID才能包含上一周期之后新增的农户
+                        self.sync_tenant_replica(tenant_num)
                         # 加载农户ID列表
-                        if self.load_tenant_farmer_ids(tenant_num):
+                        if self.load_tenant_farmer_ids(tenant_num, batch=batch):
                             success_count += 1
                         else:
                             logger.warning(f"加载农户ID失败: {tenant_num}")
@@ -229,8 +317,26 @@ class TenantService:
                 except Exception as e:
                     logger.error(f"处理租户失败 {tenant_num}: {str(e)}")
             
-            logger.info(f"缓存初始化完成，成功处理 {success_count} 个租户")
-            return success_count > 0
+            if not success_count:
+                logger.error("没有租户加载成功，保留当前缓存版本")
+                self.cache_service.drop_generation(generation)
+                return False
+            
+            # 加载失败的租户沿用当前版本的数据
+            batch.carry_over([tenant_num for tenant_num in self.tenant_nums if ('tenant', tenant_num) in batch.written])
+            
+            # 4. 提交本周期的全部写入并切换缓存版本
+            if not batch.execute() or not self.cache_service.activate_generation(generation):
+                logger.error("提交缓存数据失败")
+                self.cache_service.drop_generation(generation)
+                return False
+            
+            # 新版本的租户信息和农户列表生效后，旧版本数据生成的响应不再使用
+            for tenant_num in self.tenant_nums:
+                self.cache_service.bump_payload_generation(tenant_num)
+            
+            logger.info(f"缓存初始化完成，成功处理 {success_count} 个租户，缓存版本: {generation}")
+            return True
             
         except Exception as e:
             logger.error(f"初始化缓存失败: {str(e)}")
@@ -253,7 +359,9 @@ class TenantService:
         """启动缓存更新调度器"""
         try:
             # 设置定时任务
-            schedule.every(self.cache_update_interval).minutes.do(self.update_cache)
+            schedule.every(self.cache_update_interval).minutes.do(self._run_job, 'update_cache', self.update_cache)
+            if self.replica_enabled:
+                schedule.every(config.REPLICA_SYNC_INTERVAL).minutes.do(self._run_job, 'sync_replicas', self.sync_replicas)
             
             def run_scheduler():
                 while not self._stop_update:
@@ -268,6 +376,19 @@ class TenantService:
         except Exception as e:
             logger.error(f"启动缓存更新调度器失败: {str(e)}")
     
+    def _run_job(self, job: str, func):
+        """执行定时任务并记录耗时和结果，任务内的飞书调用来源记为 job:<任务名>，任务异常不影响调度线程"""
+        started = time.perf_counter()
+        result = 'error'
+        try:
+            with trace_scope(f'job:{job}'):
+                result = 'success' if func() else 'failure'
+        except Exception as e:
+            logger.error(f"定时任务执行失败 {job}: {str(e)}")
+        finally:
+            SCHEDULER_SECONDS.observe(time.perf_counter() - started, job)
+            SCHEDULER_RUNS.inc(job, result)
+    
     def stop_cache_update_scheduler(self):
         """停止缓存更新调度器"""
         try:
@@ -343,12 +464,61 @@ class TenantService:
         """
         return self.cache_service.is_farmer_authorized(tenant_num, farmer_id)
     
-    def get_tenant_farm_info(self, tenant_num: str, farmer_id: str) -> Dict[str, Any]:
+    def check_product_exists(self, tenant_num: str, farmer_id: str) -> bool:
+        """在本地判断产品ID是否可能存在，确定不存在的产品ID不再请求飞书
+        
+        记录ID格式错误或在负缓存有效期内的产品ID视为不存在；已在租户农户ID集合中的产品ID
+        不受负缓存影响。集合中没有的产品ID只表示未知（可能是刚新增的农户），仍需请求飞书确认
+        
+        Args:
+            tenant_num: 租户编号
+            farmer_id: 农户ID
+            
+        Returns:
+            bool: 确定不存在返回False
+        """
+        if not RECORD_ID_PATTERN.match(farmer_id or ''):
+            return False
+        if self.cache_service.is_known_farmer(tenant_num, farmer_id):
+            return True
+        return not self.cache_service.is_product_missing(tenant_num, farmer_id)
+    
+    def _not_found_response(self, farmer_id: str) -> Dict[str, Any]:
+        """产品不存在的响应"""
+        return {
+            'success': False,
+            'message': f'未找到记录ID为 {farmer_id} 的农户信息',
+            'data': None,
+            'not_found': True
+        }
+    
+    def _remember_missing(self, tenant_num: str, farmer_id: str, result: Dict[str, Any]):
+        """飞书确认产品不存在时写入负缓存"""
+        if result.get('not_found'):
+            self.cache_service.mark_product_missing(tenant_num, farmer_id, self.negative_cache_ttl)
+    
+    def _clear_missing_farmers(self, tenant_num: str, table_name: str, record_ids: List[str]):
+        """农户管理表变更时清除负缓存和缓存的农户名称（变更监听器）"""
+        if table_name == '农户管理':
+            self.cache_service.clear_missing_products(tenant_num, record_ids)
+            feishu_service = self.tenat_feishu_service.get(tenant_num)
+            if feishu_service:
+                feishu_service.forget_farmer_names(record_ids)
+    
+    def _invalidate_payloads(self, tenant_num: str, table_name: str, record_ids: List[str]):
+        """数据变更时使租户的预序列化响应失效（变更监听器）"""
+        self.cache_service.bump_payload_generation(tenant_num)
+    
+    def get_tenant_farm_info(self, tenant_num: str, farmer_id: str,
+                             feeding_page_size: Optional[int] = None,
+                             sections: Optional[set] = None) -> Dict[str, Any]:
         """获取租户专用的农户完整信息
         
         Args:
             tenant_num: 租户编号
             farmer_id: 农户ID
+            feeding_page_size: 饲喂记录只返回第一页时的每页记录数，为空时返回全部
+            sections: 需要的数据块，为空时返回全部
             
         Returns:
             Dict: 包含success、data、message的响应
@@ -363,10 +533,18 @@ class TenantService:
                     'data': None
                 }
             
+            if not self.check_product_exists(tenant_num, farmer_id):
+                return self._not_found_response(farmer_id)
+            
             # 创建租户专用的飞书服务
             tenant_feishu = self.get_tenant_feishu_service(tenant_num)
+            if sections is not None and not self.cache_service.is_known_farmer(tenant_num, farmer_id):
+                # 不在农户ID集合中的产品ID需要查询一次农户信息确认存在
+                sections = set(sections) | {'product_info'}
             # 调用飞书服务获取农户完整信息
-            result = tenant_feishu.get_farm_complete_info(farmer_id)
+            result = tenant_feishu.get_farm_complete_info(farmer_id, feeding_page_size=feeding_page_size,
+                                                          sections=sections)
+            self._remember_missing(tenant_num, farmer_id, result)
             return result
             
         except Exception as e:
@@ -378,6 +556,185 @@ class TenantService:
                 'data': None
             }
     
+    def get_tenant_feeding_records(self, tenant_num: str, farmer_id: str, page_size: int,
+                                   cursor: Optional[str] = None) -> Dict[str, Any]:
+        """分页获取租户下农户的饲喂记录
+        
+        Args:
+            tenant_num: 租户编号
+            farmer_id: 农户ID
+            page_size: 每页记录数
+            cursor: 上一页返回的 next_cursor
+            
+        Returns:
+            Dict: 包含success、data、message的响应
+        """
+        try:
+            tenant_info = self.cache_service.get_tenant_info(tenant_num)
+            if not tenant_info:
+                return {
+                    'success': False,
+                    'message': f'租户不存在: {tenant_num}',
+                    'data': None
+                }
+            
+            if not self.check_product_exists(tenant_num, farmer_id):
+                return self._not_found_response(farmer_id)
+            
+            tenant_feishu = self.get_tenant_feishu_service(tenant_num)
+            result = tenant_feishu.get_feeding_records_page(farmer_id, page_size, cursor)
+            self._remember_missing(tenant_num, farmer_id, result)
+            return result
+            
+        except Exception as e:
+            logger.error(f"分页获取饲喂记录异常 {tenant_num}/{farmer_id}: {str(e)}")
+            traceback.print_exc()
+            return {
+                'success': False,
+                'message': f'获取饲喂记录失败: {str(e)}',
+                'data': None
+            }
+    
+    def add_change_listener(self, listener):
+        """注册数据变更监听器，飞书数据变更时用于失效依赖该数据的缓存
+        
+        Args:
+            listener: 回调函数 listener(tenant_num, table_name, record_ids)，
+                      record_ids 为空列表时表示整张表（如表结构变更）
+        """
+        self._change_listeners.append(listener)
+    
+    def notify_records_updated(self, tenant_num: str, table_name: str, record_ids: List[str]):
+        """本服务写入飞书后通知数据变更监听器，未开启事件订阅时依赖该数据的缓存也能及时失效"""
+        self._notify_change(tenant_num, table_name, record_ids)
+    
+    def _notify_change(self, tenant_num: str, table_name: str, record_ids: List[str]):
+        """通知所有数据变更监听器"""
+        for listener in self._change_listeners:
+            try:
+                listener(tenant_num, table_name, record_ids)
+            except Exception as e:
+                logger.error(f"数据变更监听器执行失败 {tenant_num}/{table_name}: {str(e)}")
+    
+    def find_tenant_by_app_token(self, app_token: str) -> Optional[str]:
+        """根据多维表格 APP_TOKEN 查找租户编号
+        
+        Args:
+            app_token: 多维表格 APP_TOKEN（事件中的 file_token）
+            
+        Returns:
+            Optional[str]: 租户编号，未找到返回None
+        """
+        for tenant_num, tenant_feishu in self.tenat_feishu_service.items():
+            if tenant_feishu and tenant_feishu.app_token == app_token:
+                return tenant_num
+        return None
+    
+    def handle_bitable_event(self, event_type: str, event: Dict[str, Any]) -> bool:
+        """处理飞书多维表格变更事件，精确失效或刷新受影响的租户、数据表和记录
+        
+        Args:
+            event_type: 事件类型，如 drive.file.bitable_record_changed_v1
+            event: 事件内容
+            
+        Returns:
+            bool: 事件是否属于已知租户并已处理
+        """
+        tenant_num = self.find_tenant_by_app_token(event.get('file_token'))
+        if tenant_num is None:
+            logger.info(f"忽略未知多维表格的事件: {event.get('file_token')}")
+            return False
+        tenant_feishu = self.get_tenant_feishu_service(tenant_num)
+        table_id = event.get('table_id')
+        table_name = tenant_feishu.get_table_name_by_id(table_id)
+        
+        if event_type == 'drive.file.bitable_field_changed_v1':
+            # 表结构变更：刷新字段缓存，副本中的原始字段不受影响
+            table_name = tenant_feishu.refresh_table_schema(table_id)
+            if table_name:
+                self._notify_change(tenant_num, table_name, [])
+            logger.info(f"已刷新表结构缓存: {tenant_num}/{table_name or table_id}")
+            return True
+        
+        if not table_name:
+            logger.info(f"忽略未知数据表的事件: {tenant_num}/{table_id}")
+            return False
+        
+        changed_ids, deleted_ids = [], []
+        for action in event.get('action_list') or []:
+            record_id = action.get('record_id')
+            if not record_id:
+                continue
+            if action.get('action') == 'record_deleted':
+                deleted_ids.append(record_id)
+            else:
+                changed_ids.append(record_id)
+        
+        # 刷新本地副本中受影响的记录
+        if tenant_feishu.replica is not None:
+            if deleted_ids:
+                tenant_feishu.replica.delete_records(table_name, deleted_ids)
+            if changed_ids:
+                result = tenant_feishu.batch_get_records(table_name, changed_ids)
+                if result['success']:
+                    tenant_feishu.replica.upsert_records(table_name, result['data'])
+                else:
+                    logger.error(f"刷新副本记录失败 {tenant_num}/{table_name}: {result['message']}")
+        
+        # 农户增删会影响授权农户列表
+        added = any(action.get('action') == 'record_added' for action in event.get('action_list') or [])
+        if table_name == '农户管理' and (added or deleted_ids):
+            self.load_tenant_farmer_ids(tenant_num)
+        
+        self._notify_change(tenant_num, table_name, changed_ids + deleted_ids)
+        logger.info(f"已处理数据变更事件: {tenant_num}/{table_name}, 变更: {len(changed_ids)}, 删除: {len(deleted_ids)}")
+        return True
+    
+    def get_tenant_farms_info(self, tenant_num: str, farmer_ids: List[str],
+                              feeding_page_size: Optional[int] = None) -> Dict[str, Any]:
+        """批量获取租户下多个农户的完整信息
+        
+        Args:
+            tenant_num: 租户编号
+            farmer_ids: 农户ID列表
+            feeding_page_size: 饲喂记录只返回第一页时的每页记录数，为空时返回全部
+            
+        Returns:
+            Dict: 包含success、data、message的响应，data 为 {'items': {...}, 'missing': [...]}
+        """
+        try:
+            tenant_info = self.cache_service.get_tenant_info(tenant_num)
+            if not tenant_info:
+                return {
+                    'success': False,
+                    'message': f'租户不存在: {tenant_num}',
+                    'data': None
+                }
+            
+            # 本地确定不存在的产品ID直接归入 missing，不请求飞书
+            known_ids = [farmer_id for farmer_id in farmer_ids if self.check_product_exists(tenant_num, farmer_id)]
+            tenant_feishu = self.get_tenant_feishu_service(tenant_num)
+            result = tenant_feishu.get_farms_complete_info(known_ids, feeding_page_size) if known_ids else {
+                'success': True,
+                'data': {'items': {}, 'missing': []},
+                'message': 'success'
+            }
+            if result['success']:
+                for farmer_id in result['data']['missing']:
+                    self.cache_service.mark_product_missing(tenant_num, farmer_id, self.negative_cache_ttl)
+                result['data']['missing'] = [farmer_id for farmer_id in farmer_ids
+                                             if farmer_id not in result['data']['items']]
+            return result
+            
+        except Exception as e:
+            logger.error(f"批量获取租户农户信息异常 {tenant_num}: {str(e)}")
+            traceback.print_exc()
+            return {
+                'success': False,
+                'message': f'批量获取农户信息失败: {str(e)}',
+                'data': None
+            }
+    
     def get_tenant_stats(self) -> Dict[str, Any]:
         """获取租户统计信息
         
@@ -452,6 +809,7 @@ class TenantService:
             # 调用批量更新接口
             update_result = tenant_feishu.batch_update_records('传感器', update_records)
             if update_result['success']:
+                self.notify_records_updated(tenant_num, '传感器', [target_record_id])
                 logger.info(f"更新传感器 {sensor_data['id']} 的 motion 数据: {sensor_data['motion']} 成功")
             else:
                 logger.error(f"更新传感器数据失败: {update_result['message']}")
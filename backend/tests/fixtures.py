@@ -0,0 +1,147 @@
+"""测试公共夹具
+
+各测试模块共用的临时缓存数据库、本地副本、飞书服务等测试基类和辅助函数
+"""
+
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from unittest.mock import patch
+from services.cache_service import MultiTenantCacheService
+from services.cache_backends import create_cache_client
+from services.replica_service import LocalReplicaService
+from services.feishu_service import FeishuService
+
+
+def make_feishu_service(tables: dict, replica=None) -> FeishuService:
+    """创建不请求飞书初始化的飞书服务，tables 为 {表名: 表ID}"""
+    with patch.object(FeishuService, '_init_tables_cache'), patch.object(FeishuService, '_init_time_cache'):
+        feishu_service = FeishuService('app_token', 'personal_token', replica=replica)
+    feishu_service.tables_cache = dict(tables)
+    return feishu_service
+
+
+def load_fixture(replica):
+    """写入测试用的四张表数据"""
+    replica.replace_table('传感器', [
+        {'record_id': 'recS1', 'fields': {'名称': '温度', '数据': '26.0'}},
+        {'record_id': 'recS2', 'fields': {'名称': '湿度', '数据': '47.0'}},
+    ])
+    replica.replace_table('农户管理', [
+        {'record_id': 'recF1', 'fields': {'饲养农户': '张三', '标题': '张三的土鸡'}},
+        {'record_id': 'recF2', 'fields': {'饲养农户': '李四', '标题': '李四的土鸡'}},
+        {'record_id': 'recF3', 'fields': {'饲养农户': '王五', '标题': '王五的土鸡'}},
+    ])
+    replica.replace_table('饲喂记录', [
+        {'record_id': 'recA1', 'fields': {'农户': '张三', '食物': '玉米', '操作时间': 1000, '更新': 1}},
+        {'record_id': 'recA2', 'fields': {'农户': '李四', '食物': '稻谷', '操作时间': 2000, '更新': 2}},
+        {'record_id': 'recA3', 'fields': {'农户': '张三', '食物': '青菜', '操作时间': 3000, '更新': 3}},
+    ])
+    replica.replace_table('养殖流程', [
+        {'record_id': 'recB1', 'fields': {'农户': '张三', '流程': '入栏', '操作时间': 500, '更新': 1}},
+    ])
+
+
+class TempCacheTestCase(unittest.TestCase):
+    """使用临时缓存数据库的测试基类，同一测试类共用一个 redislite 实例"""
+
+    @classmethod
+    def setUpClass(cls):
+        """创建临时缓存数据库"""
+        cls.cache_dir = tempfile.mkdtemp()
+        cls.cache_service = MultiTenantCacheService(os.path.join(cls.cache_dir, 'cache.db'), backend='redislite')
+
+    @classmethod
+    def tearDownClass(cls):
+        """停止 redislite 服务并删除临时目录"""
+        # 先停止服务再删除目录，否则退出时停止服务会因数据目录不存在而等待超时
+        cls.cache_service.redis_client._cleanup()
+        shutil.rmtree(cls.cache_dir, ignore_errors=True)
+
+    def setUp(self):
+        """每个测试前清空缓存"""
+        self.cache_service.redis_client.flushall()
+        self.cache_service.get_generation(refresh=True)
+
+
+class CacheBackendTestCase(unittest.TestCase):
+    """按缓存后端参数化的测试基类，子类设置 backend，测试用例写在混入类中
+
+    redislite、redis 后端的同一测试类共用一个 redislite 启动的 redis-server（unix socket），
+    redis 后端也可以通过环境变量 CACHE_TEST_REDIS_URL 指定独立部署的 Redis。
+    """
+
+    backend = 'redislite'
+
+    @classmethod
+    def setUpClass(cls):
+        """创建临时目录，需要 redis-server 的后端启动 redislite"""
+        cls.cache_dir = tempfile.mkdtemp()
+        cls.server = None
+        if cls.backend in ('redislite', 'redis'):
+            cls.server = create_cache_client('redislite', os.path.join(cls.cache_dir, 'cache.db'))
+
+    @classmethod
+    def tearDownClass(cls):
+        """停止 redislite 服务并删除临时目录"""
+        if cls.server is not None:
+            cls.server._cleanup()
+        shutil.rmtree(cls.cache_dir, ignore_errors=True)
+
+    def make_cache_service(self) -> MultiTenantCacheService:
+        if self.backend == 'memory':
+            return MultiTenantCacheService(backend='memory')
+        if self.backend == 'sqlite':
+            service = MultiTenantCacheService(os.path.join(self.cache_dir, 'cache.sqlite3'), backend='sqlite')
+            self.addCleanup(service.close)
+            return service
+        if self.backend == 'redis':
+            url = os.environ.get('CACHE_TEST_REDIS_URL') or f'unix://{self.server.socket_file}'
+            return MultiTenantCacheService(backend='redis', url=url)
+        # 同一数据库文件的 redislite 客户端连接到已启动的 redis-server
+        return MultiTenantCacheService(os.path.join(self.cache_dir, 'cache.db'), backend='redislite')
+
+    def setUp(self):
+        """每个测试使用清空的缓存，测试后断开连接以便 redis-server 正常退出"""
+        self.cache_service = self.make_cache_service()
+        self.client = self.cache_service.redis_client
+        self.client.flushall()
+        self.cache_service.get_generation(refresh=True)
+        if self.server is not None:
+            self.addCleanup(self.client.connection_pool.disconnect)
+
+
+class TempReplicaTestCase(unittest.TestCase):
+    """使用临时本地副本目录的测试基类"""
+
+    def setUp(self):
+        """创建临时副本目录"""
+        self.base_dir = tempfile.mkdtemp()
+        self.replica_service = LocalReplicaService(self.base_dir)
+
+    def tearDown(self):
+        """关闭副本并删除临时目录"""
+        self.replica_service.close()
+        shutil.rmtree(self.base_dir, ignore_errors=True)
+
+
+class FarmInfoTestCase(TempReplicaTestCase):
+    """基于本地副本的飞书服务测试基类，副本中写入 load_fixture 的数据，禁止请求飞书"""
+
+    def setUp(self):
+        """测试前准备"""
+        super().setUp()
+        replica = self.replica_service.get_replica('T001')
+        load_fixture(replica)
+        self.feishu_service = make_feishu_service({
+            '传感器': 'tbl001', '农户管理': 'tbl002', '饲喂记录': 'tbl003', '养殖流程': 'tbl004'
+        }, replica=replica)
+        self.feishu_service.read_mode = 'replica'
+
+        patcher = patch('requests.get', side_effect=AssertionError('不应请求飞书'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
@@ -0,0 +1,80 @@
+"""静态资源构建测试模块"""
+
+import unittest
+import sys
+import os
+import gzip
+import shutil
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, request
+from build_assets import build_assets
+from utils.assets import AssetManifest, IMMUTABLE_CACHE_CONTROL, send_asset
+
+
+class TestBuildAssets(unittest.TestCase):
+    """静态资源构建测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.static_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.static_dir)
+        os.makedirs(os.path.join(self.static_dir, 'js'))
+        self._write('js/main.js', 'console.log("土鸡");' * 100)
+        self._write('logo.png', 'png')
+
+    def _write(self, path, content):
+        with open(os.path.join(self.static_dir, path), 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    def test_build(self):
+        """测试生成带哈希的文件、预压缩文件和清单"""
+        assets = build_assets(self.static_dir)
+        self.assertEqual(list(assets), ['js/main.js'])
+        target = os.path.join(self.static_dir, 'dist', assets['js/main.js'])
+        with open(target + '.gz', 'rb') as f, open(target, 'rb') as source:
+            self.assertEqual(gzip.decompress(f.read()), source.read())
+
+        manifest = AssetManifest(self.static_dir)
+        self.assertEqual(manifest.url('js/main.js'), f"/static/dist/{assets['js/main.js']}")
+        self.assertEqual(manifest.url('css/missing.css', '/cdn'), '/cdn/css/missing.css')
+
+    def test_rebuild_removes_old_version(self):
+        """测试资源变化后地址变化，旧版本文件被删除"""
+        old = build_assets(self.static_dir)['js/main.js']
+        manifest = AssetManifest(self.static_dir)
+        manifest.url('js/main.js')
+        self._write('js/main.js', 'console.log("新版本");')
+        new = build_assets(self.static_dir)['js/main.js']
+        self.assertNotEqual(old, new)
+        self.assertFalse(os.path.exists(os.path.join(self.static_dir, 'dist', old)))
+        self.assertFalse(os.path.exists(os.path.join(self.static_dir, 'dist', old + '.gz')))
+        os.utime(manifest.path, (0, 0))
+        self.assertTrue(manifest.url('js/main.js').endswith(new))
+
+    def test_serve_precompressed(self):
+        """测试返回预压缩文件和永久缓存头"""
+        path = 'dist/' + build_assets(self.static_dir)['js/main.js']
+        app = Flask(__name__, static_folder=None)
+
+        @app.route('/static/<path:filename>')
+        def static_files(filename):
+            return send_asset(self.static_dir, filename, request.headers.get('Accept-Encoding'))
+
+        client = app.test_client()
+        response = client.get(f'/static/{path}', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(response.headers['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
+        self.assertIn('javascript', response.headers['Content-Type'])
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        response.close()
+
+        response = client.get(f'/static/{path}')
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertIn('土鸡'.encode('utf-8'), response.data)
+        response.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+"""缓存存储后端测试模块
+
+缓存版本切换、租户编号集合、过期键、事务等后端相关的测试分别在各个后端上运行；
+基本的缓存读写测试见 test_multi_tenant.py（同样在各个后端上运行）。
+"""
+
+import unittest
+import sys
+import os
+import threading
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from redis.exceptions import WatchError
+from services.cache_service import MultiTenantCacheService
+from tests.fixtures import CacheBackendTestCase
+
+
+class CacheBackendTests:
+    """各后端共用的测试用例"""
+
+    def test_tenant_registry(self):
+        """测试租户编号集合的维护、旧缓存补建和按命名空间统计"""
+        self.cache_service.cache_tenant_info('T002', {'tenant_num': 'T002'})
+        self.cache_service.cache_tenant_info('T001', {'tenant_num': 'T001'})
+        self.cache_service.cache_farmer_ids('T001', ['farmer001'], 1)
+        self.assertIsNone(self.cache_service.get_tenant_info('T003'))
+        self.assertEqual(self.cache_service.get_all_tenant_numbers(), ['T001', 'T002'])
+        stats = self.cache_service.get_cache_stats()
+        self.assertEqual(stats['tenant_count'], 2)
+        self.assertEqual(stats['namespace_keys'],
+                         {'tenant': 2, 'tenant_tables': 0, 'farmer_ids': 1, 'known_farmers': 1})
+
+        self.cache_service.clear_tenant_cache('T002')
+        self.assertEqual(self.cache_service.get_all_tenant_numbers(), ['T001'])
+
+        # 升级前写入的缓存没有租户编号集合
+        self.client.delete(self.cache_service.TENANT_REGISTRY_KEY)
+        self.assertEqual(self.cache_service.get_all_tenant_numbers(), ['T001'])
+        self.assertTrue(self.client.sismember(self.cache_service.TENANT_REGISTRY_KEY, 'T001'))
+        self.assertEqual(self.cache_service.scan_key_counts(),
+                         {'tenant': 1, 'farmer_ids': 1, 'known_farmers': 1, 'system': 1})
+
+    def test_generation_swap(self):
+        """测试写入新版本、切换、回滚和回收旧版本"""
+        self.cache_service.cache_tenant_info('T001', {'tenant_num': 'T001', 'tenant_name': '旧'})
+        generation = self.cache_service.new_generation()
+        batch = self.cache_service.write_batch(generation)
+        batch.cache_tenant_info('T001', {'tenant_num': 'T001', 'tenant_name': '新'})
+        self.assertTrue(batch.execute())
+        self.assertEqual(self.cache_service.get_tenant_info('T001')['tenant_name'], '旧')
+
+        self.assertTrue(self.cache_service.activate_generation(generation))
+        self.assertEqual(self.cache_service.get_tenant_info('T001')['tenant_name'], '新')
+        self.assertTrue(self.cache_service.rollback_generation())
+        self.assertEqual(self.cache_service.get_tenant_info('T001')['tenant_name'], '旧')
+        self.assertTrue(self.cache_service.rollback_generation())
+        self.assertEqual(self.cache_service.get_cache_stats()['generation'], generation)
+
+        # 再切换一次后，版本 0 的旧键被回收
+        self.assertTrue(self.cache_service.activate_generation(self.cache_service.new_generation()))
+        self.assertIsNone(self.client.get('tenant:T001'))
+        self.assertIsNotNone(self.client.get(self.cache_service._get_tenant_key('T001', generation)))
+
+    def test_expiring_keys(self):
+        """测试负缓存、事件去重和限流计数"""
+        self.cache_service.mark_product_missing('T001', 'recX', ttl=60)
+        self.assertTrue(self.cache_service.is_product_missing('T001', 'recX'))
+        self.assertTrue(0 < self.client.ttl(self.cache_service._get_missing_product_key('T001', 'recX')) <= 60)
+        self.assertTrue(self.cache_service.claim_event('ev1'))
+        self.assertFalse(self.cache_service.claim_event('ev1'))
+        self.cache_service.release_event('ev1')
+        self.assertTrue(self.cache_service.claim_event('ev1'))
+        self.assertEqual(self.cache_service.count_request('ip', '1.1.1.1', 60)[0], 1)
+        self.assertEqual(self.cache_service.count_request('ip', '1.1.1.1', 60)[0], 2)
+        self.client.set('short', '1', px=1)
+        threading.Event().wait(0.01)
+        self.assertIsNone(self.client.get('short'))
+
+    def test_payload_hash(self):
+        """测试预序列化响应的哈希读写"""
+        self.cache_service.set_payload('1:0:recF1:all', {'etag': b'"abc"', 'gzip': b'\x1f\x8b\x00'}, 60)
+        self.assertEqual(self.cache_service.get_payload('1:0:recF1:all', ['etag', 'gzip', 'br']),
+                         [b'"abc"', b'\x1f\x8b\x00', None])
+        self.cache_service.bump_payload_generation('1')
+        self.assertEqual(self.cache_service.get_payload_generation('1'), 1)
+        self.cache_service.record_rate_limited('ip')
+        self.assertEqual(self.cache_service.get_rate_limited_counts(), {'ip': 1})
+
+    def test_watch_conflict(self):
+        """测试 WATCH 的键被修改时事务放弃"""
+        self.client.set('counter', '1')
+        with self.client.pipeline() as pipe:
+            pipe.watch('counter')
+            self.assertEqual(pipe.get('counter'), b'1')
+            self.client.set('counter', '2')
+            pipe.multi()
+            pipe.set('counter', '3')
+            with self.assertRaises(WatchError):
+                pipe.execute()
+        self.assertEqual(self.client.get('counter'), b'2')
+
+
+class TestMemoryBackend(CacheBackendTests, CacheBackendTestCase):
+    """进程内缓存后端"""
+    backend = 'memory'
+
+
+class TestSQLiteBackend(CacheBackendTests, CacheBackendTestCase):
+    """SQLite 缓存后端"""
+    backend = 'sqlite'
+
+    def test_shared_between_clients(self):
+        """测试同一文件的两个客户端看到相同的数据"""
+        self.cache_service.cache_tenant_info('T001', {'tenant_num': 'T001'})
+        other = MultiTenantCacheService(self.cache_service.redis_client.db_path, backend='sqlite')
+        self.addCleanup(other.close)
+        self.assertEqual(other.get_tenant_info('T001')['tenant_num'], 'T001')
+
+
+class TestRedisliteBackend(CacheBackendTests, CacheBackendTestCase):
+    """redislite 缓存后端"""
+    backend = 'redislite'
+
+
+class TestRedisUrlBackend(CacheBackendTests, CacheBackendTestCase):
+    """redis 缓存后端"""
+    backend = 'redis'
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+"""缓存值编码测试模块"""
+
+import unittest
+import sys
+import os
+import json
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from unittest.mock import patch
+from utils import cache_codec
+from tests.fixtures import TempCacheTestCase
+
+
+TENANT = {'tenant_num': '1', 'tenant_name': '昆明远纳农业', 'authorized_count': 100, 'cached_at': '2025-08-06T09:49:21'}
+
+
+class TestCacheCodec(unittest.TestCase):
+    """编解码测试"""
+
+    def test_round_trip(self):
+        """测试编码后可以还原，且带版本头"""
+        value = cache_codec.encode(TENANT)
+        self.assertEqual(value[0], cache_codec.MAGIC)
+        self.assertEqual(value[1], cache_codec.VERSION)
+        self.assertFalse(cache_codec.is_legacy(value))
+        self.assertEqual(cache_codec.decode(value), TENANT)
+
+    def test_compress_large_values(self):
+        """测试超过阈值的值被压缩"""
+        data = {'farmer_ids': [f'recuT512gz{i:04d}' for i in range(2000)]}
+        value = cache_codec.encode(data)
+        self.assertNotEqual(value[2] & 0x0F, cache_codec.COMPRESSION_NONE)
+        self.assertLess(len(value), len(json.dumps(data)) / 3)
+        self.assertEqual(cache_codec.decode(value), data)
+        self.assertEqual(cache_codec.encode(TENANT)[2] & 0x0F, cache_codec.COMPRESSION_NONE)
+
+    def test_json_fallback(self):
+        """测试未安装 msgpack、zstandard 时使用 JSON 和 zlib，且可以被任意环境解码"""
+        data = {'farmer_ids': ['recA'] * 500}
+        with patch.object(cache_codec, 'msgpack', None), patch.object(cache_codec, 'zstandard', None):
+            value = cache_codec.encode(data)
+        self.assertEqual(value[2], cache_codec.FORMAT_JSON << 4 | cache_codec.COMPRESSION_ZLIB)
+        self.assertEqual(cache_codec.decode(value), data)
+
+    def test_legacy_and_invalid(self):
+        """测试旧的 JSON 格式可以解码，未知版本报错"""
+        legacy = json.dumps(TENANT, ensure_ascii=False).encode('utf-8')
+        self.assertTrue(cache_codec.is_legacy(legacy))
+        self.assertEqual(cache_codec.decode(legacy), TENANT)
+        with self.assertRaises(ValueError):
+            cache_codec.decode(bytes((cache_codec.MAGIC, cache_codec.VERSION + 1, 0)) + b'{}')
+
+
+class TestCacheMigration(TempCacheTestCase):
+    """旧格式缓存迁移测试"""
+
+    def test_migrate_on_read(self):
+        """测试读取旧的 JSON 值后改写为新格式"""
+        key = self.cache_service._get_tenant_key('1')
+        self.cache_service.redis_client.set(key, json.dumps(TENANT, ensure_ascii=False))
+        self.assertEqual(self.cache_service.get_tenant_info('1'), TENANT)
+        self.assertFalse(cache_codec.is_legacy(self.cache_service.redis_client.get(key)))
+        self.assertEqual(self.cache_service.get_tenant_info('1'), TENANT)
+
+    def test_new_format_written(self):
+        """测试写入的农户ID列表使用新格式且可以读出"""
+        farmer_ids = [f'recuT512gz{i:04d}' for i in range(100)]
+        self.cache_service.cache_farmer_ids('1', farmer_ids, 50)
+        value = self.cache_service.redis_client.get(self.cache_service._get_farmer_ids_key('1'))
+        self.assertFalse(cache_codec.is_legacy(value))
+        self.assertEqual(self.cache_service.get_farmer_ids('1')['farmer_ids'], farmer_ids[:50])
+
+
+if __name__ == '__main__':
+    unittest.main()
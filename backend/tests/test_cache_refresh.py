@@ -0,0 +1,160 @@
+"""缓存批量写入和版本切换测试模块"""
+
+import unittest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from unittest.mock import Mock, patch
+from services.tenant_service import TenantService
+from tests.fixtures import TempCacheTestCase
+
+
+SYSTEM_RECORDS = [
+    {'record_id': 'recT1', 'fields': {'编号': 'T001', '租户名称': '租户一', 'APP_TOKEN': 'app1',
+                                      'PERSONAL_BASE_TOKEN': 'token1', '授权农户数量': 2}},
+    {'record_id': 'recT2', 'fields': {'编号': 'T002', '租户名称': '租户二', 'APP_TOKEN': 'app2',
+                                      'PERSONAL_BASE_TOKEN': 'token2', '授权农户数量': 5}},
+]
+
+
+class TestCacheWriteBatch(TempCacheTestCase):
+    """批量写入测试"""
+
+    def test_invisible_until_execute(self):
+        """测试提交前读不到批量写入的数据，提交后全部可见"""
+        batch = self.cache_service.write_batch()
+        batch.cache_tenant_info('T001', {'tenant_num': 'T001', 'authorized_count': 2})
+        batch.cache_tenant_tables('T001', [{'table_name': '农户管理', 'table_id': 'tbl002'}])
+        batch.cache_farmer_ids('T001', ['recA', 'recB', 'recC'], 2)
+        self.assertIsNone(self.cache_service.get_tenant_info('T001'))
+        self.assertIsNone(self.cache_service.is_known_farmer('T001', 'recC'))
+
+        self.assertTrue(batch.execute())
+        self.assertEqual(self.cache_service.get_tenant_info('T001')['authorized_count'], 2)
+        self.assertEqual(self.cache_service.get_tenant_tables('T001')[0]['table_id'], 'tbl002')
+        self.assertEqual(self.cache_service.get_farmer_ids('T001')['farmer_ids'], ['recA', 'recB'])
+        self.assertTrue(self.cache_service.is_known_farmer('T001', 'recC'))
+        # 提交后批量写入可以复用，空批量直接成功
+        self.assertTrue(batch.execute())
+
+    def test_clear_tenant_cache(self):
+        """测试一次删除租户的全部缓存键"""
+        self.cache_service.cache_tenant_info('T001', {'tenant_num': 'T001'})
+        self.cache_service.cache_farmer_ids('T001', ['recA'], 1)
+        self.assertTrue(self.cache_service.clear_tenant_cache('T001'))
+        self.assertIsNone(self.cache_service.get_tenant_info('T001'))
+        self.assertIsNone(self.cache_service.is_known_farmer('T001', 'recA'))
+        self.assertFalse(self.cache_service.clear_tenant_cache('T001'))
+
+
+class TestRefreshCycle(TempCacheTestCase):
+    """缓存刷新周期测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        super().setUp()
+        self.tenant_service = TenantService()
+        self.tenant_service.cache_service = self.cache_service
+        self.tenant_service.system_feishu_service = Mock()
+        self.tenant_service.system_feishu_service.get_table_records.return_value = {
+            'success': True, 'data': {'items': SYSTEM_RECORDS}, 'message': 'success'
+        }
+
+    def test_refresh_committed_once(self):
+        """测试刷新过程中读不到本周期数据，周期结束后全部租户一次可见"""
+        seen = []
+
+        def fake_feishu_service(app_token, personal_base_token, replica=None, tenant_num=None):
+            feishu = Mock(tables_cache={'农户管理': 'tbl002'})
+            farmer_ids = [f'rec{app_token}F{i}' for i in range(3)]
+
+            def get_all_record_ids(table_name):
+                # 加载农户时，前面租户的数据仍未写入缓存
+                seen.append(self.cache_service.get_tenant_info('T001'))
+                return {'success': True, 'data': farmer_ids, 'message': 'success'}
+
+            feishu.get_all_record_ids.side_effect = get_all_record_ids
+            return feishu
+
+        with patch('services.tenant_service.FeishuService', side_effect=fake_feishu_service):
+            self.assertTrue(self.tenant_service.initialize_cache())
+
+        self.assertEqual(seen, [None, None])
+        self.assertEqual(self.cache_service.get_tenant_info('T002')['tenant_name'], '租户二')
+        self.assertEqual(self.cache_service.get_farmer_ids('T001')['farmer_ids'], ['recapp1F0', 'recapp1F1'])
+        self.assertTrue(self.cache_service.is_known_farmer('T002', 'recapp2F2'))
+
+    def refresh(self, farmer_ids: dict) -> bool:
+        """以 {APP_TOKEN: 农户ID列表或None} 模拟一次刷新，None 表示读取农户管理表失败"""
+        def fake_feishu_service(app_token, personal_base_token, replica=None, tenant_num=None):
+            feishu = Mock(tables_cache={'农户管理': 'tbl002'})
+            ids = farmer_ids[app_token]
+            feishu.get_all_record_ids.return_value = {'success': ids is not None, 'data': ids, 'message': ''}
+            return feishu
+
+        with patch('services.tenant_service.FeishuService', side_effect=fake_feishu_service):
+            return self.tenant_service.initialize_cache()
+
+    def test_failed_tenant_carried_over(self):
+        """测试个别租户加载失败时沿用上一版本，全部失败时不切换版本"""
+        self.assertTrue(self.refresh({'app1': ['recA'], 'app2': ['recB']}))
+        generation = self.cache_service.get_generation()
+
+        self.assertTrue(self.refresh({'app1': ['recA', 'recC'], 'app2': None}))
+        self.assertEqual(self.cache_service.get_generation(), generation + 1)
+        self.assertEqual(self.cache_service.get_farmer_ids('T001')['farmer_ids'], ['recA', 'recC'])
+        self.assertEqual(self.cache_service.get_farmer_ids('T002')['farmer_ids'], ['recB'])
+        self.assertTrue(self.cache_service.is_known_farmer('T002', 'recB'))
+
+        self.assertFalse(self.refresh({'app1': None, 'app2': None}))
+        self.assertEqual(self.cache_service.get_generation(), generation + 1)
+        self.assertEqual(self.cache_service.get_all_tenant_numbers(generation + 2), [])
+
+    def test_rollback_and_clear(self):
+        """测试回滚到上一版本，清除缓存只删除派生缓存，租户数据保持可用"""
+        self.assertTrue(self.refresh({'app1': ['recA'], 'app2': ['recB']}))
+        self.assertTrue(self.refresh({'app1': [], 'app2': ['recB']}))
+        self.assertFalse(self.cache_service.is_known_farmer('T001', 'recA'))
+        self.assertTrue(self.cache_service.rollback_generation())
+        self.assertTrue(self.cache_service.is_known_farmer('T001', 'recA'))
+
+        generation = self.cache_service.get_generation()
+        self.cache_service.mark_product_missing('T001', 'recX', ttl=60)
+        self.cache_service.set_payload('T001:0:recA:all', {'etag': b'"a"'}, 60)
+        self.assertTrue(self.cache_service.clear_all_cache())
+        self.assertFalse(self.cache_service.is_product_missing('T001', 'recX'))
+        self.assertEqual(self.cache_service.get_payload('T001:0:recA:all', ['etag']), [None])
+        self.assertEqual(self.cache_service.get_generation(), generation)
+        self.assertEqual(self.cache_service.get_tenant_info('T001')['tenant_name'], '租户一')
+        self.assertTrue(self.cache_service.is_known_farmer('T001', 'recA'))
+
+    def test_refresh_invalidates_payloads(self):
+        """测试切换缓存版本和副本同步完成后使租户的预序列化响应失效"""
+        self.assertTrue(self.refresh({'app1': ['recA'], 'app2': ['recB']}))
+        self.assertEqual(self.cache_service.get_payload_generation('T001'), 1)
+        self.assertFalse(self.refresh({'app1': None, 'app2': None}))
+        self.assertEqual(self.cache_service.get_payload_generation('T001'), 1)
+
+        self.tenant_service.replica_enabled = True
+        self.tenant_service.replica_service = Mock()
+        self.tenant_service.replica_service.sync_tenant.return_value = True
+        self.assertTrue(self.tenant_service.sync_tenant_replica('T002'))
+        self.assertEqual(self.cache_service.get_payload_generation('T002'), 2)
+        self.tenant_service.replica_service.sync_tenant.return_value = False
+        self.assertFalse(self.tenant_service.sync_tenant_replica('T002'))
+        self.assertEqual(self.cache_service.get_payload_generation('T002'), 2)
+
+    def test_load_farmer_ids_without_batch(self):
+        """测试单独加载农户ID时立即写入缓存"""
+        self.assertTrue(self.tenant_service.load_system_tenants())
+        self.assertEqual(self.cache_service.get_tenant_info('T001')['authorized_count'], 2)
+        feishu = Mock()
+        feishu.get_all_record_ids.return_value = {'success': True, 'data': ['recA', 'recB', 'recC'], 'message': 'success'}
+        self.tenant_service.tenat_feishu_service = {'T001': feishu}
+        self.assertTrue(self.tenant_service.load_tenant_farmer_ids('T001'))
+        self.assertEqual(self.cache_service.get_farmer_ids('T001')['farmer_ids'], ['recA', 'recB'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+"""响应压缩中间件测试模块"""
+
+import unittest
+import sys
+import os
+import gzip
+import json
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, Response, jsonify
+from utils.compression import init_compression, CompressedBodyCache, accepted_encodings
+
+
+class TestAcceptedEncodings(unittest.TestCase):
+    """Accept-Encoding 解析测试"""
+
+    def test_parse(self):
+        """测试解析编码列表并忽略 q=0"""
+        self.assertEqual(accepted_encodings('gzip, deflate;q=0.5, br;q=0'), {'gzip', 'deflate'})
+        self.assertEqual(accepted_encodings(None), set())
+
+
+class TestCompressionMiddleware(unittest.TestCase):
+    """响应压缩中间件测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        app = Flask(__name__)
+        self.cache = CompressedBodyCache(max_entries=2)
+        init_compression(app, min_size=100, cache=self.cache)
+        self.large = {'items': ['土鸡饲喂记录'] * 50}
+
+        @app.route('/json')
+        def large_json():
+            return jsonify(self.large)
+
+        @app.route('/small')
+        def small_json():
+            return jsonify({'ok': True})
+
+        @app.route('/html')
+        def page():
+            return '<html>' + '农户' * 200 + '</html>'
+
+        @app.route('/stream')
+        def stream():
+            return Response((b'x' * 500 for _ in range(2)), mimetype='text/plain')
+
+        @app.route('/image')
+        def image():
+            return Response(b'\x89PNG' * 500, mimetype='image/png')
+
+        self.client = app.test_client()
+
+    def test_compress_json(self):
+        """测试大 JSON 响应按 gzip 压缩"""
+        response = self.client.get('/json', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertEqual(int(response.headers['Content-Length']), len(response.data))
+        self.assertEqual(json.loads(gzip.decompress(response.data)), self.large)
+
+    def test_skip(self):
+        """测试小响应、不接受压缩的客户端、流式响应和图片不压缩"""
+        self.assertNotIn('Content-Encoding', self.client.get('/small', headers={'Accept-Encoding': 'gzip'}).headers)
+        self.assertNotIn('Content-Encoding', self.client.get('/json').headers)
+        self.assertNotIn('Content-Encoding', self.client.get('/stream', headers={'Accept-Encoding': 'gzip'}).headers)
+        self.assertNotIn('Content-Encoding', self.client.get('/image', headers={'Accept-Encoding': 'gzip'}).headers)
+
+    def test_html_cached(self):
+        """测试相同页面的压缩结果复用"""
+        first = self.client.get('/html', headers={'Accept-Encoding': 'gzip'})
+        second = self.client.get('/html', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(first.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(len(self.cache._entries), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
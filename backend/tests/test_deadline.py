@@ -0,0 +1,149 @@
+"""请求时间预算和对冲请求测试模块"""
+
+import unittest
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+from unittest.mock import Mock, patch
+from services.feishu_service import feishu_latency
+from utils.deadline import deadline_scope, remaining, request_timeout, DeadlineExceeded
+from tests.fixtures import make_feishu_service
+
+
+TABLES = {'传感器': 'tbl001', '农户管理': 'tbl002', '饲喂记录': 'tbl003', '养殖流程': 'tbl004'}
+
+
+def feishu_response(data):
+    return Mock(status_code=200, json=Mock(return_value={'code': 0, 'data': data}))
+
+
+class TestDeadlineScope(unittest.TestCase):
+    """时间预算测试"""
+
+    def test_scope(self):
+        """测试时间预算的设置、嵌套和恢复"""
+        self.assertIsNone(remaining())
+        self.assertEqual(request_timeout(10), 10)
+        with deadline_scope(5):
+            self.assertLessEqual(request_timeout(10), 5)
+            with deadline_scope(20):
+                self.assertLessEqual(remaining(), 5)
+        self.assertIsNone(remaining())
+
+    def test_expired(self):
+        """测试时间预算用完后不再发起调用"""
+        with deadline_scope(0.01):
+            time.sleep(0.02)
+            with self.assertRaises(DeadlineExceeded):
+                request_timeout(10)
+
+
+class TestFarmInfoDeadline(unittest.TestCase):
+    """农户完整信息部分返回测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.feishu_service = make_feishu_service(TABLES)
+        self.feishu_service.read_mode = 'remote'
+        self.calls = []
+
+    def _route(self, breeding_delay=0.0, breeding_error=None):
+        def send(url, **kwargs):
+            self.calls.append(url)
+            if '/tbl002/records/recF1' in url:
+                return feishu_response({'record': {'fields': {'饲养农户': '张三', '标题': '张三的土鸡'}}})
+            if '/tbl003/' in url:
+                return feishu_response({'items': [], 'has_more': False, 'total': 0})
+            if '/tbl004/' in url:
+                time.sleep(breeding_delay)
+                if breeding_error:
+                    raise breeding_error
+                return feishu_response({'items': [], 'has_more': False})
+            return feishu_response({'items': [{'fields': {'名称': '温度', '数据': '26.0'}}]})
+        return send
+
+    def test_failed_section_omitted(self):
+        """测试养殖流程查询超时时不返回该部分并标记"""
+        with patch('requests.get', side_effect=self._route(breeding_error=requests.exceptions.Timeout())):
+            result = self.feishu_service.get_farm_complete_info('recF1', feeding_page_size=10)
+        self.assertTrue(result['success'])
+        self.assertEqual(result['data']['omitted_sections'], ['breeding_process'])
+        self.assertEqual(result['data']['sensor'], {'温度': '26.0'})
+
+    def test_sections_after_deadline_skipped(self):
+        """测试时间预算用完后跳过剩余的飞书调用"""
+        with patch('requests.get', side_effect=self._route(breeding_delay=0.1)):
+            with deadline_scope(0.05):
+                result = self.feishu_service.get_farm_complete_info('recF1', feeding_page_size=10)
+        self.assertTrue(result['success'])
+        self.assertEqual(result['data']['omitted_sections'], ['sensor'])
+        self.assertEqual(len(self.calls), 3)
+
+    def test_complete_without_flag(self):
+        """测试全部数据返回时没有 omitted_sections"""
+        with patch('requests.get', side_effect=self._route()):
+            result = self.feishu_service.get_farm_complete_info('recF1', feeding_page_size=10)
+        self.assertNotIn('omitted_sections', result['data'])
+
+
+class TestHedgedRequest(unittest.TestCase):
+    """对冲请求测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.feishu_service = make_feishu_service(TABLES)
+        for _ in range(20):
+            feishu_latency.record('hedge_test', 0.01)
+
+    def test_hedge_after_p95(self):
+        """测试超过 p95 耗时未返回时发出对冲请求，取先返回的结果"""
+        slow, fast = feishu_response('slow'), feishu_response('fast')
+
+        def send(url, **kwargs):
+            if not send.called:
+                send.called = True
+                time.sleep(0.3)
+                return slow
+            return fast
+        send.called = False
+
+        with patch('requests.get', side_effect=send) as mock_get, \
+                patch('services.feishu_service.config.FEISHU_HEDGE_MIN_DELAY', 0.02):
+            response = self.feishu_service._request('GET', 'https://example.com', 'hedge_test')
+        self.assertIs(response, fast)
+        self.assertEqual(mock_get.call_count, 2)
+
+    def test_write_not_hedged(self):
+        """测试写操作不发出对冲请求"""
+        for _ in range(20):
+            feishu_latency.record('hedge_write_test', 0.001)
+        with patch('requests.post', side_effect=lambda url, **kwargs: time.sleep(0.05) or feishu_response({})) \
+                as mock_post, patch('services.feishu_service.config.FEISHU_HEDGE_MIN_DELAY', 0.001):
+            self.feishu_service._request('POST', 'https://example.com', 'hedge_write_test', hedge=False, json={})
+        self.assertEqual(mock_post.call_count, 1)
+
+
+class TestFarmInfoTimeout(unittest.TestCase):
+    """农户详情接口超时测试"""
+
+    def test_timeout_status(self):
+        """测试农户信息在时间预算内未取得时返回 504"""
+        from api.routes import load_farm_info
+
+        def slow_farm_info(*args, **kwargs):
+            time.sleep(0.05)
+            return {'success': False, 'data': None, 'message': '请求失败: 超时'}
+
+        with patch('api.routes.tenant_service') as mock_tenant, \
+                patch('api.routes.config.FARM_INFO_DEADLINE', 0.01):
+            mock_tenant.get_tenant_info.return_value = {'tenant_num': '1'}
+            mock_tenant.get_tenant_farm_info.side_effect = slow_farm_info
+            response, status = load_farm_info('1', 'recF1')
+        self.assertEqual(status, 504)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+"""静态快照导出测试模块
+
+基于本地副本测试农户详情页的导出、增量导出和清理
+"""
+
+import unittest
+import sys
+import os
+import json
+import shutil
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from unittest.mock import patch
+from export_static import StaticSnapshotExporter
+from services.tenant_service import tenant_service
+from tests.fixtures import FarmInfoTestCase
+
+
+class TestStaticSnapshotExporter(FarmInfoTestCase):
+    """静态快照导出测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        super().setUp()
+        self.output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output_dir, ignore_errors=True)
+        self.farmer_ids = ['recF1', 'recF2', 'recF3']
+
+        patchers = [
+            patch.object(tenant_service.cache_service, 'get_farmer_ids',
+                         side_effect=lambda tenant_num: {'farmer_ids': list(self.farmer_ids)}),
+            patch.object(tenant_service, 'get_tenant_farms_info',
+                         side_effect=lambda tenant_num, ids, feeding_page_size=None:
+                         self.feishu_service.get_farms_complete_info(ids, feeding_page_size)),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.exporter = StaticSnapshotExporter(self.output_dir, workers=2, chunk_size=2)
+
+    def _read(self, *parts):
+        with open(os.path.join(self.output_dir, '1', *parts), 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def test_export(self):
+        """测试导出页面和带内容哈希的数据文件"""
+        stats = self.exporter.export_tenant('1')
+        self.assertEqual(stats['rendered'], 3)
+
+        manifest = json.loads(self._read('manifest.json'))
+        entry = manifest['farms']['recF1']
+        self.assertEqual(entry['data'], f"data/recF1.{entry['hash']}.json")
+        payload = json.loads(self._read(entry['data']))
+        self.assertEqual(payload['code'], 0)
+        self.assertEqual(payload['data']['statistics']['feeding_count'], 2)
+        self.assertNotIn('sensor', payload['data'])
+        self.assertIn('feeding_page', payload['data'])
+
+        sensor = json.loads(self._read('sensor.json'))
+        self.assertEqual(sensor['data'], {'温度': '26.0', '湿度': '47.0'})
+
+        html = self._read('recF1.html')
+        self.assertIn(f'const SNAPSHOT_DATA_URL = "/snapshots/1/{entry["data"]}"', html)
+        self.assertIn('href="/static/css/style.css"', html)
+        self.assertIn('const SNAPSHOT_SENSOR_URL = "/snapshots/1/sensor.json"', html)
+
+    def test_first_page_only(self):
+        """测试快照与 /farm/info 一样只导出第一页饲喂记录"""
+        with patch('export_static.config.FEEDING_PAGE_SIZE', 1):
+            self.exporter.export_tenant('1')
+        entry = json.loads(self._read('manifest.json'))['farms']['recF1']
+        data = json.loads(self._read(entry['data']))['data']
+        self.assertEqual([r['food_name'] for r in data['feeding_records']], ['青菜'])
+        self.assertTrue(data['feeding_page']['has_more'])
+        self.assertEqual(data['statistics']['feeding_count'], 2)
+
+    def test_sensor_change_keeps_pages(self):
+        """测试传感器数据变化只更新 sensor.json，不重新渲染农户页面"""
+        self.exporter.export_tenant('1')
+        self.feishu_service.replica.upsert_records('传感器', [
+            {'record_id': 'recS1', 'fields': {'名称': '温度', '数据': '30.5'}}
+        ])
+        stats = self.exporter.export_tenant('1')
+        self.assertEqual(stats['rendered'], 0)
+        self.assertEqual(stats['unchanged'], 3)
+        self.assertEqual(json.loads(self._read('sensor.json'))['data']['温度'], '30.5')
+
+    def test_incremental_export(self):
+        """测试只重新渲染数据变化的农户"""
+        self.exporter.export_tenant('1')
+        old_entry = json.loads(self._read('manifest.json'))['farms']['recF2']
+
+        self.feishu_service.replica.upsert_records('饲喂记录', [
+            {'record_id': 'recA4', 'fields': {'农户': '李四', '食物': '麦麸', '操作时间': 4000, '更新': 4}}
+        ])
+        stats = self.exporter.export_tenant('1')
+        self.assertEqual(stats['rendered'], 1)
+        self.assertEqual(stats['unchanged'], 2)
+
+        new_entry = json.loads(self._read('manifest.json'))['farms']['recF2']
+        self.assertNotEqual(new_entry['hash'], old_entry['hash'])
+        self.assertFalse(os.path.exists(os.path.join(self.output_dir, '1', old_entry['data'])))
+
+    def test_remove_unauthorized(self):
+        """测试删除不再授权的农户页面"""
+        self.exporter.export_tenant('1')
+        self.farmer_ids = ['recF1', 'recF2']
+        stats = self.exporter.export_tenant('1')
+        self.assertEqual(stats['removed'], 1)
+        self.assertFalse(os.path.exists(os.path.join(self.output_dir, '1', 'recF3.html')))
+
+
+if __name__ == '__main__':
+    unittest.main()
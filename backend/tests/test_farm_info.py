@@ -0,0 +1,232 @@
+"""农户完整信息测试模块
+
+基于本地副本测试农户信息的组装、批量查询等功能
+"""
+
+import unittest
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from unittest.mock import Mock, patch
+from services.feishu_service import FEEDING_RECORDS_SORT, FarmerNameCache
+from api.routes import format_farm_data
+from tests.fixtures import FarmInfoTestCase
+
+
+class TestFarmCompleteInfo(FarmInfoTestCase):
+    """单个农户完整信息测试"""
+
+    def test_complete_info(self):
+        """测试组装单个农户的完整信息"""
+        result = self.feishu_service.get_farm_complete_info('recF1')
+        self.assertTrue(result['success'])
+        data = result['data']
+        self.assertEqual(data['sensor'], {'温度': '26.0', '湿度': '47.0'})
+        self.assertEqual(data['product_info']['标题'], '张三的土鸡')
+        self.assertEqual(data['statistics'], {'feeding_count': 2, 'process_count': 1})
+        self.assertEqual([r['food_name'] for r in data['feeding_records']], ['玉米', '青菜'])
+
+    def test_missing_product(self):
+        """测试产品不存在"""
+        result = self.feishu_service.get_farm_complete_info('recNotExist')
+        self.assertFalse(result['success'])
+
+
+class TestFeedingRecordsPage(FarmInfoTestCase):
+    """饲喂记录分页测试"""
+
+    def test_walk_pages(self):
+        """测试按游标逐页获取饲喂记录，按操作时间倒序"""
+        first = self.feishu_service.get_feeding_records_page('recF1', 1)
+        self.assertTrue(first['success'])
+        self.assertEqual([r['food_name'] for r in first['data']['records']], ['青菜'])
+        self.assertTrue(first['data']['has_more'])
+        self.assertEqual(first['data']['total'], 2)
+        self.assertEqual(first['data']['next_cursor'], 'k:3000:recA3')
+
+        second = self.feishu_service.get_feeding_records_page('recF1', 1, first['data']['next_cursor'])
+        self.assertEqual([r['food_name'] for r in second['data']['records']], ['玉米'])
+        self.assertFalse(second['data']['has_more'])
+        self.assertIsNone(second['data']['next_cursor'])
+
+    def test_cursor_stable_after_insert(self):
+        """测试翻页期间新增记录不会导致下一页重复"""
+        first = self.feishu_service.get_feeding_records_page('recF1', 1)
+        self.feishu_service.replica.upsert_records('饲喂记录', [
+            {'record_id': 'recA9', 'fields': {'农户': '张三', '食物': '麦麸', '操作时间': 9000, '更新': 9}}
+        ])
+        second = self.feishu_service.get_feeding_records_page('recF1', 1, first['data']['next_cursor'])
+        self.assertEqual([r['food_name'] for r in second['data']['records']], ['玉米'])
+
+    def test_farmer_name_resolved_once(self):
+        """测试翻页时只查询一次农户管理表，农户变更后重新查询"""
+        with patch.object(self.feishu_service, 'get_record_by_id',
+                          wraps=self.feishu_service.get_record_by_id) as mock_get:
+            first = self.feishu_service.get_feeding_records_page('recF1', 1)
+            self.feishu_service.get_feeding_records_page('recF1', 1, first['data']['next_cursor'])
+            self.assertEqual(mock_get.call_count, 1)
+
+            self.feishu_service.forget_farmer_names(['recF1'])
+            self.feishu_service.get_feeding_records_page('recF1', 1)
+            self.assertEqual(mock_get.call_count, 2)
+
+    def test_farmer_name_expires(self):
+        """测试农户名称缓存过期后重新查询，超过容量时淘汰最久未使用的条目"""
+        names = FarmerNameCache(ttl=60, max_entries=2)
+        names['recF1'] = '张三'
+        names['recF2'] = '李四'
+        self.assertEqual(names.get('recF1'), '张三')
+        names['recF3'] = '王五'
+        self.assertIsNone(names.get('recF2'))
+        self.assertEqual(len(names), 2)
+        with patch('services.feishu_service.time.monotonic', return_value=time.monotonic() + 61):
+            self.assertIsNone(names.get('recF1'))
+
+        self.feishu_service.get_feeding_records_page('recF1', 1)
+        self.feishu_service.replica.upsert_records('农户管理', [
+            {'record_id': 'recF1', 'fields': {'饲养农户': '李四', '标题': '张三的土鸡'}}
+        ])
+        with patch('services.feishu_service.time.monotonic', return_value=time.monotonic() + 3600):
+            page = self.feishu_service.get_feeding_records_page('recF1', 10)
+        self.assertEqual(page['data']['total'], 1)
+
+    def test_invalid_cursor(self):
+        """测试无效游标"""
+        for cursor in ['bad-cursor', 'k:abc:recA3', 'k:3000:']:
+            result = self.feishu_service.get_feeding_records_page('recF1', 1, cursor)
+            self.assertFalse(result['success'])
+
+    def test_remote_page_token_forwarded(self):
+        """测试远程模式转发飞书的 page_token、has_more 和 total"""
+        self.feishu_service.read_mode = 'remote'
+        page = {'code': 0, 'data': {
+            'items': [{'record_id': 'recA3', 'fields': {'农户': '张三', '食物': '青菜', '操作时间': 3000}}],
+            'has_more': True, 'page_token': 'feishu-token-2', 'total': 2
+        }}
+        response = Mock(status_code=200, json=Mock(return_value=page))
+        with patch('requests.get', return_value=response) as mock_get:
+            result = self.feishu_service.get_table_records_page(
+                '饲喂记录', 'CurrentValue.[农户]="张三"', FEEDING_RECORDS_SORT, 1, 'feishu-token-1')
+        params = mock_get.call_args[1]['params']
+        self.assertEqual(params['page_token'], 'feishu-token-1')
+        self.assertEqual(params['page_size'], 1)
+        self.assertEqual(result['data']['page_token'], 'feishu-token-2')
+        self.assertTrue(result['data']['has_more'])
+        self.assertEqual(result['data']['total'], 2)
+        self.assertEqual(result['data']['items'][0]['食物'], '青菜')
+
+    def test_remote_keyset_cursor(self):
+        """测试远程模式收到副本发出的游标时读取全部记录后本地定位"""
+        self.feishu_service.read_mode = 'remote'
+        page = {'code': 0, 'data': {'items': [
+            {'record_id': 'recA1', 'fields': {'农户': '张三', '食物': '玉米', '操作时间': 1000}},
+            {'record_id': 'recA3', 'fields': {'农户': '张三', '食物': '青菜', '操作时间': 3000}},
+        ], 'has_more': False}}
+        response = Mock(status_code=200, json=Mock(return_value=page))
+        with patch('requests.get', return_value=response):
+            result = self.feishu_service.get_table_records_page(
+                '饲喂记录', 'CurrentValue.[农户]="张三"', FEEDING_RECORDS_SORT, 1, 'k:3000:recA3')
+        self.assertEqual([item['食物'] for item in result['data']['items']], ['玉米'])
+        self.assertFalse(result['data']['has_more'])
+        self.assertEqual(result['data']['total'], 2)
+
+    def test_complete_info_first_page(self):
+        """测试完整信息只返回第一页饲喂记录，统计为总数"""
+        data = self.feishu_service.get_farm_complete_info('recF1', feeding_page_size=1)['data']
+        self.assertEqual(len(data['feeding_records']), 1)
+        self.assertEqual(data['statistics']['feeding_count'], 2)
+        self.assertTrue(data['feeding_page']['has_more'])
+        self.assertEqual(data['feeding_page']['page_size'], 1)
+
+
+class TestFarmsCompleteInfoBatch(FarmInfoTestCase):
+    """批量农户完整信息测试"""
+
+    def test_batch_matches_single(self):
+        """测试批量查询结果与逐个查询一致"""
+        result = self.feishu_service.get_farms_complete_info(['recF1', 'recF2', 'recF3', 'recNotExist'])
+        self.assertTrue(result['success'])
+        self.assertEqual(result['data']['missing'], ['recNotExist'])
+        items = result['data']['items']
+        for product_id in ['recF1', 'recF2', 'recF3']:
+            single = self.feishu_service.get_farm_complete_info(product_id)['data']
+            self.assertEqual(items[product_id], single)
+        self.assertEqual(items['recF3']['feeding_records'], [])
+
+    def test_batch_first_page_matches_single(self):
+        """测试批量查询只返回第一页饲喂记录，分页信息与逐个查询一致"""
+        items = self.feishu_service.get_farms_complete_info(['recF1', 'recF2', 'recF3'], feeding_page_size=1)['data']['items']
+        for product_id in ['recF1', 'recF2', 'recF3']:
+            single = self.feishu_service.get_farm_complete_info(product_id, feeding_page_size=1)['data']
+            self.assertEqual(items[product_id], single)
+        self.assertEqual(items['recF1']['feeding_page']['next_cursor'], 'k:3000:recA3')
+        self.assertEqual(items['recF1']['statistics']['feeding_count'], 2)
+
+    def test_batch_uses_or_filter(self):
+        """测试饲喂记录和养殖流程各只查询一次"""
+        with patch.object(self.feishu_service, '_list_records_filter',
+                          wraps=self.feishu_service._list_records_filter) as mock_filter:
+            self.feishu_service.get_farms_complete_info(['recF1', 'recF2'])
+        self.assertEqual(mock_filter.call_count, 2)
+        self.assertTrue(mock_filter.call_args_list[0][0][1].startswith('OR('))
+
+
+
+class TestFarmInfoSections(FarmInfoTestCase):
+    """按数据块查询农户信息测试"""
+
+    def _count_calls(self):
+        patchers = {name: patch.object(self.feishu_service, name, wraps=getattr(self.feishu_service, name))
+                    for name in ['get_record_by_id', 'get_table_records_page', 'get_table_records_filter',
+                                 'get_table_records']}
+        mocks = {name: patcher.start() for name, patcher in patchers.items()}
+        for patcher in patchers.values():
+            self.addCleanup(patcher.stop)
+        return mocks
+
+    def test_sensor_only(self):
+        """测试只查询传感器数据时不查询农户、饲喂记录和养殖流程"""
+        mocks = self._count_calls()
+        result = self.feishu_service.get_farm_complete_info('recF1', feeding_page_size=10, sections={'sensor'})
+        self.assertEqual(result['data']['sensor'], {'温度': '26.0', '湿度': '47.0'})
+        self.assertEqual(mocks['get_table_records'].call_count, 1)
+        for name in ['get_record_by_id', 'get_table_records_page', 'get_table_records_filter']:
+            mocks[name].assert_not_called()
+
+    def test_feeding_uses_cached_farmer_name(self):
+        """测试已知农户名称时只查询饲喂记录"""
+        self.feishu_service.get_farm_complete_info('recF1', sections={'product_info'})
+        mocks = self._count_calls()
+        result = self.feishu_service.get_farm_complete_info('recF1', feeding_page_size=10,
+                                                            sections={'feeding_records'})
+        self.assertEqual(len(result['data']['feeding_records']), 2)
+        mocks['get_record_by_id'].assert_not_called()
+        mocks['get_table_records_filter'].assert_not_called()
+
+    def test_format_prunes_sections(self):
+        """测试响应只包含请求的数据块"""
+        data = self.feishu_service.get_farm_complete_info('recF1', feeding_page_size=10)['data']
+        self.assertEqual(set(format_farm_data(data, {'sensor', 'statistics'})), {'sensor', 'statistics'})
+        self.assertIn('feeding_page', format_farm_data(data, {'feeding_records'}))
+
+    def test_has_stream(self):
+        """测试根据监控地址标记是否有监控视频"""
+        rtmp = [{'text': 'rtmp://srs.pxact.com/live/vbld6mb2kh?secret=1'}]
+        self.assertTrue(format_farm_data({'product_info': {'监控地址': rtmp}})['has_stream'])
+        self.assertFalse(format_farm_data({'product_info': {'标题': '张三的土鸡'}})['has_stream'])
+        self.assertNotIn('has_stream', format_farm_data({'product_info': {}}, {'sensor'}))
+
+    def test_invalid_fields(self):
+        """测试 fields 包含未知数据块时返回 400"""
+        with patch('app.init_multi_tenant_system'):
+            from app import create_app
+            client = create_app().test_client()
+        with patch('api.routes.rate_limiter.check', return_value=(True, 0, None)):
+            response = client.get('/api/v1/farm/info?product_id=recF1&fields=sensor,password')
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+"""服务端渲染农户详情页测试模块"""
+
+import unittest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from unittest.mock import patch
+from api.routes import preload_image_urls
+
+
+FARM_PAYLOAD = {
+    'code': 0,
+    'message': 'success',
+    'data': {
+        'sensor': {},
+        'product_info': {'标题': '张三的土鸡', '封面图': 'https://example.com/cover.jpg'},
+        'feeding_records': [],
+        'breeding_process': [
+            {'process_name': '入栏', 'images': [{'file_token': 'tok1'}]},
+            {'process_name': '出栏', 'images': []},
+        ],
+        'statistics': {'feeding_count': 0, 'process_count': 2}
+    }
+}
+
+
+class TestPreloadImageUrls(unittest.TestCase):
+    """首屏图片预加载地址测试"""
+
+    def test_cover_and_process_images(self):
+        """测试封面图和养殖流程首张图片"""
+        self.assertEqual(preload_image_urls(FARM_PAYLOAD['data']),
+                         ['https://example.com/cover.jpg', '/api/v1/img/tok1'])
+
+    def test_cover_list(self):
+        """测试附件格式化后为地址列表的封面图"""
+        data = {'product_info': {'封面图': ['/api/v1/img/cover1', '/api/v1/img/cover2']},
+                'breeding_process': [{'images': ['/api/v1/img/tok1']}]}
+        self.assertEqual(preload_image_urls(data), ['/api/v1/img/cover1', '/api/v1/img/tok1'])
+
+    def test_limit(self):
+        """测试预加载数量限制"""
+        data = {'breeding_process': [{'images': [{'file_token': f'tok{i}'}]} for i in range(10)]}
+        self.assertEqual(len(preload_image_urls(data, limit=3)), 3)
+
+
+class TestFarmPage(unittest.TestCase):
+    """服务端渲染页面测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        with patch('app.init_multi_tenant_system'):
+            from app import create_app
+            self.app = create_app()
+        self.client = self.app.test_client()
+
+    def test_embedded_payload(self):
+        """测试页面内嵌农户数据并返回预加载头"""
+        with patch('app.load_farm_info', return_value=(FARM_PAYLOAD, 200)) as mock_load:
+            response = self.client.get('/farm/recF1?num=2')
+        mock_load.assert_called_once_with('2', 'recF1')
+        self.assertEqual(response.status_code, 200)
+        html = response.get_data(as_text=True)
+        self.assertIn('const PAGE_PRODUCT_ID = "recF1"', html)
+        self.assertIn('"标题":"张三的土鸡"', html)
+        self.assertIn('href="/static/css/style.css"', html)
+        self.assertEqual(response.headers['Link'],
+                         '<https://example.com/cover.jpg>; rel=preload; as=image, '
+                         '</api/v1/img/tok1>; rel=preload; as=image')
+
+    def test_error_payload(self):
+        """测试数据获取失败时页面内嵌错误信息"""
+        error = {'code': 1, 'message': '无效的租户编号', 'data': None}
+        with patch('app.load_farm_info', return_value=(error, 403)):
+            response = self.client.get('/farm/recF1')
+        self.assertEqual(response.status_code, 403)
+        self.assertNotIn('Link', response.headers)
+
+
+if __name__ == '__main__':
+    unittest.main()
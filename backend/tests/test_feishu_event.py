@@ -0,0 +1,150 @@
+"""飞书事件回调测试模块
+
+测试事件校验、去重以及多维表格变更后的缓存失效
+"""
+
+import unittest
+import sys
+import os
+import uuid
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from unittest.mock import Mock, patch
+from flask import Flask
+from api.routes import api_v1
+from services.tenant_service import TenantService
+from utils.feishu_event import verify_signature, verify_token
+
+
+class TestFeishuEventUtils(unittest.TestCase):
+    """事件校验工具测试"""
+
+    def test_verify_token(self):
+        """测试 Verification Token 校验"""
+        self.assertTrue(verify_token({'header': {'token': 'abc'}}, 'abc'))
+        self.assertTrue(verify_token({'token': 'abc'}, 'abc'))
+        self.assertFalse(verify_token({'header': {'token': 'xyz'}}, 'abc'))
+        self.assertFalse(verify_token({'header': {'token': 'abc'}}, None))
+
+    def test_verify_signature(self):
+        """测试请求签名校验"""
+        import hashlib
+        body = b'{"encrypt": "xxx"}'
+        signature = hashlib.sha256(b'1700000000' + b'nonce' + b'key' + body).hexdigest()
+        self.assertTrue(verify_signature('1700000000', 'nonce', 'key', body, signature))
+        self.assertFalse(verify_signature('1700000000', 'nonce', 'other', body, signature))
+
+
+class TestFeishuEventRoute(unittest.TestCase):
+    """事件回调接口测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        app = Flask(__name__)
+        app.register_blueprint(api_v1)
+        self.client = app.test_client()
+        patcher = patch('api.routes.config.FEISHU_EVENT_VERIFICATION_TOKEN', 'verify_token')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def make_event(self, event_id):
+        """构造记录变更事件"""
+        return {
+            'schema': '2.0',
+            'header': {
+                'event_id': event_id,
+                'event_type': 'drive.file.bitable_record_changed_v1',
+                'token': 'verify_token'
+            },
+            'event': {
+                'file_token': 'app_token',
+                'table_id': 'tbl001',
+                'action_list': [{'record_id': 'rec001', 'action': 'record_edited'}]
+            }
+        }
+
+    def test_url_verification(self):
+        """测试订阅地址校验"""
+        response = self.client.post('/api/v1/feishu/event', json={
+            'type': 'url_verification', 'challenge': 'challenge_code', 'token': 'verify_token'
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['challenge'], 'challenge_code')
+
+    def test_invalid_token(self):
+        """测试 Token 不匹配时拒绝"""
+        response = self.client.post('/api/v1/feishu/event', json={
+            'type': 'url_verification', 'challenge': 'challenge_code', 'token': 'wrong'
+        })
+        self.assertEqual(response.status_code, 401)
+
+    @patch('api.routes.tenant_service.handle_bitable_event')
+    def test_duplicate_event_processed_once(self, mock_handle):
+        """测试同一事件重复推送只处理一次"""
+        event = self.make_event(f'evt_{uuid.uuid4().hex}')
+        self.assertEqual(self.client.post('/api/v1/feishu/event', json=event).status_code, 200)
+        self.assertEqual(self.client.post('/api/v1/feishu/event', json=event).status_code, 200)
+        mock_handle.assert_called_once_with('drive.file.bitable_record_changed_v1', event['event'])
+
+    @patch('api.routes.tenant_service.handle_bitable_event', side_effect=RuntimeError('boom'))
+    def test_failed_event_can_retry(self, mock_handle):
+        """测试处理失败的事件允许飞书重试"""
+        event = self.make_event(f'evt_{uuid.uuid4().hex}')
+        self.assertEqual(self.client.post('/api/v1/feishu/event', json=event).status_code, 500)
+        self.assertEqual(self.client.post('/api/v1/feishu/event', json=event).status_code, 500)
+        self.assertEqual(mock_handle.call_count, 2)
+
+
+class TestHandleBitableEvent(unittest.TestCase):
+    """多维表格变更处理测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.tenant_service = TenantService()
+        self.feishu = Mock()
+        self.feishu.app_token = 'app_token'
+        self.feishu.get_table_name_by_id.return_value = '农户管理'
+        self.feishu.batch_get_records.return_value = {
+            'success': True,
+            'data': [{'record_id': 'rec001', 'fields': {'饲养农户': '张三'}}],
+            'message': 'success'
+        }
+        self.tenant_service.tenat_feishu_service = {'T001': self.feishu}
+        self.listener = Mock()
+        self.tenant_service.add_change_listener(self.listener)
+
+    def test_record_changes_refresh_replica_and_farmers(self):
+        """测试记录增删刷新副本、农户列表并通知监听器"""
+        event = {
+            'file_token': 'app_token',
+            'table_id': 'tbl001',
+            'action_list': [
+                {'record_id': 'rec001', 'action': 'record_added'},
+                {'record_id': 'rec002', 'action': 'record_deleted'}
+            ]
+        }
+        with patch.object(self.tenant_service, 'load_tenant_farmer_ids', return_value=True) as mock_load:
+            self.assertTrue(self.tenant_service.handle_bitable_event('drive.file.bitable_record_changed_v1', event))
+            mock_load.assert_called_once_with('T001')
+
+        self.feishu.replica.delete_records.assert_called_once_with('农户管理', ['rec002'])
+        self.feishu.replica.upsert_records.assert_called_once()
+        self.listener.assert_called_once_with('T001', '农户管理', ['rec001', 'rec002'])
+
+    def test_field_change_refreshes_schema(self):
+        """测试字段变更刷新表结构缓存"""
+        self.feishu.refresh_table_schema.return_value = '饲喂记录'
+        event = {'file_token': 'app_token', 'table_id': 'tbl002'}
+        self.assertTrue(self.tenant_service.handle_bitable_event('drive.file.bitable_field_changed_v1', event))
+        self.feishu.refresh_table_schema.assert_called_once_with('tbl002')
+        self.listener.assert_called_once_with('T001', '饲喂记录', [])
+
+    def test_unknown_app_token_ignored(self):
+        """测试未知多维表格的事件被忽略"""
+        event = {'file_token': 'other', 'table_id': 'tbl001', 'action_list': []}
+        self.assertFalse(self.tenant_service.handle_bitable_event('drive.file.bitable_record_changed_v1', event))
+        self.listener.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+"""JSON 编解码测试模块"""
+
+import unittest
+import sys
+import os
+import json
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from unittest.mock import patch
+from flask import Flask, jsonify
+from utils import json_codec
+from utils.json_codec import FastJSONProvider
+
+
+DATA = {'标题': '张三的土鸡', 'url': 'https://example.com/a.jpg', 'ids': [1, 2.5, None, True], 'nested': {'b': 1, 'a': 2}}
+
+
+class TestJsonCodec(unittest.TestCase):
+    """编解码测试"""
+
+    def test_same_output_for_all_backends(self):
+        """测试各实现输出与标准库紧凑输出一致"""
+        expected = json.dumps(DATA, ensure_ascii=False, separators=(',', ':'), sort_keys=True)
+        self.assertEqual(json_codec.dumps(DATA, sort_keys=True), expected)
+        with patch.object(json_codec, 'orjson', None), patch.object(json_codec, 'ujson', None):
+            self.assertEqual(json_codec.dumps(DATA, sort_keys=True), expected)
+            self.assertEqual(json_codec.loads(expected.encode('utf-8')), DATA)
+        self.assertEqual(json_codec.loads(expected), DATA)
+        self.assertEqual(json_codec.loads(json_codec.dumps_bytes(DATA)), DATA)
+
+    def test_fallback_values(self):
+        """测试非字符串键、超大整数和 NaN 与标准库行为一致"""
+        self.assertEqual(json_codec.loads(json_codec.dumps({1: 'a'})), {'1': 'a'})
+        self.assertEqual(json_codec.loads(json_codec.dumps([2 ** 70])), [2 ** 70])
+        self.assertEqual(json_codec.loads('{"a": 1, "b": NaN}')['a'], 1)
+        with self.assertRaises(TypeError):
+            json_codec.dumps({'time': datetime(2025, 8, 6)})
+        self.assertEqual(json_codec.dumps([datetime(2025, 8, 6)], default=lambda value: value.isoformat()),
+                         '["2025-08-06T00:00:00"]')
+
+
+class TestFastJSONProvider(unittest.TestCase):
+    """Flask JSON 提供者测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        app = Flask(__name__)
+        app.json = FastJSONProvider(app)
+
+        @app.route('/data', methods=['GET', 'POST'])
+        def data():
+            from flask import request
+            return jsonify(request.get_json(silent=True) or {**DATA, 'time': datetime(2025, 8, 6, 9, 49, 21)})
+
+        self.client = app.test_client()
+
+    def test_response(self):
+        """测试 jsonify 输出不转义中文，datetime 仍按 HTTP 日期格式输出"""
+        response = self.client.get('/data')
+        self.assertIn('张三的土鸡'.encode('utf-8'), response.data)
+        self.assertEqual(response.get_json()['time'], 'Wed, 06 Aug 2025 09:49:21 GMT')
+
+    def test_request(self):
+        """测试请求体解析"""
+        self.assertEqual(self.client.post('/data', json=DATA).get_json(), DATA)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,213 @@
+"""指标采集和管理接口测试模块"""
+
+import unittest
+import sys
+import os
+import threading
+import requests
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from unittest.mock import Mock, patch
+from services.tenant_service import tenant_service
+from utils.metrics import MetricsRegistry, metrics
+from tests.fixtures import TempCacheTestCase, make_feishu_service
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    """指标注册表测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.registry = MetricsRegistry()
+
+    def test_counter_merged_across_threads(self):
+        """测试各线程分片合并，已退出线程的值被保留"""
+        counter = self.registry.counter('requests_total', '请求数', ('route',))
+        self.assertIs(self.registry.counter('requests_total', '请求数', ('route',)), counter)
+
+        def work():
+            for _ in range(1000):
+                counter.inc('/a')
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        counter.inc('/b', amount=2)
+        self.assertEqual(counter.collect(), {('/a',): 8000, ('/b',): 2})
+        # 已退出线程的分片在下次采集时合并
+        self.assertEqual(len(counter._shards), 1)
+
+    def test_histogram_quantiles(self):
+        """测试直方图分桶和分位数估算"""
+        histogram = self.registry.histogram('latency_seconds', '耗时', ('route',), buckets=(0.01, 0.1, 1))
+        for value in [0.005] * 50 + [0.05] * 45 + [0.5] * 4 + [5]:
+            histogram.observe(value, '/a')
+        values = histogram.collect()[('/a',)]
+        self.assertEqual(values[:-1], [50, 45, 4, 1])
+        summary = histogram.summarize(values, scale=1000)
+        self.assertEqual(summary['count'], 100)
+        self.assertEqual(summary['p50'], 10.0)
+        self.assertTrue(10 < summary['p95'] <= 100)
+        self.assertEqual(summary['p99'], 1000)
+
+    def test_render_prometheus(self):
+        """测试 Prometheus 文本格式"""
+        self.registry.counter('events_total', '事件数', ('name',)).inc('a"b')
+        self.registry.histogram('size_bytes', '大小', buckets=(10, 100)).observe(50)
+        self.registry.gauge('queue_depth', '队列长度', func=lambda: {(): 3})
+        text = self.registry.render_prometheus()
+        self.assertIn('# TYPE events_total counter\nevents_total{name="a\\"b"} 1\n', text)
+        self.assertIn('size_bytes_bucket{le="10.0"} 0\nsize_bytes_bucket{le="100.0"} 1\nsize_bytes_bucket{le="+Inf"} 1\n', text)
+        self.assertIn('size_bytes_sum 50.0\nsize_bytes_count 1\n', text)
+        self.assertIn('queue_depth 3\n', text)
+
+
+class TestCacheMetrics(TempCacheTestCase):
+    """缓存命名空间指标测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        super().setUp()
+        metrics.reset()
+
+    def test_namespace_hits_and_sizes(self):
+        """测试各命名空间的命中、未命中、耗时和写入值大小"""
+        self.cache_service.cache_tenant_info('T001', {'tenant_num': 'T001'})
+        self.cache_service.get_tenant_info('T001')
+        self.cache_service.get_tenant_info('T002')
+        self.cache_service.cache_farmer_ids('T001', ['recA', 'recB'], 1)
+        self.cache_service.is_known_farmer('T001', 'recA')
+        self.cache_service.get_payload('1:0:recA:all', ['etag'])
+
+        namespaces = self.cache_service.get_cache_stats()['namespaces']
+        self.assertEqual(namespaces['tenant']['hits'], 1)
+        self.assertEqual(namespaces['tenant']['misses'], 1)
+        self.assertEqual(namespaces['tenant']['hit_ratio'], 0.5)
+        self.assertEqual(namespaces['tenant']['get_ms']['count'], 2)
+        self.assertEqual(namespaces['tenant']['set_ms']['count'], 1)
+        self.assertEqual(namespaces['known_farmers']['hit_ratio'], 1.0)
+        self.assertEqual(namespaces['payload']['misses'], 1)
+        self.assertEqual(namespaces['farmer_ids']['value_bytes']['count'], 1)
+        self.assertEqual(namespaces['known_farmers']['value_bytes']['avg'], 8)
+
+    def test_generation_evictions(self):
+        """测试回收缓存版本时记录删除的键数量"""
+        self.cache_service.cache_tenant_info('T001', {'tenant_num': 'T001'})
+        for _ in range(2):
+            generation = self.cache_service.new_generation()
+            batch = self.cache_service.write_batch(generation)
+            batch.cache_tenant_info('T001', {'tenant_num': 'T001'})
+            batch.execute()
+            self.cache_service.activate_generation(generation)
+        self.assertEqual(self.cache_service.get_cache_stats()['evictions']['generation'], 2)
+
+
+class TestAdminRoutes(TempCacheTestCase):
+    """管理接口测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        super().setUp()
+        with patch('app.init_multi_tenant_system'):
+            from app import create_app
+            self.client = create_app().test_client()
+        patcher = patch.object(tenant_service, 'cache_service', self.cache_service)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_token_required(self):
+        """测试未配置令牌时接口不启用，令牌错误时返回 401"""
+        with patch('config.config.ADMIN_TOKEN', ''):
+            self.assertEqual(self.client.get('/metrics').status_code, 404)
+        with patch('config.config.ADMIN_TOKEN', 'secret'):
+            self.assertEqual(self.client.get('/metrics').status_code, 401)
+            response = self.client.get('/api/v1/admin/cache/stats', headers={'Authorization': 'Bearer wrong'})
+            self.assertEqual(response.status_code, 401)
+
+    def test_stats_and_metrics(self):
+        """测试缓存统计和 Prometheus 指标"""
+        self.cache_service.get_tenant_info('T001')
+        headers = {'Authorization': 'Bearer secret'}
+        with patch('config.config.ADMIN_TOKEN', 'secret'):
+            response = self.client.get('/api/v1/admin/cache/stats', headers=headers)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('tenant', response.get_json()['data']['namespaces'])
+            response = self.client.get('/metrics', headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.mimetype.startswith('text/plain'))
+        self.assertIn('cache_requests_total{namespace="tenant",result="miss"}', response.get_data(as_text=True))
+
+
+class TestServiceMetrics(TempCacheTestCase):
+    """接口、飞书调用、图片代理、推送和定时任务指标测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        super().setUp()
+        metrics.reset()
+        with patch('app.init_multi_tenant_system'):
+            from app import create_app
+            self.client = create_app().test_client()
+
+    def samples(self, name):
+        return metrics.get(name).collect()
+
+    def test_request_latency_by_route(self):
+        """测试按路由规则记录接口耗时，路径参数不进入标签"""
+        self.client.get('/api/v1/health')
+        with patch('api.routes.load_farm_info', return_value=({'code': 0, 'data': {}}, 200)):
+            self.client.get('/api/v1/farm/recA/feeding')
+        self.client.get('/no/such/page')
+        routes = {labels[:2] for labels in self.samples('http_request_duration_seconds')}
+        self.assertIn(('/api/v1/health', 'GET'), routes)
+        self.assertIn(('/api/v1/farm/<product_id>/feeding', 'GET'), routes)
+        self.assertIn(('unmatched', 'GET'), routes)
+
+    def test_feishu_calls_by_tenant(self):
+        """测试按操作和租户记录飞书请求次数、状态和耗时"""
+        feishu = make_feishu_service({})
+        feishu.tenant_num = 'T001'
+        with patch('requests.get', return_value=Mock(status_code=200)), \
+             patch('config.config.FEISHU_HEDGE_ENABLED', False):
+            feishu._request('GET', 'https://example.com', 'list_records')
+        with patch('requests.get', side_effect=requests.exceptions.Timeout()), \
+             patch('config.config.FEISHU_HEDGE_ENABLED', False):
+            with self.assertRaises(Exception):
+                feishu._request('GET', 'https://example.com', 'list_records')
+        self.assertEqual(self.samples('feishu_requests_total'),
+                         {('list_records', 'T001', '200'): 1, ('list_records', 'T001', 'timeout'): 1})
+        self.assertEqual(sum(self.samples('feishu_request_seconds')[('list_records', 'T001')][:-1]), 2)
+
+    def test_image_proxy_revalidation(self):
+        """测试带有效 ETag 的图片请求直接返回 304，不请求飞书"""
+        with patch('requests.get', side_effect=AssertionError('不应请求飞书')):
+            response = self.client.get('/api/v1/img/boxcnA?num=1', headers={'If-None-Match': '"boxcnA"'})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.samples('image_proxy_responses_total'), {('client_cache',): 1})
+
+    def test_ingestion_and_scheduler(self):
+        """测试推送接口的进行中数量和定时任务耗时"""
+        with patch('config.config.FEISHU_EVENT_VERIFICATION_TOKEN', ''):
+            self.client.post('/api/v1/feishu/event', json={})
+        self.assertEqual(self.samples('ingestion_in_flight'), {('feishu_event',): 0})
+        self.assertEqual(sum(self.samples('ingestion_seconds')[('feishu_event',)][:-1]), 1)
+
+        tenant_service._run_job('update_cache', lambda: True)
+        tenant_service._run_job('update_cache', Mock(side_effect=RuntimeError('boom')))
+        self.assertEqual(self.samples('scheduler_runs_total'),
+                         {('update_cache', 'success'): 1, ('update_cache', 'error'): 1})
+
+    def test_prometheus_output(self):
+        """测试 /metrics 包含各类指标"""
+        self.client.get('/api/v1/health')
+        with patch('config.config.ADMIN_TOKEN', 'secret'):
+            text = self.client.get('/metrics', headers={'Authorization': 'Bearer secret'}).get_data(as_text=True)
+        self.assertIn('http_request_duration_seconds_bucket{route="/api/v1/health",method="GET",status="200",le="+Inf"} 1',
+                      text)
+        self.assertIn('# TYPE feishu_hedge_queue_depth gauge\nfeishu_hedge_queue_depth 0\n', text)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -9,17 +9,13 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from unittest.mock import Mock, patch, MagicMock
-from services.cache_service import MultiTenantCacheService
 from services.tenant_service import TenantService
 from services.feishu_service import FeishuService
+from tests.fixtures import CacheBackendTestCase
 
-class TestMultiTenantCache(unittest.TestCase):
-    """多租户缓存功能测试"""
+class MultiTenantCacheTests:
+    """多租户缓存功能测试，在每个缓存后端上各运行一次（见文件中的 TestMultiTenantCache* 类）"""
     
-    def setUp(self):
-        """测试前准备"""
-        self.cache_service = MultiTenantCacheService()
-        
     def test_cache_tenant_info(self):
         """测试租户信息缓存"""
         tenant_data = {
@@ -72,6 +68,14 @@ class TestMultiTenantCache(unittest.TestCase):
         self.assertTrue(self.cache_service.is_farmer_authorized('T001', 'farmer001'))
         self.assertFalse(self.cache_service.is_farmer_authorized('T001', 'farmer999'))
         
+    def test_known_farmers_beyond_authorized_count(self):
+        """测试超出授权数量的农户不授权，但仍记为已知农户"""
+        self.assertTrue(self.cache_service.cache_farmer_ids('T001', ['farmer001', 'farmer002', 'farmer003'], 2))
+        self.assertEqual(len(self.cache_service.get_farmer_ids('T001')['farmer_ids']), 2)
+        self.assertFalse(self.cache_service.is_farmer_authorized('T001', 'farmer003'))
+        self.assertTrue(self.cache_service.is_known_farmer('T001', 'farmer003'))
+        self.assertFalse(self.cache_service.is_known_farmer('T001', 'farmer999'))
+        
     def test_clear_tenant_cache(self):
         """测试清除租户缓存"""
         # 先添加一些缓存数据
@@ -88,6 +92,26 @@ class TestMultiTenantCache(unittest.TestCase):
         # 验证数据已清除
         self.assertIsNone(self.cache_service.get_tenant_info('T001'))
 
+
+class TestMultiTenantCache(MultiTenantCacheTests, CacheBackendTestCase):
+    """多租户缓存功能测试（redislite 后端）"""
+    backend = 'redislite'
+
+
+class TestMultiTenantCacheRedis(MultiTenantCacheTests, CacheBackendTestCase):
+    """多租户缓存功能测试（redis 后端）"""
+    backend = 'redis'
+
+
+class TestMultiTenantCacheSQLite(MultiTenantCacheTests, CacheBackendTestCase):
+    """多租户缓存功能测试（SQLite 后端）"""
+    backend = 'sqlite'
+
+
+class TestMultiTenantCacheMemory(MultiTenantCacheTests, CacheBackendTestCase):
+    """多租户缓存功能测试（进程内后端）"""
+    backend = 'memory'
+
 class TestTenantService(unittest.TestCase):
     """租户服务功能测试"""
     
@@ -0,0 +1,111 @@
+"""不存在产品ID负缓存测试模块"""
+
+import unittest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from unittest.mock import Mock, patch
+from services.tenant_service import TenantService
+from tests.fixtures import TempCacheTestCase, make_feishu_service
+
+
+class TestNegativeCache(TempCacheTestCase):
+    """缓存服务负缓存测试"""
+
+    def test_known_farmers(self):
+        """测试全部农户ID集合包含超出授权数量的农户"""
+        self.assertIsNone(self.cache_service.is_known_farmer('T001', 'recA'))
+        self.cache_service.cache_farmer_ids('T001', ['recA', 'recB', 'recC'], 2)
+        self.assertTrue(self.cache_service.is_known_farmer('T001', 'recC'))
+        self.assertFalse(self.cache_service.is_known_farmer('T001', 'recD'))
+
+        self.cache_service.cache_farmer_ids('T001', ['recA'], 2)
+        self.assertFalse(self.cache_service.is_known_farmer('T001', 'recC'))
+
+    def test_missing_products(self):
+        """测试负缓存的写入和清除"""
+        self.cache_service.mark_product_missing('T001', 'recX', ttl=60)
+        self.assertTrue(self.cache_service.is_product_missing('T001', 'recX'))
+        self.assertFalse(self.cache_service.is_product_missing('T002', 'recX'))
+
+        self.cache_service.clear_missing_products('T001', ['recX'])
+        self.assertFalse(self.cache_service.is_product_missing('T001', 'recX'))
+
+
+class TestTenantProductCheck(TempCacheTestCase):
+    """租户服务产品ID预检测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        super().setUp()
+        self.tenant_service = TenantService()
+        self.tenant_service.cache_service = self.cache_service
+        self.cache_service.cache_tenant_info('T001', {'app_token': 'app', 'personal_base_token': 'token'})
+        self.cache_service.cache_farmer_ids('T001', ['recF1', 'recF2'], 10)
+        self.feishu = Mock()
+        self.tenant_service.tenat_feishu_service = {'T001': self.feishu}
+
+    def test_invalid_ids_answered_locally(self):
+        """测试格式错误的产品ID不请求飞书"""
+        for product_id in ['../etc', 'farmer001', '']:
+            result = self.tenant_service.get_tenant_farm_info('T001', product_id)
+            self.assertTrue(result['not_found'])
+        self.feishu.get_farm_complete_info.assert_not_called()
+
+    def test_unknown_id_confirmed_once(self):
+        """测试农户集合中没有的产品ID请求飞书一次，确认不存在后写入负缓存"""
+        self.feishu.get_farm_complete_info.return_value = {
+            'success': False, 'data': None, 'message': '未找到', 'not_found': True
+        }
+        self.tenant_service.get_tenant_farm_info('T001', 'recF9')
+        result = self.tenant_service.get_tenant_farm_info('T001', 'recF9')
+        self.assertTrue(result['not_found'])
+        self.assertEqual(self.feishu.get_farm_complete_info.call_count, 1)
+
+        # 农户管理表变更后清除负缓存
+        self.tenant_service._notify_change('T001', '农户管理', ['recF9'])
+        self.assertTrue(self.tenant_service.check_product_exists('T001', 'recF9'))
+
+    def test_request_failure_not_cached(self):
+        """测试飞书请求失败（非不存在）时不写入负缓存"""
+        self.feishu.get_farm_complete_info.return_value = {
+            'success': False, 'data': None, 'message': '请求失败: timeout'
+        }
+        self.tenant_service.get_tenant_farm_info('T001', 'recF9')
+        self.assertFalse(self.cache_service.is_product_missing('T001', 'recF9'))
+
+    def test_known_farmer_ignores_negative_cache(self):
+        """测试农户集合中的产品ID不受负缓存影响"""
+        self.cache_service.mark_product_missing('T001', 'recF1', ttl=60)
+        self.assertTrue(self.tenant_service.check_product_exists('T001', 'recF1'))
+
+    def test_batch_skips_missing_ids(self):
+        """测试批量查询跳过负缓存中的产品ID，并缓存飞书返回的不存在ID"""
+        self.cache_service.mark_product_missing('T001', 'recX1', ttl=60)
+        self.feishu.get_farms_complete_info.return_value = {
+            'success': True, 'data': {'items': {'recF1': {}}, 'missing': ['recX2']}, 'message': 'success'
+        }
+        result = self.tenant_service.get_tenant_farms_info('T001', ['recF1', 'recX1', 'recX2'])
+        self.feishu.get_farms_complete_info.assert_called_once_with(['recF1', 'recX2'], None)
+        self.assertEqual(result['data']['missing'], ['recX1', 'recX2'])
+        self.assertTrue(self.cache_service.is_product_missing('T001', 'recX2'))
+
+    def test_load_farmer_ids_all_pages(self):
+        """测试农户ID集合分页读取整张农户管理表"""
+        feishu = make_feishu_service({'农户管理': 'tbl002'})
+        pages = [
+            {'code': 0, 'data': {'items': [{'record_id': f'recP{i}'} for i in range(20)],
+                                 'has_more': True, 'page_token': 'p2'}},
+            {'code': 0, 'data': {'items': [{'record_id': 'recP20'}], 'has_more': False}},
+        ]
+        responses = [Mock(status_code=200, json=Mock(return_value=page)) for page in pages]
+        self.tenant_service.tenat_feishu_service = {'T001': feishu}
+        with patch('requests.get', side_effect=responses) as mock_get:
+            self.assertTrue(self.tenant_service.load_tenant_farmer_ids('T001'))
+        self.assertEqual(mock_get.call_args_list[1][1]['params']['page_token'], 'p2')
+        self.assertTrue(self.cache_service.is_known_farmer('T001', 'recP20'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+"""预序列化响应缓存测试模块"""
+
+import unittest
+import sys
+import os
+import gzip
+import json
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from unittest.mock import Mock, patch
+from services.payload_cache import payload_cache
+from services.tenant_service import tenant_service
+from api.routes import update_sensor_data_to_feishu
+from utils.compression import choose_encoding
+from tests.fixtures import TempCacheTestCase
+
+
+FARM_RESPONSE = {'code': 0, 'message': 'success', 'data': {'product_info': {'标题': '张三的土鸡'}}}
+
+
+class TestChooseEncoding(unittest.TestCase):
+    """内容编码协商测试"""
+
+    def test_choose(self):
+        """测试按优先级选择客户端接受的编码"""
+        self.assertEqual(choose_encoding('gzip, deflate, br'), 'br')
+        self.assertEqual(choose_encoding('gzip, deflate, br', ('gzip', 'identity')), 'gzip')
+        self.assertEqual(choose_encoding('br;q=0, gzip'), 'gzip')
+        self.assertEqual(choose_encoding(''), 'identity')
+
+
+class TestFarmInfoPayloadCache(TempCacheTestCase):
+    """农户详情接口响应缓存测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        super().setUp()
+        with patch('app.init_multi_tenant_system'):
+            from app import create_app
+            self.client = create_app().test_client()
+        patchers = [
+            patch.object(payload_cache, 'cache_service', self.cache_service),
+            patch('api.routes.rate_limiter.check', return_value=(True, 0, None)),
+            patch('api.routes.tenant_service.get_tenant_info', return_value={'tenant_num': '1'}),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _get(self, headers=None, response=(FARM_RESPONSE, 200)):
+        with patch('api.routes.load_farm_info', return_value=response) as mock_load:
+            result = self.client.get('/api/v1/farm/info?product_id=recF1&tenant_num=1', headers=headers or {})
+        return result, mock_load.call_count
+
+    def test_serve_cached_gzip(self):
+        """测试第二次请求直接返回缓存的压缩响应"""
+        first, calls = self._get({'Accept-Encoding': 'gzip'})
+        self.assertEqual(calls, 1)
+        self.assertEqual(first.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(first.data)), FARM_RESPONSE)
+
+        second, calls = self._get({'Accept-Encoding': 'gzip'})
+        self.assertEqual(calls, 0)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second.headers['ETag'], first.headers['ETag'])
+
+        plain, calls = self._get()
+        self.assertEqual(calls, 0)
+        self.assertNotIn('Content-Encoding', plain.headers)
+        self.assertEqual(plain.get_json(), FARM_RESPONSE)
+
+    def test_not_modified(self):
+        """测试 ETag 未变化时返回 304"""
+        first, _ = self._get()
+        second, calls = self._get({'If-None-Match': first.headers['ETag']})
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(calls, 0)
+
+    def test_invalidated_on_change(self):
+        """测试租户数据变更后重新生成响应"""
+        self._get()
+        self.cache_service.bump_payload_generation('1')
+        _, calls = self._get()
+        self.assertEqual(calls, 1)
+
+    def sensor_feishu(self):
+        """传感器表中有温度、湿度和一个设备的飞书服务"""
+        feishu = Mock()
+        feishu.get_table_records.return_value = {'success': True, 'message': 'success', 'data': {'items': [
+            {'record_id': 'recS1', 'fields': {'名称': '温度', '数据': '26.0'}},
+            {'record_id': 'recS2', 'fields': {'名称': '湿度', '数据': '47.0'}},
+            {'record_id': 'recS3', 'fields': {'编号': '011722001182', '数据': '3000'}},
+        ]}}
+        feishu.batch_update_records.return_value = {'success': True, 'message': 'success'}
+        return feishu
+
+    def test_invalidated_on_sensor_write(self):
+        """测试写入传感器数据后下一次请求返回新的传感器读数"""
+        updated = {'code': 0, 'message': 'success', 'data': {'sensor': {'温度': '30.5'}}}
+        self.cache_service.cache_tenant_info('1', {'tenant_num': '1'})
+        feishu = self.sensor_feishu()
+        with patch.object(tenant_service, 'cache_service', self.cache_service), \
+             patch.object(tenant_service, 'get_tenant_feishu_service', return_value=feishu):
+            self._get()
+            self.assertTrue(update_sensor_data_to_feishu({'temperature': '30.5', 'humidity': '40.0'}, '1'))
+            response, calls = self._get(response=(updated, 200))
+            self.assertEqual(calls, 1)
+            self.assertEqual(response.get_json(), updated)
+
+            # 百度智能云设备数据
+            tenant_service.save_baidu_lot_data('1', {'id': '011722001182', 'motion': '3119'})
+            self.assertEqual(feishu.batch_update_records.call_count, 2)
+            _, calls = self._get()
+            self.assertEqual(calls, 1)
+
+    def test_partial_not_cached(self):
+        """测试部分返回的响应不缓存"""
+        partial = {'code': 0, 'message': 'success', 'data': {'omitted_sections': ['sensor']}}
+        self._get(response=(partial, 200))
+        _, calls = self._get(response=(partial, 200))
+        self.assertEqual(calls, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
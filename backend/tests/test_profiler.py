@@ -0,0 +1,110 @@
+"""采样分析器测试模块"""
+
+import unittest
+import sys
+import os
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from unittest.mock import patch
+from utils.profiler import SamplingProfiler, sampling_profiler, route_filename
+from tests.fixtures import TempCacheTestCase
+
+
+def slow_farm_info(tenant_num, product_id, sections=None):
+    time.sleep(0.1)
+    return {'code': 1, 'message': '产品不存在', 'data': None}, 404
+
+
+class TestSamplingProfiler(unittest.TestCase):
+    """采样分析器测试"""
+
+    def test_disabled_by_default(self):
+        """测试未启用时没有采样线程，请求不登记"""
+        profiler = SamplingProfiler()
+        self.assertFalse(profiler.active)
+        self.assertIsNone(profiler._thread)
+        self.assertIsNone(profiler.stop())
+
+    def test_invalid_arguments(self):
+        """测试参数校验和重复启用"""
+        profiler = SamplingProfiler()
+        for kwargs in ({'seconds': 0}, {'seconds': 1, 'percent': 0}, {'seconds': 1, 'interval': 0}):
+            with self.assertRaises(ValueError):
+                profiler.start(**kwargs)
+        profiler.start(5)
+        with self.assertRaises(RuntimeError):
+            profiler.start(5)
+        profiler.stop()
+        self.assertFalse(profiler.active)
+
+    def test_route_filename(self):
+        """测试路由规则转换为文件名"""
+        self.assertEqual(route_filename('/api/v1/farm/<product_id>/feeding'), 'api_v1_farm_product_id_feeding.folded')
+        self.assertEqual(route_filename('/'), 'root.folded')
+
+
+class TestProfilerRoutes(TempCacheTestCase):
+    """采样分析器接口测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        super().setUp()
+        with patch('app.init_multi_tenant_system'):
+            from app import create_app
+            self.client = create_app().test_client()
+        self.output_dir = tempfile.mkdtemp()
+        self.headers = {'Authorization': 'Bearer secret'}
+        for name, value in (('ADMIN_TOKEN', 'secret'), ('PROFILER_OUTPUT_DIR', self.output_dir)):
+            patcher = patch(f'config.config.{name}', value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(sampling_profiler.stop)
+
+    def test_sample_route(self):
+        """测试采样被抽中的请求，按路由输出折叠栈并写入文件"""
+        response = self.client.post('/api/v1/admin/profiler', headers=self.headers,
+                                    json={'seconds': 30, 'interval_ms': 2, 'routes': '/api/v1/farm/info'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.post('/api/v1/admin/profiler', headers=self.headers, json={}).status_code, 409)
+
+        with patch('api.routes.load_farm_info', side_effect=slow_farm_info):
+            self.client.get('/api/v1/farm/info?product_id=recX')
+        self.client.get('/api/v1/health')
+
+        session = self.client.delete('/api/v1/admin/profiler', headers=self.headers).get_json()['data']
+        self.assertEqual(session['requests'], {'/api/v1/farm/info': 1})
+        self.assertGreater(session['samples']['/api/v1/farm/info'], 10)
+        self.assertEqual([os.path.basename(path) for path in session['files']], ['api_v1_farm_info.folded'])
+
+        folded = self.client.get('/api/v1/admin/profiler/stacks?route=/api/v1/farm/info',
+                                 headers=self.headers).get_data(as_text=True)
+        lines = folded.splitlines()
+        self.assertTrue(all(line.startswith('/api/v1/farm/info;') for line in lines))
+        self.assertTrue(all(line.rsplit(' ', 1)[1].isdigit() for line in lines))
+        self.assertTrue(any('slow_farm_info_(test_profiler.py:' in line for line in lines))
+        with open(session['files'][0], encoding='utf-8') as f:
+            self.assertEqual(f.read(), folded)
+
+        status = self.client.get('/api/v1/admin/profiler', headers=self.headers).get_json()['data']
+        self.assertFalse(status['active'])
+
+    def test_percent_and_limits(self):
+        """测试按百分比抽取请求和采样时长上限"""
+        response = self.client.post('/api/v1/admin/profiler', headers=self.headers, json={'seconds': 3600})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/v1/admin/profiler', headers=self.headers, json={'percent': 'abc'})
+        self.assertEqual(response.status_code, 400)
+
+        self.client.post('/api/v1/admin/profiler', headers=self.headers, json={'seconds': 30, 'percent': 50, 'routes': ['/api/v1/health']})
+        with patch('utils.profiler.random.random', side_effect=[0.9, 0.1]):
+            self.client.get('/api/v1/health')
+            self.client.get('/api/v1/health')
+        session = self.client.delete('/api/v1/admin/profiler', headers=self.headers).get_json()['data']
+        self.assertEqual(session['requests'], {'/api/v1/health': 1})
+        self.assertEqual(self.client.post('/api/v1/admin/profiler').status_code, 401)
+
+
+if __name__ == '__main__':
+    unittest.main()
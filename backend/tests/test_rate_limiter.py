@@ -0,0 +1,148 @@
+"""接口限流测试模块"""
+
+import unittest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from unittest.mock import Mock, patch
+from services.rate_limiter import RateLimiter, rate_limiter
+from services.payload_cache import payload_cache
+from services.tenant_service import tenant_service
+from tests.fixtures import TempCacheTestCase
+
+
+class TestRateLimiter(TempCacheTestCase):
+    """滑动窗口限流器测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        super().setUp()
+        self.limiter = RateLimiter(self.cache_service, ip_limit=3, tenant_limit=5, window=60)
+
+    def test_ip_limit(self):
+        """测试单个IP超限后被拒绝，其他IP不受影响"""
+        for _ in range(3):
+            self.assertTrue(self.limiter.check('1.1.1.1', '1')[0])
+        allowed, retry_after, scope = self.limiter.check('1.1.1.1', '1')
+        self.assertFalse(allowed)
+        self.assertEqual(scope, 'ip')
+        self.assertGreaterEqual(retry_after, 1)
+        self.assertTrue(self.limiter.check('2.2.2.2', '1')[0])
+        self.assertEqual(self.cache_service.get_rate_limited_counts(), {'api:ip': 1})
+
+    def test_rejected_ip_not_counted_for_tenant(self):
+        """测试被IP限流拒绝的请求不消耗租户额度"""
+        for _ in range(10):
+            self.limiter.check('1.1.1.1', '1')
+        # 爬虫只消耗了 3 次租户额度，其他客户端仍可访问
+        self.assertTrue(self.limiter.check('2.2.2.2', '1')[0])
+        self.assertTrue(self.limiter.check('3.3.3.3', '1')[0])
+
+    def test_tenant_limit(self):
+        """测试租户请求总数超限"""
+        for i in range(5):
+            self.assertTrue(self.limiter.check(f'10.0.0.{i}', '1')[0])
+        allowed, _, scope = self.limiter.check('10.0.0.9', '1')
+        self.assertFalse(allowed)
+        self.assertEqual(scope, 'tenant')
+        self.assertTrue(self.limiter.check('10.0.0.9', '2')[0])
+
+    def test_sliding_window_weighs_previous_bucket(self):
+        """测试上一窗口的请求按剩余比例计入"""
+        with patch('services.cache_service.time.time', return_value=6000.0):
+            for _ in range(3):
+                self.limiter.check('1.1.1.1')
+        # 新窗口过去一半时，上一窗口 3 次请求按 1.5 次计算
+        with patch('services.cache_service.time.time', return_value=6090.0):
+            self.assertTrue(self.limiter.check('1.1.1.1')[0])
+            self.assertFalse(self.limiter.check('1.1.1.1')[0])
+
+    def test_route_classes_counted_separately(self):
+        """测试图片、页面请求和 JSON 接口分别计数"""
+        limiter = RateLimiter(self.cache_service, ip_limit=2, tenant_limit=0, window=60,
+                              class_limits={'page': (1, 0), 'image': (10, 0)})
+        for _ in range(10):
+            self.assertTrue(limiter.check('1.1.1.1', '1', 'image')[0])
+        self.assertTrue(limiter.check('1.1.1.1', '1', 'page')[0])
+        self.assertFalse(limiter.check('1.1.1.1', '1', 'page')[0])
+        self.assertTrue(limiter.check('1.1.1.1', '1')[0])
+        self.assertTrue(limiter.check('1.1.1.1', '1')[0])
+        self.assertFalse(limiter.check('1.1.1.1', '1', 'image')[0])
+        self.assertEqual(self.cache_service.get_rate_limited_counts(), {'page:ip': 1, 'image:ip': 1})
+
+    def test_disabled(self):
+        """测试限制为 0 时不限流"""
+        limiter = RateLimiter(self.cache_service, ip_limit=0, tenant_limit=0, window=60)
+        for _ in range(10):
+            self.assertTrue(limiter.check('1.1.1.1', '1')[0])
+
+
+class TestRateLimitedRoute(TempCacheTestCase):
+    """接口限流测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        super().setUp()
+        with patch('app.init_multi_tenant_system'):
+            from app import create_app
+            self.client = create_app().test_client()
+        patchers = [
+            patch.multiple(rate_limiter, cache_service=self.cache_service, ip_limit=1, tenant_limit=10),
+            patch.object(payload_cache, 'cache_service', self.cache_service),
+            patch.object(tenant_service, 'cache_service', self.cache_service),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_rejected_before_feishu(self):
+        """测试超限请求返回 429 且不查询租户数据"""
+        with patch('api.routes.load_farm_info', return_value=({'code': 0, 'data': {}}, 200)) as mock_load:
+            headers = {'X-Forwarded-For': '9.9.9.9, 10.0.0.1'}
+            self.assertEqual(self.client.get('/api/v1/farm/info?product_id=recF1', headers=headers).status_code, 200)
+            response = self.client.get('/api/v1/farm/info?product_id=recF1', headers=headers)
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response.headers)
+        self.assertEqual(response.get_json()['data']['scope'], 'ip')
+        self.assertEqual(mock_load.call_count, 1)
+
+    def test_images_do_not_exhaust_api_quota(self):
+        """测试页面加载的多张图片不占用 JSON 接口的IP额度"""
+        with patch('api.routes.requests.get', return_value=Mock(status_code=404, text='')):
+            statuses = {self.client.get(f'/api/v1/img/boxcn{i}').status_code for i in range(5)}
+        self.assertNotIn(429, statuses)
+        with patch('api.routes.load_farm_info', return_value=({'code': 0, 'data': {}}, 200)):
+            self.assertEqual(self.client.get('/api/v1/farm/info?product_id=recF1').status_code, 200)
+
+    def test_unknown_tenant_not_counted(self):
+        """测试未登记的租户编号不计入租户额度，不能耗尽其他租户的额度"""
+        self.cache_service.cache_tenant_info('T001', {'tenant_num': 'T001'})
+        with patch.multiple(rate_limiter, ip_limit=0, tenant_limit=1), \
+             patch('api.routes.load_farm_info', return_value=({'code': 0, 'data': {}}, 200)):
+            statuses = [self.client.get(f'/api/v1/farm/info?product_id=recF1&tenant_num={tenant}').status_code
+                        for tenant in ('FAKE1', 'FAKE2', 'T001', 'T001')]
+        self.assertEqual(statuses, [200, 200, 200, 429])
+
+    def test_forwarded_for_not_trusted_by_default(self):
+        """测试默认不信任 X-Forwarded-For，伪造不同地址不能绕过IP限流"""
+        with patch('api.routes.load_farm_info', return_value=({'code': 0, 'data': {}}, 200)):
+            statuses = [self.client.get('/api/v1/farm/info?product_id=recF1',
+                                        headers={'X-Forwarded-For': f'9.9.9.{i}'}).status_code for i in range(2)]
+        self.assertEqual(statuses, [200, 429])
+
+    def test_trusted_proxy_hop(self):
+        """测试信任代理时取代理追加的最右侧地址，客户端填写的地址不影响限流"""
+        with patch('config.config.TRUST_PROXY_HEADERS', True), patch('app.init_multi_tenant_system'):
+            from app import create_app
+            client = create_app().test_client()
+        with patch('api.routes.load_farm_info', return_value=({'code': 0, 'data': {}}, 200)):
+            statuses = [client.get('/api/v1/farm/info?product_id=recF1',
+                                   headers={'X-Forwarded-For': f'9.9.9.{i}, 8.8.8.8'}).status_code for i in range(2)]
+            statuses.append(client.get('/api/v1/farm/info?product_id=recF1',
+                                       headers={'X-Forwarded-For': '9.9.9.0, 7.7.7.7'}).status_code)
+        self.assertEqual(statuses, [200, 429, 200])
+
+
+if __name__ == '__main__':
+    unittest.main()
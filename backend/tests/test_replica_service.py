@@ -0,0 +1,205 @@
+"""本地副本功能测试模块
+
+测试 SQLite 副本的同步、查询以及飞书服务的副本读取模式
+"""
+
+import unittest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from unittest.mock import Mock, patch
+from services.replica_service import parse_filter, parse_sort
+from services.tenant_service import TenantService
+from tests.fixtures import TempReplicaTestCase, make_feishu_service
+
+
+def make_records():
+    """构造测试用的饲喂记录"""
+    return [
+        {'record_id': 'rec001', 'fields': {'农户': '张三', '食物': '玉米', '操作时间': 3000, '更新': 30}},
+        {'record_id': 'rec002', 'fields': {'农户': [{'text': '李四', 'type': 'text'}], '食物': '稻谷', '操作时间': 1000, '更新': 10}},
+        {'record_id': 'rec003', 'fields': {'农户': '张三', '食物': '青菜', '操作时间': 2000, '更新': 20}},
+    ]
+
+
+class TestReplicaService(TempReplicaTestCase):
+    """本地副本存储测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        super().setUp()
+        self.replica = self.replica_service.get_replica('T001')
+
+    def test_parse_filter_and_sort(self):
+        """测试过滤条件和排序解析"""
+        self.assertEqual(parse_filter('CurrentValue.[农户]="张三"'), [('农户', ['张三'])])
+        self.assertEqual(parse_filter('OR(CurrentValue.[农户]="张三",CurrentValue.[农户]="李四")'),
+                         [('农户', ['张三', '李四'])])
+        self.assertIsNone(parse_filter('AND(CurrentValue.[农户]="张三", CurrentValue.[食物]="玉米")'))
+        self.assertIsNone(parse_filter('OR(CurrentValue.[农户]="张三", CurrentValue.[食物]="玉米")'))
+        self.assertEqual(parse_sort('["更新 ASC"]'), [('updated_time', 'ASC')])
+        self.assertIsNone(parse_sort('["食物 ASC"]'))
+
+    def test_replace_and_query(self):
+        """测试全量同步后的查询"""
+        self.assertFalse(self.replica.is_synced('饲喂记录'))
+        self.assertEqual(self.replica.replace_table('饲喂记录', make_records()), 3)
+        self.assertTrue(self.replica.is_synced('饲喂记录'))
+
+        records = self.replica.query('饲喂记录', [('农户', ['张三'])], [('operation_time', 'ASC')])
+        self.assertEqual([r['record_id'] for r in records], ['rec003', 'rec001'])
+
+        records = self.replica.query('饲喂记录', [('农户', ['李四'])], [])
+        self.assertEqual(len(records), 1)
+
+        records = self.replica.query('饲喂记录', [('农户', ['张三', '李四'])], [('operation_time', 'DESC')])
+        self.assertEqual([r['record_id'] for r in records], ['rec001', 'rec003', 'rec002'])
+
+        self.assertEqual(self.replica.get_record('饲喂记录', 'rec002')['食物'], '稻谷')
+        self.assertIsNone(self.replica.get_record('饲喂记录', 'rec999'))
+
+    def test_upsert_and_delete(self):
+        """测试增量写入和删除"""
+        self.replica.replace_table('饲喂记录', make_records())
+        self.replica.upsert_records('饲喂记录', [
+            {'record_id': 'rec001', 'fields': {'农户': '王五', '食物': '玉米'}},
+            {'record_id': 'rec004', 'fields': {'农户': '张三', '食物': '小麦'}},
+        ])
+        self.replica.delete_records('饲喂记录', ['rec003'])
+
+        ids = [r['record_id'] for r in self.replica.list_records('饲喂记录')]
+        self.assertEqual(ids, ['rec001', 'rec002', 'rec004'])
+        records = self.replica.query('饲喂记录', [('农户', ['张三'])], [])
+        self.assertEqual([r['record_id'] for r in records], ['rec004'])
+
+    def test_update_fields(self):
+        """测试部分字段更新合并"""
+        self.replica.replace_table('传感器', [{'record_id': 'rec010', 'fields': {'名称': '温度', '数据': '20'}}])
+        self.replica.update_fields('传感器', [{'record_id': 'rec010', 'fields': {'数据': '25'}}])
+        self.assertEqual(self.replica.get_record('传感器', 'rec010'), {'名称': '温度', '数据': '25'})
+
+
+class TestIncrementalSync(TempReplicaTestCase):
+    """基于水位线的增量同步测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        super().setUp()
+        self.feishu_service = Mock()
+        self.feishu_service.get_table_id_by_name.side_effect = lambda name: 'tbl001' if name == '饲喂记录' else ''
+        self.feishu_service.list_all_records.return_value = {'success': True, 'data': make_records(), 'message': 'success'}
+
+    def test_first_sync_is_full(self):
+        """测试首次同步执行全量同步并记录水位线"""
+        self.assertTrue(self.replica_service.sync_tenant('T001', self.feishu_service))
+        self.feishu_service.list_records_updated_since.assert_not_called()
+        state = self.replica_service.get_replica('T001').get_sync_state('饲喂记录')
+        self.assertEqual(state['watermark'], 30)
+        self.assertEqual(state['record_count'], 3)
+
+    def test_incremental_sync_applies_changes(self):
+        """测试增量同步只拉取水位线之后的变更"""
+        self.replica_service.sync_tenant('T001', self.feishu_service)
+        self.feishu_service.list_records_updated_since.return_value = {
+            'success': True,
+            'data': [
+                {'record_id': 'rec004', 'fields': {'农户': '张三', '食物': '小麦', '更新': 50}},
+                {'record_id': 'rec002', 'fields': {'农户': '李四', '食物': '豆粕', '更新': 40}},
+            ],
+            'message': 'success'
+        }
+
+        self.assertTrue(self.replica_service.sync_tenant('T001', self.feishu_service))
+        self.assertEqual(self.feishu_service.list_all_records.call_count, 1)
+        since = self.feishu_service.list_records_updated_since.call_args[0][1]
+        self.assertEqual(since, 30 - self.replica_service.sync_overlap_ms)
+
+        replica = self.replica_service.get_replica('T001')
+        self.assertEqual(replica.get_record('饲喂记录', 'rec002')['食物'], '豆粕')
+        state = replica.get_sync_state('饲喂记录')
+        self.assertEqual(state['watermark'], 50)
+        self.assertEqual(state['record_count'], 4)
+
+    def test_periodic_full_reconciliation(self):
+        """测试超过全量校对间隔后重新全量同步以处理删除"""
+        self.replica_service.sync_tenant('T001', self.feishu_service)
+        self.feishu_service.list_all_records.return_value = {'success': True, 'data': make_records()[:1], 'message': 'success'}
+        self.replica_service.full_sync_interval = 0
+
+        self.replica_service.sync_tenant('T001', self.feishu_service)
+        self.feishu_service.list_records_updated_since.assert_not_called()
+        ids = [r['record_id'] for r in self.replica_service.get_replica('T001').list_records('饲喂记录')]
+        self.assertEqual(ids, ['rec001'])
+
+
+class TestTenantReplicaInit(unittest.TestCase):
+    """租户缓存初始化时的副本同步顺序测试"""
+
+    def test_sync_before_loading_farmer_ids(self):
+        """测试先同步副本再加载农户ID，新增农户在本周期内即可生效"""
+        tenant_service = TenantService()
+        tenant_service.tenant_nums = {'T001'}
+        calls = Mock()
+        with patch.object(tenant_service, 'load_system_tenants', return_value=True), \
+             patch.object(tenant_service, 'load_tenant_tables', return_value=True), \
+             patch.object(tenant_service, 'sync_tenant_replica', calls.sync), \
+             patch.object(tenant_service, 'load_tenant_farmer_ids', calls.load):
+            calls.load.return_value = True
+            self.assertTrue(tenant_service.initialize_cache())
+        self.assertEqual([name for name, _, _ in calls.mock_calls], ['sync', 'load'])
+
+
+class TestFeishuServiceReplicaMode(TempReplicaTestCase):
+    """飞书服务副本读取模式测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        super().setUp()
+        replica = self.replica_service.get_replica('T001')
+        replica.replace_table('饲喂记录', make_records())
+        self.feishu_service = make_feishu_service({'饲喂记录': 'tbl001', '养殖流程': 'tbl002'}, replica=replica)
+        self.feishu_service.read_mode = 'replica'
+
+    @patch('requests.get')
+    def test_filter_from_replica(self, mock_get):
+        """测试过滤查询直接读取副本"""
+        result = self.feishu_service.get_table_records_filter('饲喂记录', 'CurrentValue.[农户]="张三"')
+        self.assertTrue(result['success'])
+        self.assertEqual([r['食物'] for r in result['data']], ['青菜', '玉米'])
+
+        result = self.feishu_service.get_record_by_id('饲喂记录', 'rec002')
+        self.assertTrue(result['success'])
+        self.assertEqual(result['data']['食物'], '稻谷')
+        mock_get.assert_not_called()
+
+    @patch('requests.get')
+    def test_list_records_updated_since(self, mock_get):
+        """测试按「更新」倒序读取，遇到水位线之前的记录即停止"""
+        mock_get.return_value.json.return_value = {
+            'code': 0,
+            'data': {
+                'items': [
+                    {'record_id': 'rec005', 'fields': {'更新': 60}},
+                    {'record_id': 'rec004', 'fields': {'更新': 50}},
+                    {'record_id': 'rec001', 'fields': {'更新': 30}},
+                ],
+                'has_more': True,
+                'page_token': 'next'
+            }
+        }
+        result = self.feishu_service.list_records_updated_since('饲喂记录', 40)
+        self.assertTrue(result['success'])
+        self.assertEqual([r['record_id'] for r in result['data']], ['rec005', 'rec004'])
+        mock_get.assert_called_once()
+
+    @patch('requests.get')
+    def test_fallback_when_not_synced(self, mock_get):
+        """测试副本未同步的表回退到飞书查询"""
+        mock_get.return_value.json.return_value = {'code': 0, 'data': {'items': []}}
+        self.feishu_service.get_table_records_filter('养殖流程', 'CurrentValue.[农户]="张三"')
+        mock_get.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
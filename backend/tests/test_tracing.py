@@ -0,0 +1,111 @@
+"""飞书调用追踪测试模块"""
+
+import unittest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from unittest.mock import Mock, patch
+from services.feishu_service import feishu_calls
+from services.tenant_service import tenant_service
+from utils.tracing import CallTraceBuffer, trace_scope, current_trace
+from tests.fixtures import TempCacheTestCase, make_feishu_service
+
+
+class TestCallTraceBuffer(unittest.TestCase):
+    """调用记录缓冲区测试"""
+
+    def test_report_calls_per_request(self):
+        """测试按来源汇总调用次数，同一请求内的多次调用计入每请求调用次数"""
+        buffer = CallTraceBuffer()
+        for _ in range(2):
+            with trace_scope('/api/v1/bdlot/<tenant_num>/receive') as trace:
+                for _ in range(3):
+                    buffer.record('T001', '传感器', 'list_records', '200', 0.01, 100)
+            self.assertEqual((trace.calls, trace.bytes), (3, 300))
+        with trace_scope('/api/v1/farm/info'):
+            buffer.record('T001', '农户管理', 'get_record', '200', 0.2, 50)
+        buffer.record('system', '租户管理', 'list_records', 'timeout', 0.5, 0)
+        self.assertIsNone(current_trace())
+
+        report = buffer.report(group_by=['origin'])
+        self.assertEqual(report['entries'], 8)
+        first = report['top'][0]
+        self.assertEqual(first['origin'], '/api/v1/bdlot/<tenant_num>/receive')
+        self.assertEqual((first['calls'], first['requests'], first['bytes']), (6, 2, 600))
+        self.assertEqual((first['calls_per_request'], first['max_calls_per_request']), (3, 3))
+        background = [row for row in report['top'] if row['origin'] == 'background'][0]
+        self.assertEqual((background['errors'], background['calls_per_request']), (1, None))
+
+        top = buffer.report(group_by=['tenant', 'table'], sort='total_ms', top=1)['top']
+        self.assertEqual([(row['tenant'], row['table']) for row in top], [('system', '租户管理')])
+        with self.assertRaises(ValueError):
+            buffer.report(group_by=['route'])
+
+    def test_ring_buffer(self):
+        """测试缓冲区满后丢弃最早的记录"""
+        buffer = CallTraceBuffer(size=3)
+        for index in range(5):
+            buffer.record('T001', '', f'op{index}', '200', 0.01, 0)
+        self.assertEqual([entry['operation'] for entry in buffer.entries()], ['op2', 'op3', 'op4'])
+
+
+class TestFeishuCallTracing(TempCacheTestCase):
+    """飞书服务调用记录和接口测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        super().setUp()
+        feishu_calls.clear()
+        with patch('app.init_multi_tenant_system'):
+            from app import create_app
+            self.client = create_app().test_client()
+
+    def test_feishu_request_tagged(self):
+        """测试飞书请求记录租户、表名、操作、状态和响应大小"""
+        feishu = make_feishu_service({'传感器': 'tblS'})
+        feishu.tenant_num = 'T001'
+        response = Mock(status_code=200, content=b'{"code":0,"data":{"items":[]}}')
+        response.json.return_value = {'code': 0, 'data': {'items': []}}
+        with patch('requests.get', return_value=response), patch('config.config.FEISHU_HEDGE_ENABLED', False):
+            with trace_scope('job:update_cache'):
+                feishu.get_table_records('传感器')
+        entry = feishu_calls.entries()[0]
+        self.assertEqual((entry['origin'], entry['tenant'], entry['table'], entry['operation'], entry['status']),
+                         ('job:update_cache', 'T001', '传感器', 'list_records', '200'))
+        self.assertEqual(entry['bytes'], len(response.content))
+
+    def test_scheduler_origin(self):
+        """测试定时任务内的调用来源为 job:<任务名>"""
+        tenant_service._run_job('sync_replicas', lambda: feishu_calls.record('T001', '', 'list_records', '200', 0, 0))
+        self.assertEqual(feishu_calls.entries()[0]['origin'], 'job:sync_replicas')
+
+    def test_server_timing(self):
+        """测试 /farm/info 返回本次请求内飞书调用的 Server-Timing"""
+        def load_farm_info(tenant_num, product_id, sections=None):
+            feishu_calls.record('T001', '农户管理', 'get_record', '200', 0.05, 120)
+            feishu_calls.record('T001', '饲喂记录', 'list_records', '200', 0.025, 80)
+            return {'code': 1, 'message': '产品不存在', 'data': None}, 404
+
+        with patch('api.routes.load_farm_info', side_effect=load_farm_info):
+            response = self.client.get('/api/v1/farm/info?product_id=recX')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.headers['Server-Timing'], 'feishu;dur=75.0;desc="2 calls, 200 bytes"')
+        self.assertEqual({entry['origin'] for entry in feishu_calls.entries()}, {'/api/v1/farm/info'})
+
+    def test_report_endpoint(self):
+        """测试管理接口返回调用最多的来源"""
+        feishu_calls.record('T001', '传感器', 'list_records', '200', 0.01, 10)
+        headers = {'Authorization': 'Bearer secret'}
+        with patch('config.config.ADMIN_TOKEN', 'secret'):
+            response = self.client.get('/api/v1/admin/feishu/calls?group_by=tenant,table', headers=headers)
+            self.assertEqual(response.status_code, 200)
+            top = response.get_json()['data']['top']
+            self.assertEqual((top[0]['tenant'], top[0]['table'], top[0]['calls']), ('T001', '传感器', 1))
+            response = self.client.get('/api/v1/admin/feishu/calls?sort=latency', headers=headers)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(self.client.get('/api/v1/admin/feishu/calls').status_code, 401)
+
+
+if __name__ == '__main__':
+    unittest.main()
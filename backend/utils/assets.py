@@ -0,0 +1,90 @@
+"""
+静态资源清单：将模板中的资源路径映射为带内容哈希的文件名
+
+build_assets.py 把 frontend/static 下的 CSS、JS 复制到 dist/ 目录，文件名带内容哈希，
+并生成 .gz/.br 预压缩文件和 manifest.json。文件内容变化时地址随之变化，
+因此 dist/ 下的文件可以设置为永久缓存（immutable）。
+"""
+import json
+import mimetypes
+import os
+import threading
+from typing import Dict
+
+from utils.compression import accepted_encodings
+
+DIST_DIR = 'dist'
+MANIFEST_FILE = 'manifest.json'
+
+# dist/ 下的文件带内容哈希，浏览器缓存一年且不再重新验证
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# 预压缩文件的编码和后缀，按优先级排列
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+
+
+class AssetManifest:
+    """静态资源清单，清单文件更新后自动重新加载"""
+
+    def __init__(self, static_dir: str):
+        """
+        Args:
+            static_dir: 静态资源目录（frontend/static）
+        """
+        self.static_dir = static_dir
+        self.path = os.path.join(static_dir, DIST_DIR, MANIFEST_FILE)
+        self._assets = {}
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def assets(self) -> Dict[str, str]:
+        """返回 {源文件路径: 带哈希的文件路径}，未构建时返回空字典"""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return {}
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    try:
+                        with open(self.path, 'r', encoding='utf-8') as f:
+                            self._assets = json.load(f).get('assets', {})
+                    except (OSError, ValueError):
+                        self._assets = {}
+                    self._mtime = mtime
+        return self._assets
+
+    def url(self, path: str, static_url: str = '/static') -> str:
+        """返回资源地址，已构建时指向带哈希的文件，否则指向源文件"""
+        fingerprinted = self.assets().get(path)
+        if fingerprinted:
+            return f"{static_url}/{DIST_DIR}/{fingerprinted}"
+        return f"{static_url}/{path}"
+
+    def digest(self) -> str:
+        """清单内容摘要，资源地址变化时随之变化"""
+        return json.dumps(self.assets(), sort_keys=True)
+
+
+def send_asset(static_dir: str, filename: str, accept_encoding: str = None):
+    """返回 dist/ 下的资源，客户端支持时直接返回预压缩文件
+
+    Args:
+        static_dir: 静态资源目录
+        filename: 相对静态资源目录的路径（dist/...）
+        accept_encoding: 请求的 Accept-Encoding 头
+    """
+    from flask import send_from_directory
+
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    accepted = accepted_encodings(accept_encoding)
+    for encoding, suffix in PRECOMPRESSED:
+        if (encoding in accepted or '*' in accepted) and os.path.isfile(os.path.join(static_dir, filename + suffix)):
+            response = send_from_directory(static_dir, filename + suffix, mimetype=mimetype)
+            response.headers['Content-Encoding'] = encoding
+            break
+    else:
+        response = send_from_directory(static_dir, filename, mimetype=mimetype)
+    response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
@@ -0,0 +1,107 @@
+"""
+缓存值编码：带版本号的紧凑二进制格式，兼容旧的 JSON 字符串
+
+格式:
+    0xC1 | 版本号(1字节) | 序列化方式<<4 | 压缩方式(1字节) | 数据
+
+0xC1 是 msgpack 规定不使用的字节，JSON 文本也不会以它开头，因此可以据此区分新旧格式。
+序列化优先使用 msgpack，未安装时使用紧凑 JSON；超过阈值的数据优先使用 zstd 压缩，
+未安装时使用标准库 zlib。解码时根据头部选择实现，与写入时的环境无关（缺少对应依赖时报错）。
+
+旧格式（JSON 字符串）可以直接解码，调用方据 is_legacy() 判断后重新写入即可完成迁移。
+"""
+import zlib
+from typing import Any
+
+from utils import json_codec
+
+try:
+    import msgpack
+except ImportError:  # 未安装 msgpack 时使用紧凑 JSON
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # 未安装 zstandard 时使用 zlib 压缩
+    zstandard = None
+
+MAGIC = 0xC1
+VERSION = 1
+
+FORMAT_JSON = 0
+FORMAT_MSGPACK = 1
+
+COMPRESSION_NONE = 0
+COMPRESSION_ZLIB = 1
+COMPRESSION_ZSTD = 2
+
+# 默认压缩阈值（字节），农户ID列表等较大的值才值得压缩
+COMPRESS_MIN_SIZE = 1024
+
+
+def _serialize(obj: Any) -> tuple:
+    if msgpack is not None:
+        return FORMAT_MSGPACK, msgpack.packb(obj, use_bin_type=True)
+    return FORMAT_JSON, json_codec.dumps_bytes(obj)
+
+
+def _deserialize(fmt: int, data: bytes) -> Any:
+    if fmt == FORMAT_MSGPACK:
+        if msgpack is None:
+            raise ValueError('缓存值使用 msgpack 编码，但未安装 msgpack')
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+    if fmt == FORMAT_JSON:
+        return json_codec.loads(data)
+    raise ValueError(f'未知的缓存值序列化方式: {fmt}')
+
+
+def _compress(data: bytes) -> tuple:
+    if zstandard is not None:
+        return COMPRESSION_ZSTD, zstandard.ZstdCompressor(level=3).compress(data)
+    return COMPRESSION_ZLIB, zlib.compress(data, 6)
+
+
+def _decompress(compression: int, data: bytes) -> bytes:
+    if compression == COMPRESSION_NONE:
+        return data
+    if compression == COMPRESSION_ZLIB:
+        return zlib.decompress(data)
+    if compression == COMPRESSION_ZSTD:
+        if zstandard is None:
+            raise ValueError('缓存值使用 zstd 压缩，但未安装 zstandard')
+        return zstandard.ZstdDecompressor().decompress(data)
+    raise ValueError(f'未知的缓存值压缩方式: {compression}')
+
+
+def encode(obj: Any, compress_min_size: int = COMPRESS_MIN_SIZE) -> bytes:
+    """编码缓存值
+
+    Args:
+        obj: 待编码对象（JSON 兼容类型）
+        compress_min_size: 序列化后超过该长度时压缩，0 表示不压缩
+    """
+    fmt, data = _serialize(obj)
+    compression = COMPRESSION_NONE
+    if compress_min_size and len(data) >= compress_min_size:
+        compressed_with, compressed = _compress(data)
+        # 压缩后更大（如随机ID）时保留原数据
+        if len(compressed) < len(data):
+            compression, data = compressed_with, compressed
+    return bytes((MAGIC, VERSION, fmt << 4 | compression)) + data
+
+
+def is_legacy(value: bytes) -> bool:
+    """是否为旧的 JSON 字符串格式"""
+    return not value or value[0] != MAGIC
+
+
+def decode(value: bytes) -> Any:
+    """解码缓存值，兼容旧的 JSON 字符串格式"""
+    if is_legacy(value):
+        return json_codec.loads(value)
+    if len(value) < 3:
+        raise ValueError('缓存值头部不完整')
+    version, flags = value[1], value[2]
+    if version > VERSION:
+        raise ValueError(f'不支持的缓存值版本: {version}')
+    return _deserialize(flags >> 4, _decompress(flags & 0x0F, value[3:]))
@@ -0,0 +1,124 @@
+"""
+响应压缩工具：内容编码协商、gzip/brotli 压缩，以及 Flask 响应压缩中间件
+
+中间件只压缩超过最小长度的文本类响应（JSON、HTML、CSS、JS），跳过流式响应（图片代理）、
+文件响应（静态文件）和已经压缩的响应；渲染结果不变的页面（模板）压缩结果按内容哈希缓存。
+"""
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # 未安装 Brotli 时只提供 gzip
+    brotli = None
+
+# 支持的内容编码，按优先级排列；identity 表示不压缩
+ENCODINGS = ('br', 'gzip', 'identity')
+
+# 需要压缩的响应类型，图片、视频等已压缩的媒体不在其中
+COMPRESSIBLE_MIMETYPES = {
+    'application/json', 'text/html', 'text/css', 'text/plain',
+    'application/javascript', 'text/javascript', 'image/svg+xml'
+}
+
+
+def accepted_encodings(accept_encoding: str) -> set:
+    """解析 Accept-Encoding 请求头，返回客户端接受的编码（忽略 q=0）"""
+    accepted = set()
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        if params.strip().replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        accepted.add(name)
+    return accepted
+
+
+def choose_encoding(accept_encoding: str, available: Iterable[str] = ENCODINGS) -> str:
+    """按优先级选择客户端接受且可用的编码"""
+    accepted = accepted_encodings(accept_encoding)
+    for encoding in available:
+        if encoding == 'identity' or encoding in accepted or '*' in accepted:
+            return encoding
+    return 'identity'
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """按指定编码压缩"""
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=6, mtime=0)
+    if encoding == 'br':
+        return brotli.compress(body, quality=5)
+    return body
+
+
+def available_encodings() -> Tuple[str, ...]:
+    """当前环境可用的压缩编码"""
+    return ENCODINGS if brotli is not None else tuple(e for e in ENCODINGS if e != 'br')
+
+
+class CompressedBodyCache:
+    """按内容哈希缓存压缩结果的 LRU 缓存，用于渲染结果不变的页面"""
+
+    def __init__(self, max_entries: int = 128):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compress(self, body: bytes, encoding: str) -> bytes:
+        key = (hashlib.sha1(body).digest(), encoding)
+        with self._lock:
+            compressed = self._entries.get(key)
+            if compressed is not None:
+                self._entries.move_to_end(key)
+                return compressed
+        compressed = compress(body, encoding)
+        with self._lock:
+            self._entries[key] = compressed
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return compressed
+
+
+def init_compression(app, min_size: int = 1024, cache: Optional[CompressedBodyCache] = None):
+    """为 Flask 应用注册响应压缩
+
+    Args:
+        app: Flask 应用
+        min_size: 最小压缩长度（字节），更小的响应压缩收益不明显
+        cache: HTML 响应压缩结果缓存
+    """
+    from flask import request
+
+    cache = cache or CompressedBodyCache()
+
+    @app.after_request
+    def compress_response(response):
+        if response.status_code != 200 or response.direct_passthrough or response.is_streamed \
+                or 'Content-Encoding' in response.headers \
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES:
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = choose_encoding(request.headers.get('Accept-Encoding'), available_encodings())
+        if encoding == 'identity':
+            return response
+        body = response.get_data()
+        if len(body) < min_size:
+            return response
+        if response.mimetype == 'text/html':
+            compressed = cache.get_or_compress(body, encoding)
+        else:
+            compressed = compress(body, encoding)
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        if response.headers.get('ETag'):
+            # 压缩后的内容与原内容不同，使用弱校验
+            response.set_etag(response.get_etag()[0], weak=True)
+        return response
+
+    return compress_response
@@ -0,0 +1,64 @@
+"""
+请求截止时间工具：在一次接口请求内传递剩余时间预算
+
+接口在入口处用 deadline_scope 设置时间预算，飞书服务的每次调用按剩余时间设置超时，
+预算用完后后续调用直接抛出 DeadlineExceeded，不再请求飞书。
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+import requests
+
+# 当前请求的截止时间（time.monotonic() 时间点），None 表示不限制
+_deadline: ContextVar[Optional[float]] = ContextVar('request_deadline', default=None)
+
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    """请求的时间预算已用完
+
+    继承 requests 的 Timeout，调用方已有的网络异常处理会把它当作一次超时失败处理。
+    """
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]):
+    """在代码块内设置时间预算，seconds 为空或不大于 0 时不限制；嵌套时取更早的截止时间"""
+    deadline = _deadline.get()
+    if seconds and seconds > 0:
+        new_deadline = time.monotonic() + seconds
+        deadline = new_deadline if deadline is None else min(deadline, new_deadline)
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """当前时间预算的剩余秒数，未设置时返回 None"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def expired() -> bool:
+    """时间预算是否已用完"""
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def request_timeout(default: float) -> float:
+    """计算下一次外部调用的超时时间，不超过剩余时间预算
+
+    Raises:
+        DeadlineExceeded: 时间预算已用完
+    """
+    left = remaining()
+    if left is None:
+        return default
+    if left <= 0:
+        raise DeadlineExceeded('请求时间预算已用完')
+    return min(default, left)
@@ -0,0 +1,53 @@
+"""
+飞书事件订阅工具：签名校验与加密事件解密
+"""
+import base64
+import hashlib
+import hmac
+import json
+import logging
+
+try:
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+except ImportError:  # 未配置 Encrypt Key 时不需要解密
+    Cipher = None
+
+logger = logging.getLogger(__name__)
+
+
+def verify_signature(timestamp: str, nonce: str, encrypt_key: str, body: bytes, signature: str) -> bool:
+    """
+    校验飞书事件请求签名
+    签名算法: sha256(timestamp + nonce + encrypt_key + body) 的十六进制字符串
+    """
+    if not signature:
+        return False
+    content = (timestamp or '').encode('utf-8') + (nonce or '').encode('utf-8') \
+        + encrypt_key.encode('utf-8') + body
+    expected = hashlib.sha256(content).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+def decrypt_event(encrypt: str, encrypt_key: str) -> dict:
+    """
+    解密飞书加密事件（AES-256-CBC，密钥为 Encrypt Key 的 sha256，前16字节为IV）
+    """
+    if Cipher is None:
+        raise RuntimeError('解密飞书事件需要安装 cryptography')
+    key = hashlib.sha256(encrypt_key.encode('utf-8')).digest()
+    raw = base64.b64decode(encrypt)
+    iv, ciphertext = raw[:16], raw[16:]
+    decryptor = Cipher(algorithms.AES(key), modes.CBC(iv)).decryptor()
+    padded = decryptor.update(ciphertext) + decryptor.finalize()
+    plaintext = padded[:-padded[-1]]
+    return json.loads(plaintext.decode('utf-8'))
+
+
+def verify_token(payload: dict, verification_token: str) -> bool:
+    """
+    校验事件中的 Verification Token（兼容 1.0 与 2.0 事件格式）
+    """
+    if not verification_token:
+        return False
+    token = payload.get('token') or (payload.get('header') or {}).get('token')
+    return bool(token) and hmac.compare_digest(str(token), verification_token)
@@ -0,0 +1,110 @@
+"""
+JSON 编解码：优先使用 orjson，其次 ujson，均未安装时使用标准库 json
+
+农户数据以中文为主，标准库在 ensure_ascii=False 时编码较慢；orjson 直接输出 UTF-8 字节串，
+编解码速度快数倍。所有实现输出一致的紧凑 JSON（不转义非 ASCII 字符）。
+
+用法:
+    from utils.json_codec import dumps, dumps_bytes, loads
+    app.json = FastJSONProvider(app)
+"""
+import json
+from typing import Any, Callable, Optional, Union
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # 未安装 orjson 时依次回退到 ujson、标准库
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+if orjson is not None:
+    BACKEND = 'orjson'
+elif ujson is not None:
+    BACKEND = 'ujson'
+else:
+    BACKEND = 'json'
+
+if orjson is not None:
+    # 非字符串键与标准库一样转为字符串；datetime 交给 default 处理，与标准库行为一致
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+def _stdlib_dumps(obj: Any, sort_keys: bool, default: Optional[Callable]) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), sort_keys=sort_keys, default=default)
+
+
+def dumps_bytes(obj: Any, sort_keys: bool = False, default: Optional[Callable] = None) -> bytes:
+    """序列化为 UTF-8 编码的紧凑 JSON 字节串
+
+    Args:
+        obj: 待序列化对象
+        sort_keys: 是否按键排序
+        default: 无法直接序列化的对象的转换函数
+    """
+    try:
+        if orjson is not None:
+            option = _ORJSON_OPTIONS | orjson.OPT_SORT_KEYS if sort_keys else _ORJSON_OPTIONS
+            return orjson.dumps(obj, default=default, option=option)
+        if ujson is not None:
+            return ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False,
+                               sort_keys=sort_keys, default=default).encode('utf-8')
+    except (TypeError, OverflowError):
+        # 超出 64 位的整数等特殊值交给标准库处理
+        pass
+    return _stdlib_dumps(obj, sort_keys, default).encode('utf-8')
+
+
+def dumps(obj: Any, sort_keys: bool = False, default: Optional[Callable] = None) -> str:
+    """序列化为紧凑 JSON 字符串"""
+    if orjson is None and ujson is None:
+        return _stdlib_dumps(obj, sort_keys, default)
+    return dumps_bytes(obj, sort_keys=sort_keys, default=default).decode('utf-8')
+
+
+def loads(data: Union[str, bytes, bytearray, memoryview]) -> Any:
+    """反序列化 JSON 字符串或 UTF-8 字节串"""
+    try:
+        if orjson is not None:
+            return orjson.loads(data)
+        if ujson is not None:
+            return ujson.loads(data)
+    except ValueError:
+        # NaN 等标准库可以解析的非标准 JSON
+        pass
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    return json.loads(data)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON 提供者，jsonify 和 request.get_json 使用上面的编解码实现
+
+    输出不转义中文、不排序键；调试模式下的缩进输出仍由标准库完成。
+    """
+
+    ensure_ascii = False
+    sort_keys = False
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if 'indent' in kwargs or 'cls' in kwargs:
+            return super().dumps(obj, **kwargs)
+        return dumps(obj, sort_keys=kwargs.get('sort_keys', self.sort_keys),
+                     default=kwargs.get('default', self.default))
+
+    def loads(self, s: Union[str, bytes], **kwargs: Any) -> Any:
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        body = dumps_bytes(obj, sort_keys=self.sort_keys, default=self.default)
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
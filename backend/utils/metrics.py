@@ -0,0 +1,283 @@
+"""
+进程内指标采集
+
+计数器和直方图按线程分片：每个线程只写自己的分片，读取时合并，记录指标时不加锁。
+线程第一次记录某个指标时创建分片（加锁一次），同时把已退出线程的分片合并到汇总值中，
+每个请求一个线程的部署方式下分片数量也不会持续增长。
+
+    REQUESTS = metrics.counter('cache_requests_total', '缓存读取次数', ('namespace', 'result'))
+    REQUESTS.inc('tenant', 'hit')
+    LATENCY = metrics.histogram('cache_operation_seconds', '缓存读写耗时（秒）', ('namespace', 'operation'))
+    LATENCY.observe(0.0012, 'tenant', 'get')
+
+render_prometheus() 输出 Prometheus 文本格式，供 /metrics 接口使用；
+init_request_metrics(app) 按路由记录 Flask 接口的耗时。
+"""
+import bisect
+import math
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# 耗时直方图的默认分桶（秒）
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# 大小直方图的分桶（字节）
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class _Metric:
+    """按线程分片的指标基类，子类实现 _merge"""
+
+    kind = ''
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = []
+        self._retired = {}
+        self._lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = {}
+            with self._lock:
+                self._sweep()
+                self._shards.append((threading.current_thread(), shard))
+            self._local.shard = shard
+        return shard
+
+    def _sweep(self):
+        """把已退出线程的分片合并到汇总值，调用方持有锁"""
+        alive = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                alive.append((thread, shard))
+            else:
+                self._merge(self._retired, shard)
+        self._shards = alive
+
+    def _merge(self, into: dict, shard: dict):
+        raise NotImplementedError
+
+    def collect(self) -> dict:
+        """合并各线程的分片，返回 {标签值元组: 值}"""
+        result = {}
+        with self._lock:
+            self._sweep()
+            self._merge(result, self._retired)
+            for _, shard in self._shards:
+                self._merge(result, shard)
+        return result
+
+    def reset(self):
+        """清空已记录的值（测试使用）"""
+        with self._lock:
+            self._retired = {}
+            for _, shard in self._shards:
+                shard.clear()
+
+
+class Counter(_Metric):
+    """单调递增计数器"""
+
+    kind = 'counter'
+
+    def inc(self, *labelvalues, amount: float = 1):
+        shard = self._shard()
+        shard[labelvalues] = shard.get(labelvalues, 0) + amount
+
+    def _merge(self, into: dict, shard: dict):
+        for labels, value in list(shard.items()):
+            into[labels] = into.get(labels, 0) + value
+
+
+class Histogram(_Metric):
+    """分桶直方图，每组标签的值为 [各桶计数..., 超出最大桶的计数, 总和]"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labelvalues):
+        shard = self._shard()
+        values = shard.get(labelvalues)
+        if values is None:
+            values = shard[labelvalues] = [0] * (len(self.buckets) + 2)
+        values[bisect.bisect_left(self.buckets, value)] += 1
+        values[-1] += value
+
+    def _merge(self, into: dict, shard: dict):
+        for labels, values in list(shard.items()):
+            merged = into.get(labels)
+            if merged is None:
+                into[labels] = list(values)
+            else:
+                for index, value in enumerate(values):
+                    merged[index] += value
+
+    def quantile(self, q: float, values: List[float]) -> Optional[float]:
+        """按分桶线性插值估算分位数（与 Prometheus histogram_quantile 一致），超出最大桶时返回最大桶上界"""
+        count = sum(values[:-1])
+        if not count:
+            return None
+        rank = q * count
+        cumulative = 0
+        for index, bucket_count in enumerate(values[:-1]):
+            if cumulative + bucket_count >= rank and bucket_count:
+                if index == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0
+                return lower + (self.buckets[index] - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.buckets[-1]
+
+    def summarize(self, values: List[float], scale: float = 1) -> Dict[str, float]:
+        """汇总一组标签的记录次数、平均值和 p50/p95/p99，scale 用于换算单位（如秒换算为毫秒）"""
+        count = sum(values[:-1])
+        summary = {'count': count, 'avg': round(values[-1] / count * scale, 3) if count else None}
+        for name, q in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99)):
+            value = self.quantile(q, values)
+            summary[name] = None if value is None else round(value * scale, 3)
+        return summary
+
+
+class Gauge:
+    """采集时调用回调函数取值的仪表，回调返回 {标签值元组: 值}"""
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = (),
+                 func: Callable[[], Dict[tuple, float]] = None):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.func = func
+
+    def collect(self) -> dict:
+        return dict(self.func()) if self.func else {}
+
+    def reset(self):
+        pass
+
+
+def _format_labels(labelnames: tuple, labelvalues: tuple, extra: str = '') -> str:
+    pairs = []
+    for name, value in zip(labelnames, labelvalues):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, float):
+        if math.isinf(value):
+            return '+Inf' if value > 0 else '-Inf'
+        return repr(value)
+    return str(value)
+
+
+class MetricsRegistry:
+    """指标注册表，同名指标只创建一次"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, name: str, factory: Callable[[], object]):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = factory()
+            return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(name, lambda: Counter(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: Iterable[str] = (),
+                  buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(name, lambda: Histogram(name, help_text, labelnames, buckets))
+
+    def gauge(self, name: str, help_text: str, labelnames: Iterable[str] = (),
+              func: Callable[[], Dict[tuple, float]] = None) -> Gauge:
+        return self._register(name, lambda: Gauge(name, help_text, labelnames, func))
+
+    def get(self, name: str):
+        return self._metrics.get(name)
+
+    def reset(self):
+        """清空全部指标已记录的值（测试使用）"""
+        for metric in list(self._metrics.values()):
+            metric.reset()
+
+    def render_prometheus(self) -> str:
+        """输出 Prometheus 文本格式（text/plain; version=0.0.4）"""
+        lines = []
+        for name in sorted(self._metrics):
+            metric = self._metrics[name]
+            try:
+                samples = metric.collect()
+            except Exception as e:  # 回调失败不影响其他指标
+                lines.append(f'# {name} 采集失败: {str(e)}')
+                continue
+            lines.append(f'# HELP {name} {metric.help}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            for labels in sorted(samples, key=lambda labels: tuple(map(str, labels))):
+                value = samples[labels]
+                if metric.kind != 'histogram':
+                    lines.append(f'{name}{_format_labels(metric.labelnames, labels)} {_format_value(value)}')
+                    continue
+                cumulative = 0
+                for bucket, bucket_count in zip(metric.buckets + (float('inf'),), value[:-1]):
+                    cumulative += bucket_count
+                    le = 'le="' + _format_value(float(bucket)) + '"'
+                    lines.append(f'{name}_bucket{_format_labels(metric.labelnames, labels, le)} {cumulative}')
+                lines.append(f'{name}_sum{_format_labels(metric.labelnames, labels)} {_format_value(float(value[-1]))}')
+                lines.append(f'{name}_count{_format_labels(metric.labelnames, labels)} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+
+def in_flight_gauge(registry: MetricsRegistry, name: str, help_text: str, labelnames: Iterable[str],
+                   started: Counter, finished: Counter) -> Gauge:
+    """注册进行中数量的仪表，取值为开始、结束两个计数器之差（计数器只增不减，记录时无需加锁）"""
+    def collect():
+        done = finished.collect()
+        return {labels: count - done.get(labels, 0) for labels, count in started.collect().items()}
+    return registry.gauge(name, help_text, labelnames, func=collect)
+
+
+def init_request_metrics(app, registry: MetricsRegistry = None):
+    """按路由规则（而不是实际路径，避免产品ID等参数造成标签数量膨胀）记录接口耗时
+
+    Args:
+        app: Flask 应用
+        registry: 指标注册表，默认为全局注册表
+    """
+    from flask import g, request
+
+    registry = registry or metrics
+    latency = registry.histogram('http_request_duration_seconds', '接口耗时（秒），route 为路由规则',
+                                 ('route', 'method', 'status'))
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_latency(response):
+        started = g.pop('request_started', None)
+        if started is not None:
+            route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            latency.observe(time.perf_counter() - started, route, request.method, str(response.status_code))
+        return response
+
+
+# 全局指标注册表
+metrics = MetricsRegistry()
@@ -0,0 +1,208 @@
+"""
+按需启用的采样分析器：定位接口耗时高峰时时间花在哪里
+
+通过管理接口启用一段时间，按百分比抽取请求；后台线程按固定间隔读取被抽中请求所在线程的调用栈
+（sys._current_frames），按路由规则汇总为折叠栈格式（每行「路由;外层函数;...;内层函数 次数」），
+可直接用 flamegraph.pl、speedscope 等工具生成火焰图。结束后每个路由写入一个 .folded 文件。
+
+未启用时没有采样线程，每个请求只判断一次 profiler.active；只统计处理请求的线程，
+对冲请求线程池中的飞书请求不计入。
+"""
+import os
+import random
+import re
+import sys
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+# 单帧的最大调用深度，超出部分从外层截断
+MAX_STACK_DEPTH = 128
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    name = f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+    # 分号和空格是折叠栈格式的分隔符
+    return name.replace(';', ':').replace(' ', '_')
+
+
+def collapse_stack(frame) -> str:
+    """把调用栈转换为折叠栈格式，外层函数在前"""
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+def route_filename(route: str) -> str:
+    """路由规则对应的文件名，如 /api/v1/farm/<product_id>/feeding -> api_v1_farm_product_id_feeding.folded"""
+    return (re.sub(r'[^0-9A-Za-z]+', '_', route).strip('_') or 'root') + '.folded'
+
+
+class ProfileSession:
+    """一次采样：启用参数和按路由汇总的调用栈计数"""
+
+    def __init__(self, seconds: float, percent: float, interval: float, routes: Optional[Iterable[str]],
+                 output_dir: Optional[str]):
+        self.started = time.time()
+        self.ends = time.monotonic() + seconds
+        self.seconds = seconds
+        self.percent = percent
+        self.interval = interval
+        self.routes = set(routes) if routes else None
+        self.output_dir = output_dir
+        self.stopped = threading.Event()
+        self.requests = {}
+        # {路由: {折叠栈: 次数}}，只由采样线程写入
+        self.stacks: Dict[str, Dict[str, int]] = {}
+        self.files = []
+
+    def samples(self) -> Dict[str, int]:
+        return {route: sum(stacks.values()) for route, stacks in list(self.stacks.items())}
+
+    def folded(self, route: str) -> str:
+        stacks = dict(self.stacks.get(route, {}))
+        return ''.join(f'{route};{stack} {count}\n' for stack, count in sorted(stacks.items()))
+
+    def to_dict(self) -> Dict:
+        return {
+            'started': self.started,
+            'seconds': self.seconds,
+            'remaining': max(0.0, round(self.ends - time.monotonic(), 3)) if not self.stopped.is_set() else 0,
+            'percent': self.percent,
+            'interval_ms': round(self.interval * 1000, 3),
+            'routes': sorted(self.routes) if self.routes else None,
+            'requests': dict(self.requests),
+            'samples': self.samples(),
+            'files': list(self.files)
+        }
+
+
+class SamplingProfiler:
+    """采样分析器，同一时间只有一次采样"""
+
+    def __init__(self):
+        # 请求入口只读取这个属性，未启用时没有其他开销
+        self.active = False
+        self.session: Optional[ProfileSession] = None
+        # {线程ID: 路由}，被抽中的请求在处理期间登记
+        self._targets: Dict[int, str] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self, seconds: float, percent: float = 100, interval: float = 0.005,
+              routes: Optional[Iterable[str]] = None, output_dir: Optional[str] = None) -> ProfileSession:
+        """启用采样
+
+        Args:
+            seconds: 采样时长 秒，到期后自动结束
+            percent: 抽取的请求百分比（0-100]
+            interval: 采样间隔 秒
+            routes: 只抽取这些路由规则的请求，为空时抽取全部
+            output_dir: 结束后写入 .folded 文件的目录，为空时不写文件
+
+        Raises:
+            ValueError: 参数无效
+            RuntimeError: 已有正在进行的采样
+        """
+        if not 0 < seconds:
+            raise ValueError('seconds 必须大于 0')
+        if not 0 < percent <= 100:
+            raise ValueError('percent 必须在 (0, 100] 之间')
+        if not 0.001 <= interval <= 1:
+            raise ValueError('interval 必须在 0.001 到 1 秒之间')
+        with self._lock:
+            if self.active:
+                raise RuntimeError('已有正在进行的采样')
+            self.session = ProfileSession(seconds, percent, interval, routes, output_dir)
+            self._targets.clear()
+            self._thread = threading.Thread(target=self._run, args=(self.session,), name='sampling-profiler',
+                                            daemon=True)
+            self.active = True
+            self._thread.start()
+        return self.session
+
+    def stop(self) -> Optional[ProfileSession]:
+        """提前结束采样并等待结果写入，返回本次采样"""
+        thread, session = self._thread, self.session
+        if session is not None:
+            session.stopped.set()
+        if thread is not None:
+            thread.join()
+        return session
+
+    def begin(self, route: str):
+        """请求开始时调用，按百分比决定是否采样当前线程"""
+        session = self.session
+        if session is None or (session.routes is not None and route not in session.routes):
+            return
+        if session.percent < 100 and random.random() * 100 >= session.percent:
+            return
+        session.requests[route] = session.requests.get(route, 0) + 1
+        self._targets[threading.get_ident()] = route
+
+    def end(self):
+        """请求结束时调用"""
+        self._targets.pop(threading.get_ident(), None)
+
+    def _run(self, session: ProfileSession):
+        own = threading.get_ident()
+        try:
+            while not session.stopped.wait(session.interval) and time.monotonic() < session.ends:
+                targets = self._targets.copy()
+                if not targets:
+                    continue
+                frames = sys._current_frames()
+                for thread_id, route in targets.items():
+                    frame = frames.get(thread_id)
+                    if frame is None or thread_id == own:
+                        continue
+                    stacks = session.stacks.setdefault(route, {})
+                    stack = collapse_stack(frame)
+                    stacks[stack] = stacks.get(stack, 0) + 1
+                del frames
+        finally:
+            self.active = False
+            self._targets.clear()
+            session.stopped.set()
+            self._write(session)
+
+    @staticmethod
+    def _write(session: ProfileSession):
+        if not session.output_dir or not session.stacks:
+            return
+        directory = os.path.join(session.output_dir, time.strftime('%Y%m%d-%H%M%S', time.localtime(session.started)))
+        os.makedirs(directory, exist_ok=True)
+        for route in sorted(session.stacks):
+            path = os.path.join(directory, route_filename(route))
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(session.folded(route))
+            session.files.append(path)
+
+
+def init_profiler(app, profiler: SamplingProfiler = None):
+    """在请求入口按路由规则登记被抽中的请求
+
+    Args:
+        app: Flask 应用
+        profiler: 采样分析器，默认为全局实例
+    """
+    from flask import request
+
+    profiler = profiler or sampling_profiler
+
+    @app.before_request
+    def begin_sampling():
+        if profiler.active:
+            profiler.begin(request.url_rule.rule if request.url_rule is not None else 'unmatched')
+
+    @app.teardown_request
+    def end_sampling(error=None):
+        if profiler._targets:
+            profiler.end()
+
+
+# 全局采样分析器
+sampling_profiler = SamplingProfiler()
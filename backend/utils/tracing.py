@@ -0,0 +1,183 @@
+"""
+飞书接口调用追踪：记录每次调用的租户、数据表、操作、来源接口、耗时和响应大小
+
+调用记录写入进程内的环形缓冲区（最近 FEISHU_TRACE_SIZE 条），通过管理接口查看调用最多、
+耗时最长的来源，按「每个请求的调用次数」找出循环内逐条请求飞书（N+1）的接口。
+
+来源在请求入口（init_call_tracing）或定时任务中用 trace_scope 设置，未设置时为 background：
+
+    with trace_scope('job:update_cache'):
+        tenant_service.initialize_cache()
+"""
+import itertools
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Dict, List, Optional
+
+# 报表支持的分组字段
+GROUP_FIELDS = ('tenant', 'origin', 'operation', 'table', 'status')
+# 报表支持的排序字段
+SORT_FIELDS = ('calls', 'total_ms', 'bytes', 'calls_per_request')
+
+_request_ids = itertools.count(1)
+
+
+class RequestTrace:
+    """一次接口请求或定时任务内的飞书调用汇总"""
+
+    __slots__ = ('id', 'origin', 'calls', 'seconds', 'bytes')
+
+    def __init__(self, origin: str):
+        self.id = next(_request_ids)
+        self.origin = origin
+        self.calls = 0
+        self.seconds = 0.0
+        self.bytes = 0
+
+    def server_timing(self) -> str:
+        """Server-Timing 响应头的值"""
+        return f'feishu;dur={self.seconds * 1000:.1f};desc="{self.calls} calls, {self.bytes} bytes"'
+
+
+# 当前请求的调用汇总，None 表示不在接口请求或定时任务内
+_current: ContextVar[Optional[RequestTrace]] = ContextVar('feishu_request_trace', default=None)
+
+
+@contextmanager
+def trace_scope(origin: str):
+    """在代码块内把飞书调用归到 origin 来源（接口路由规则或 job:<任务名>）"""
+    trace = RequestTrace(origin)
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+
+def current_trace() -> Optional[RequestTrace]:
+    return _current.get()
+
+
+class CallTraceBuffer:
+    """飞书调用记录的环形缓冲区
+
+    每条记录为 (时间戳, 请求编号, 来源, 租户, 数据表, 操作, 状态, 耗时秒, 响应字节数)，
+    deque.append 是原子操作，记录时不加锁；缓冲区满后丢弃最早的记录。
+    """
+
+    def __init__(self, size: int = 2000):
+        self._entries = deque(maxlen=max(1, size))
+
+    def record(self, tenant: str, table: str, operation: str, status: str, seconds: float, size: int):
+        trace = _current.get()
+        if trace is None:
+            request_id, origin = 0, 'background'
+        else:
+            request_id, origin = trace.id, trace.origin
+            trace.calls += 1
+            trace.seconds += seconds
+            trace.bytes += size
+        self._entries.append((time.time(), request_id, origin, tenant, table, operation, status, seconds, size))
+
+    def clear(self):
+        self._entries.clear()
+
+    def entries(self, window: Optional[float] = None) -> List[Dict]:
+        """最近 window 秒内（为空时为缓冲区内全部）的调用记录"""
+        since = time.time() - window if window else 0
+        return [
+            {'time': ts, 'request_id': request_id, 'origin': origin, 'tenant': tenant, 'table': table,
+             'operation': operation, 'status': status, 'ms': round(seconds * 1000, 3), 'bytes': size}
+            for ts, request_id, origin, tenant, table, operation, status, seconds, size in list(self._entries)
+            if ts >= since
+        ]
+
+    def report(self, group_by=('tenant', 'origin', 'operation', 'table'), sort: str = 'calls',
+               top: int = 20, window: Optional[float] = None) -> Dict:
+        """按 group_by 分组汇总调用次数、耗时、响应大小和每个请求的调用次数
+
+        Args:
+            group_by: 分组字段，取值见 GROUP_FIELDS
+            sort: 排序字段，取值见 SORT_FIELDS
+            top: 返回的分组数量
+            window: 只统计最近 window 秒内的调用，为空时统计缓冲区内全部记录
+
+        Returns:
+            Dict: {'entries': 统计的调用数, 'since': 最早一条的时间戳, 'top': [分组汇总...]}
+        """
+        group_by = tuple(group_by)
+        unknown = set(group_by) - set(GROUP_FIELDS)
+        if unknown or not group_by:
+            raise ValueError(f'group_by 只能包含: {",".join(GROUP_FIELDS)}')
+        if sort not in SORT_FIELDS:
+            raise ValueError(f'sort 只能为: {",".join(SORT_FIELDS)}')
+
+        entries = self.entries(window)
+        groups = {}
+        for entry in entries:
+            key = tuple(entry[field] for field in group_by)
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = {'calls': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'bytes': 0,
+                                       'per_request': {}}
+            group['calls'] += 1
+            group['errors'] += entry['status'] != '200'
+            group['total_ms'] += entry['ms']
+            group['max_ms'] = max(group['max_ms'], entry['ms'])
+            group['bytes'] += entry['bytes']
+            if entry['request_id']:
+                group['per_request'][entry['request_id']] = group['per_request'].get(entry['request_id'], 0) + 1
+
+        rows = []
+        for key, group in groups.items():
+            per_request = group.pop('per_request')
+            row = dict(zip(group_by, key))
+            row.update(group)
+            row['total_ms'] = round(group['total_ms'], 3)
+            row['avg_ms'] = round(group['total_ms'] / group['calls'], 3)
+            row['requests'] = len(per_request)
+            # 同一个请求内调用次数多说明存在循环内逐条请求
+            row['calls_per_request'] = round(sum(per_request.values()) / len(per_request), 2) if per_request else None
+            row['max_calls_per_request'] = max(per_request.values()) if per_request else None
+            rows.append(row)
+        rows.sort(key=lambda row: row[sort] or 0, reverse=True)
+        return {
+            'entries': len(entries),
+            'since': entries[0]['time'] if entries else None,
+            'top': rows[:top]
+        }
+
+
+def init_call_tracing(app):
+    """按接口路由规则设置每个请求的飞书调用来源
+
+    Args:
+        app: Flask 应用
+    """
+    from flask import request
+
+    @app.before_request
+    def start_trace():
+        origin = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        _current.set(RequestTrace(origin))
+
+    @app.teardown_request
+    def end_trace(error=None):
+        _current.set(None)
+
+
+def server_timing(view):
+    """接口响应添加 Server-Timing 头，列出本次请求内飞书调用的总耗时、次数和响应大小"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        from flask import make_response
+
+        response = make_response(view(*args, **kwargs))
+        trace = _current.get()
+        if trace is not None:
+            response.headers['Server-Timing'] = trace.server_timing()
+        return response
+    return wrapper
@@ -18,6 +18,10 @@ else
     sleep 1  # 等待端口释放
 fi
 
+# 构建带内容哈希的静态资源
+echo "构建静态资源..."
+(cd backend && python build_assets.py)
+
 # 重启服务
 echo "启动后端服务..."
 cd backend && nohup python app.py > app.log 2>&1 &